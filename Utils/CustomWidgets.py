@@ -1,56 +1,261 @@
+from typing import Any, Callable, Sequence
+
+from rich.style import Style
+from rich.table import Table
+from rich.text import Text
+
+from textual.binding import Binding
+from textual.geometry import Region, Size
+from textual.message import Message
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 from textual.widgets import Static
-from textual.containers import Grid, Horizontal
 
-class ExpenseRow(Horizontal):
+from Utils.Profiling import profiler
+
+
+def _fit(text: Text, width: int) -> Text:
+    """ Pad or cut a piece of a row to exactly `width` cells """
+    text = text.copy()
+    text.truncate(max(width, 0), overflow="ellipsis", pad=True)
+    return text
+
+
+class ExpenseRow:
+    """ One category in the right panel: its name on the left, its total on the right """
+    AMOUNT_STYLE = Style(color="#AFAFD7")
+
     def __init__(self, name: str, amount: float):
-        super().__init__()
         self.entry_name = name
         self.amount = amount
 
-    def compose(self):
-        DEFAULT_CSS = """
-            ExpenseRow {
-                width: 100%;
-            }
+    def render_line(self, width: int) -> Text:
+        amount = Text(f"RM {self.amount:,.2f}", style=self.AMOUNT_STYLE)
+        name_width = width - amount.cell_len - 4 # One cell of padding each side, two more after the amount
 
-            .expense-name {
-                width: 1fr;
-            }
+        return Text.assemble(" ", _fit(Text(str(self.entry_name)), name_width), amount, "   ")
 
-            .expense-amount {
-                width: auto;
-                color: green;
-                text-style: bold;
-            }
-        """
 
-        yield Static(self.entry_name, classes="expense-name")
-        yield Static(f"RM {self.amount:,.2f}", classes="expense-amount")
+class EntryRow:
+    """ One entry in a category: date, description and amount columns """
+    AMOUNT_STYLE = Style(color="#FFFFFF", bold=True)
 
+    def __init__(self, date: str, amount: float, description: str):
+        self.date = date
+        self.amount = amount
+        self.description = description
 
-class EntryRow(Grid):
-    DEFAULT_CSS = """ 
-        EntryRow {
-            width: 100%;
-            grid-size: 3;
-            grid-columns: 20% 1fr auto;
-            padding: 0 1;
+    def render_line(self, width: int) -> Text:
+        inner = width - 2
+        amount = Text(f"RM {self.amount:,.2f}", style=self.AMOUNT_STYLE)
+        date_width = inner * 20 // 100
+        description_width = inner - date_width - amount.cell_len - 2
+
+        return Text.assemble(" ", _fit(Text(self.date), date_width), _fit(Text(self.description), description_width), amount, "   ")
+
+
+class TextRow:
+    """ A row that is just a line of text, e.g. a history filename """
+    def __init__(self, text: str):
+        self.text = text
+
+    def render_line(self, width: int) -> Text:
+        return _fit(Text(str(self.text)), width)
+
+
+class VirtualList(ScrollView, can_focus=True):
+    """
+    A ListView look-alike that only ever renders the rows in view. Rows are read straight out of `rows`
+    (any sequence, e.g. the ledger's EntryColumns) and turned into ExpenseRow/EntryRow/TextRow objects by
+    `make_row` as they scroll into view, so opening a list costs the same whether it has ten rows or ten thousand.
+    """
+
+    DEFAULT_CSS = """
+        VirtualList {
+            height: 1fr;
+            background: transparent;
+            overflow-x: hidden;
         }
 
-        .expense-amount { 
-            text-align: right;
-            color: #FFFFFF;
-            text-style: bold;
-        } 
+        VirtualList > .virtual-list--cursor {
+            color: $block-cursor-blurred-foreground;
+            background: $block-cursor-blurred-background;
+            text-style: $block-cursor-blurred-text-style;
+        }
+
+        VirtualList:focus > .virtual-list--cursor {
+            color: $block-cursor-foreground;
+            background: $block-cursor-background;
+            text-style: $block-cursor-text-style;
+        }
     """
 
-    def __init__(self, date: str, amount: float, description: str):
-        super().__init__()
-        self.date = date
-        self.amount = amount
-        self.description = description
+    COMPONENT_CLASSES = {"virtual-list--cursor"}
+
+    BINDINGS = [
+        Binding("enter", "select_cursor", "Select", show=False),
+        Binding("up", "cursor_up", "Cursor up", show=False),
+        Binding("down", "cursor_down", "Cursor down", show=False),
+    ]
+
+    ROW_HEIGHT = 2 # The row itself plus a blank line, like the ListItems' margin-bottom used to give
+
+    index = reactive(None, always_update=True)
+
+    class Highlighted(Message):
+        def __init__(self, list_view: "VirtualList", index: int | None) -> None:
+            super().__init__()
+            self.list_view = list_view
+            self.index = index
+
+    class Selected(Message):
+        def __init__(self, list_view: "VirtualList", index: int) -> None:
+            super().__init__()
+            self.list_view = list_view
+            self.index = index
+
+    def __init__(self, rows: Sequence = (), make_row: Callable[[Any], Any] = TextRow, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.rows = rows
+        self.make_row = make_row
+
+    @property
+    def row_count(self) -> int:
+        return len(self.rows)
+
+    @property
+    def highlighted_row(self) -> Any:
+        """ The item under the cursor, straight from `rows` """
+        if self.index is None or self.index >= len(self.rows):
+            return None
+
+        return self.rows[self.index]
+
+    def set_rows(self, rows: Sequence, make_row: Callable[[Any], Any] | None = None) -> None:
+        """ Show a different sequence; Nothing is built until it gets drawn """
+        self.rows = rows
+        if make_row is not None:
+            self.make_row = make_row
+
+        self.refresh_rows()
+
+    def refresh_rows(self, start: int = 0) -> None:
+        """ Pick up rows that were added, removed or changed in place; Rows before `start` are known to be unchanged """
+        self.virtual_size = Size(0, len(self.rows) * self.ROW_HEIGHT)
+
+        if self.index is not None:
+            self.index = self.index # Clamped by validate_index
+
+        top = start * self.ROW_HEIGHT - round(self.scroll_y)
+        self.refresh(Region(0, max(top, 0), self.size.width, self.size.height))
+
+    def refresh_row(self, index: int) -> None:
+        """ Redraw a single row whose contents changed """
+        self.refresh(Region(0, index * self.ROW_HEIGHT - round(self.scroll_y), self.size.width, 1))
+
+    def on_mount(self) -> None:
+        self.refresh_rows()
+
+    def validate_index(self, index: int | None) -> int | None:
+        if index is None or not self.rows:
+            return None
+
+        return max(0, min(index, len(self.rows) - 1))
+
+    def watch_index(self, old_index: int | None, new_index: int | None) -> None:
+        if new_index is not None:
+            self.scroll_to_region(Region(0, new_index * self.ROW_HEIGHT, 1, 1), animate=False, immediate=True)
+
+        # Only the rows the cursor left and landed on look any different; Scrolling redraws the rest by itself
+        for index in {old_index, new_index} - {None}:
+            self.refresh_row(index)
+
+        self.post_message(self.Highlighted(self, new_index))
+
+    def action_cursor_down(self) -> None:
+        self.index = 0 if self.index is None else self.index + 1
+
+    def action_cursor_up(self) -> None:
+        self.index = 0 if self.index is None else self.index - 1
+
+    def action_select_cursor(self) -> None:
+        if self.index is not None:
+            self.post_message(self.Selected(self, self.index))
+
+    def on_click(self, event) -> None:
+        index = (event.y + round(self.scroll_y)) // self.ROW_HEIGHT
+
+        if 0 <= index < len(self.rows):
+            self.focus()
+            self.index = index
+
+    def render_line(self, y: int) -> Strip:
+        width = self.scrollable_content_region.width
+        index, gap = divmod(round(self.scroll_y) + y, self.ROW_HEIGHT)
+
+        if gap or index >= len(self.rows):
+            return Strip.blank(width, self.rich_style)
+
+        style = self.rich_style
+        if index == self.index:
+            style += self.get_component_rich_style("virtual-list--cursor")
+
+        text = _fit(self.make_row(self.rows[index]).render_line(width), width)
+        return Strip(text.render(self.app.console)).apply_style(style).crop_extend(0, width, style)
+
+
+def _bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+    return f"{size:.1f} GB"
+
+
+class ProfileOverlay(Static):
+    """ The profiler's live table, drawn over the bottom of the screen; Showing it switches profiling on """
+
+    DEFAULT_CSS = """
+        ProfileOverlay {
+            layer: overlay;
+            dock: bottom;
+            width: 100%;
+            height: auto;
+            max-height: 60%;
+            background: #080808;
+            border: round #AFAFD7;
+            display: none;
+        }
+    """
+
+    MAX_ROWS = 20
+    REFRESH_SECONDS = 0.5
+
+    def on_mount(self) -> None:
+        self.border_title = "Profile   [P] Hide"
+        self.timer = self.set_interval(self.REFRESH_SECONDS, self.refresh_table, pause=True)
+
+    def toggle(self) -> None:
+        self.display = not self.display
+
+        if self.display:
+            profiler.enabled = True # Counts from here if it wasn't on from startup
+            self.refresh_table()
+            self.timer.resume()
+        else:
+            self.timer.pause()
+
+    def refresh_table(self) -> None:
+        table = Table(expand=True, box=None, header_style="bold #AFAFD7")
+        for column in ("Function", "Calls", "Total ms", "Mean ms", "Max ms", "Read", "Written"):
+            table.add_column(column, justify="left" if column == "Function" else "right")
+
+        for row in profiler.table()[:self.MAX_ROWS]:
+            table.add_row(
+                row["name"], str(row["calls"]), f"{row['total_ms']:,.1f}", f"{row['mean_ms']:,.2f}", f"{row['max_ms']:,.1f}",
+                _bytes(row["bytes_read"]), _bytes(row["bytes_written"])
+            )
 
-    def compose(self):
-        yield Static(self.date)
-        yield Static(self.description)
-        yield Static(f"RM {self.amount:,.2f}", classes="expense-amount")
+        self.update(table)
@@ -1,4 +1,5 @@
-from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
 
 from textual import color
 from textual.app import ComposeResult
@@ -7,6 +8,85 @@ from textual.containers import Horizontal, Vertical, VerticalScroll
 from textual.widgets import ListItem, ListView, Static
 from textual_plotext import PlotextPlot
 
+from Utils.Profiling import timed
+
+# (label, dataset key, colour) for every line on the overview plot
+PLOT_SERIES = (
+    ("Balance", "Balance", (255, 255, 0)),
+    ("Income", "Total Income", "green"),
+    ("Expenses", "Total Expenses", "red"),
+    ("Savings", "Savings", "blue"),
+)
+
+PLOT_CACHE_SIZE = 16 # A few widths (resizes) for a few dataset versions is plenty
+_plot_cache = OrderedDict()
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> Tuple[List[float], List[float]]:
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps `threshold` points, always including the first and last,
+    picking from each bucket the point that makes the largest triangle with its neighbours so peaks and dips survive.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(xs), list(ys)
+
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average of the next bucket is the triangle's third corner
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return [xs[i] for i in selected], [ys[i] for i in selected]
+
+def dataset_version(history_dataset: List[Dict]) -> Tuple:
+    """ Everything the plot shows, as a tuple; Kept whole rather than hashed, so two datasets can never share a key """
+    return tuple( (data["Date"], *(data[key] for _, key, _ in PLOT_SERIES)) for data in history_dataset )
+
+def plot_series(history_dataset: List[Dict], width: int) -> Dict:
+    """
+    Every plot line downsampled to the plot's braille resolution (two dots per cell across), plus x ticks thinned
+    out so their labels don't overlap. Cached per (dataset version, width), so revisits and resizes back to a
+    width that was already drawn cost nothing.
+    """
+    key = (dataset_version(history_dataset), width)
+
+    if key in _plot_cache:
+        _plot_cache.move_to_end(key)
+        return _plot_cache[key]
+
+    x = list(range(len(history_dataset)))
+    series = {
+        label: lttb(x, [data[dataset_key] for data in history_dataset], 2 * width)
+        for label, dataset_key, _ in PLOT_SERIES
+    }
+
+    labels = [data["Date"] for data in history_dataset]
+    step = max(1, -(-len(labels) * 10 // max(width, 1))) # Roughly one tick label per 10 cells
+    series["ticks"] = (x[::step], labels[::step])
+
+    _plot_cache[key] = series
+    while len(_plot_cache) > PLOT_CACHE_SIZE:
+        _plot_cache.popitem(last=False)
+
+    return series
+
+
 class DashboardDataRow(Horizontal):
     DEFAULT_CSS = """
         DashboardDataRow {
@@ -98,22 +178,11 @@ class DashboardScreen(Vertical):
         }
     """
 
-    def __init__(self, balance: float, expense: float, savings: float, income: float, history_dataset: list) -> None:
+    def __init__(self, history_dataset: list, title: str = "Financial Overview") -> None:
         super().__init__()
-        self.current_balance = balance
-        self.current_expense = expense
-        self.current_savings = savings
-        self.current_income = income
-        self.history_dataset = history_dataset
-
-        # Add in current month info
-        self.history_dataset.append({
-            "Date": datetime.now().strftime("%b %Y"), # Current date in Month Year format, e.g., Feb 2026
-            "Balance": self.current_balance,
-            "Total Expenses": self.current_expense,
-            "Total Income": self.current_income,
-            "Savings": self.current_savings
-        })
+        self.history_dataset = history_dataset # Already includes the current month
+        self.title = title
+        self.plotted_width = 0
 
     def compose(self) -> ComposeResult:
         self.balance_plot = PlotextPlot(id="balance_plot")
@@ -122,21 +191,30 @@ class DashboardScreen(Vertical):
         yield self.balance_plot
         yield self.overview_table
 
+    @timed("DashboardScreen.on_mount")
     def on_mount(self) -> None:
-        plot_widget = self.query_one("#balance_plot")
-        plt = plot_widget.plt
-
-        x = list(range(len(self.history_dataset)))
-        balances = [d["Balance"] for d in self.history_dataset]
-        savings = [d["Savings"] for d in self.history_dataset]
-        expenses = [d["Total Expenses"] for d in self.history_dataset]
-        income = [d["Total Income"] for d in self.history_dataset]
-        labels = [d["Date"] for d in self.history_dataset]
-
-        plt.plot(x, balances, label="Balance", marker="braille", color=(255, 255, 0))
-        plt.plot(x, income, label="Income", marker="braille", color="green")
-        plt.plot(x, expenses, label="Expenses", marker="braille", color="red")
-        plt.plot(x, savings, label="Savings", marker="braille", color="blue")
-
-        plt.xticks(x, labels)
-        plt.title("Financial Overview")
+        self.call_after_refresh(self.redraw_plot) # Once layout has given the plot a width
+
+    def on_resize(self) -> None:
+        self.call_after_refresh(self.redraw_plot)
+
+    @timed("DashboardScreen.redraw_plot")
+    def redraw_plot(self) -> None:
+        """ Plot the cached, downsampled series for the plot's current width """
+        width = self.balance_plot.size.width
+        if not width or width == self.plotted_width:
+            return
+
+        self.plotted_width = width
+        series = plot_series(self.history_dataset, width)
+
+        plt = self.balance_plot.plt
+        plt.clear_data()
+
+        for label, _, plot_color in PLOT_SERIES:
+            x, y = series[label]
+            plt.plot(x, y, label=label, marker="braille", color=plot_color)
+
+        plt.xticks(*series["ticks"])
+        plt.title(self.title)
+        self.balance_plot.refresh()
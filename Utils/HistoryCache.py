@@ -0,0 +1,62 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict
+
+
+class HistoryCache:
+    """
+    Parsed History/ months, keyed by (path, mtime, size) so an edited or replaced file is never served stale.
+    Bounded by a byte budget, charged at each month's file size; The least recently used months go first,
+    and a month too big for the budget on its own is handed back without being kept. Safe to share between threads.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._months = OrderedDict()
+        self._lock = threading.Lock() # Searches read History/ from a worker thread while the UI does too
+
+    def get(self, path: str, loader: Callable[[str], Dict]) -> Dict:
+        with self._lock: # Held over the load too, so two threads asking for the same month only parse it once
+            return self._get(path, loader)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._months.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return { "hits": self.hits, "misses": self.misses, "months": len(self._months), "bytes": self.bytes, "max_bytes": self.max_bytes }
+
+    def _get(self, path: str, loader: Callable[[str], Dict]) -> Dict:
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+
+        if key in self._months:
+            self.hits += 1
+            self._months.move_to_end(key)
+            return self._months[key]
+
+        self.misses += 1
+        value = loader(path)
+
+        # Whatever was cached for an older version of this file is dead weight now
+        for stale in [ cached for cached in self._months if cached[0] == path ]:
+            self._evict(stale)
+
+        if stat.st_size <= self.max_bytes:
+            self._months[key] = value
+            self.bytes += stat.st_size
+
+            while self.bytes > self.max_bytes:
+                self._evict(next(iter(self._months)))
+
+        return value
+
+    def _evict(self, key) -> None:
+        del self._months[key]
+        self.bytes -= key[2]
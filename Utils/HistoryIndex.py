@@ -0,0 +1,193 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from Utils.LedgerCodec import loads
+from Utils.Profiling import profiler
+
+SUMMARY_KEYS = ("Balance", "Total Expenses", "Total Income", "Savings")
+
+# Dashboard time windows, in months counting the current one; None means all of history
+HISTORY_WINDOWS = { "3M": 3, "12M": 12, "5Y": 60, "All": None }
+HISTORY_BUCKETS = ("month", "quarter", "year")
+
+
+def month_ordinal(date_obj) -> int:
+    return date_obj.year * 12 + date_obj.month - 1
+
+def window_cutoff(window: str, now: Optional[datetime] = None) -> Optional[int]:
+    """ Oldest month ordinal inside `window`, or None for all of history """
+    months = HISTORY_WINDOWS[window]
+    if months is None:
+        return None
+
+    return month_ordinal(now or datetime.now()) - (months - 1)
+
+def bucket_of(month: int, bucket: str) -> Tuple[int, str]:
+    """ Sort key and label of the bucket a month ordinal falls in """
+    year, month_index = divmod(month, 12)
+
+    if bucket == "quarter":
+        return year * 4 + month_index // 3, f"Q{month_index // 3 + 1} {year}"
+    if bucket == "year":
+        return year, str(year)
+
+    return month, datetime(year, month_index + 1, 1).strftime("%b %Y")
+
+def aggregate_months(summaries: Iterable[Dict], bucket: str = "month") -> Iterator[Dict]:
+    """
+    Fold month summaries, oldest first, into dashboard rows one bucket at a time. Expenses and income add up over
+    the bucket; Balance and savings are where the bucket's last month left them. Only one bucket is held at a time.
+    """
+    key, row = None, None
+
+    for summary in summaries:
+        month_key, label = bucket_of(summary["month"], bucket)
+
+        if month_key != key:
+            if row is not None:
+                yield row
+
+            key = month_key
+            row = { "Date": label, "Balance": 0, "Total Expenses": 0, "Total Income": 0, "Savings": 0 }
+
+        row["Total Expenses"] += summary["Total Expenses"]
+        row["Total Income"] += summary["Total Income"]
+        row["Balance"] = summary["Balance"]
+        row["Savings"] = summary["Savings"]
+
+    if row is not None:
+        yield row
+
+
+class HistoryIndex:
+    """
+    Small summary file for History/: the dashboard scalars of every archived month, keyed by filename.
+    Each summary remembers the mtime and size of the file it came from, so a month that was edited,
+    replaced or removed by hand gets picked up again instead of served stale.
+    """
+
+    def __init__(self, history_path: str, index_path: str) -> None:
+        self.history_path = history_path
+        self.index_path = index_path
+
+    TAIL_BYTES = 4096 # The summary figures are the last keys of an archived month, so this much of the end holds them
+
+    def summaries(self) -> List[Dict]:
+        """ Every archived month's summary, oldest first; Only months whose file changed get opened """
+        return list(self.iter_summaries())
+
+    def iter_summaries(self, since: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Archived months' summaries oldest first, from month ordinal `since` on. Months outside the window are never
+        opened, and a month whose file changed is read one at a time and only as far as its summary figures.
+        """
+        index = self._load()
+        months = {}
+        changed = False
+
+        try:
+            files = [ item for item in os.scandir(self.history_path) if item.is_file() and item.name.endswith(".json") ]
+        except FileNotFoundError:
+            files = []
+
+        # Filenames are '{Month} {Year}.json', so the order is known before any of them is opened
+        dated = []
+        for item in files:
+            try:
+                dated.append((month_ordinal(datetime.strptime(item.name.removesuffix(".json"), "%B %Y")), item))
+            except ValueError:
+                continue # Not an archived month
+
+        dated.sort(key=lambda pair: pair[0])
+
+        try:
+            for month, item in dated:
+                summary = index.get(item.name)
+
+                if since is not None and month < since:
+                    if summary is not None:
+                        months[item.name] = summary # Keep what we know, without checking it
+                    continue
+
+                stat = item.stat()
+                if summary is None or summary["mtime_ns"] != stat.st_mtime_ns or summary["size"] != stat.st_size:
+                    summary = self._summarise(item.path, stat)
+                    changed = True
+
+                months[item.name] = summary
+                yield summary
+
+        finally:
+            if changed or len(months) != len(index):
+                self._save(months)
+
+    def record(self, filename: str, summary: Dict) -> None:
+        """ Add a month that was just archived without reading it back """
+        path = os.path.join(self.history_path, filename)
+        index = self._load()
+
+        try:
+            index[filename] = self._entry(path, os.stat(path), summary)
+        except Exception as e:
+            print(f"Failed to index {filename}: {e}")
+            return
+
+        self._save(index)
+
+    def _summarise(self, path: str, stat) -> Dict:
+        return self._entry(path, stat, self._read_figures(path, stat.st_size))
+
+    def _read_figures(self, path: str, size: int) -> Dict:
+        """ Parse just the tail of an archived month for its summary figures; Falls back to the whole file if they aren't there, e.g. it's binary """
+        with open(path, "rb") as file:
+            file.seek(max(size - self.TAIL_BYTES, 0))
+            tail = file.read().decode("utf-8", errors="ignore")
+            profiler.count_read(len(tail))
+
+            start = tail.rfind('"Total Expenses"')
+            if start != -1:
+                try:
+                    data = json.loads("{" + tail[start:])
+                    if all(key in data for key in SUMMARY_KEYS):
+                        return data
+                except json.JSONDecodeError:
+                    pass
+
+            file.seek(0)
+            profiler.count_read(size)
+            return loads(file.read()) # Whichever format the month was written in
+
+    def _entry(self, path: str, stat, data: Dict) -> Dict:
+        label = os.path.basename(path).removesuffix(".json")
+
+        return {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "label": label,
+            "month": month_ordinal(datetime.strptime(label, "%B %Y")),
+            **{ key: data[key] for key in SUMMARY_KEYS },
+        }
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.index_path) as file:
+                index = json.load(file)
+
+            profiler.count_file_read(self.index_path)
+            return index
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {} # Gets rebuilt from History/ on the next summaries()
+
+    def _save(self, index: Dict) -> None:
+        try:
+            temp_path = self.index_path + ".tmp"
+            with open(temp_path, "w") as file:
+                json.dump(index, file, separators=(",", ":"))
+                profiler.count_written(file.tell())
+
+            os.replace(temp_path, self.index_path)
+
+        except Exception as e:
+            print(f"Failed to save history index: {e}")
@@ -0,0 +1,107 @@
+import json
+import marshal
+import struct
+from typing import Dict, Union
+
+ENTRY_FIELDS = ("description", "payment_date", "value")
+ENTRY_KEYS = frozenset(ENTRY_FIELDS)
+DEFAULT_CODEC = "json"
+
+
+class JSONCodec:
+    """ The ledger's original format; Pretty-printed with `indent`, or minified without it """
+
+    def __init__(self, name: str, indent: int = None) -> None:
+        self.name = name
+        self.indent = indent
+        self.separators = None if indent is not None else (",", ":")
+
+    def encode(self, data) -> str:
+        return json.dumps(data, indent=self.indent, separators=self.separators)
+
+    def decode(self, raw: bytes):
+        return json.loads(raw)
+
+
+class BinaryCodec:
+    """
+    A fixed header (magic, version, payload length) followed by the document marshalled. Lists of entries are stored as
+    three columns, descriptions, dates and values, instead of a dict per entry, so the field names aren't repeated and the
+    ledger's shared description and date strings only get written once each. The length catches a truncated file.
+    """
+    name = "binary"
+    MAGIC = b"FTLB"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBI") # magic, version, payload bytes
+    MARSHAL_VERSION = 4             # Pinned, so a newer Python still writes files an older one can read
+
+    def encode(self, data) -> bytes:
+        payload = marshal.dumps(_pack(data), self.MARSHAL_VERSION)
+        return self.HEADER.pack(self.MAGIC, self.VERSION, len(payload)) + payload
+
+    def decode(self, raw: bytes):
+        if len(raw) < self.HEADER.size:
+            raise ValueError("Binary ledger file is truncated")
+
+        magic, version, size = self.HEADER.unpack_from(raw)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"Not a version {self.VERSION} binary ledger file")
+        if len(raw) - self.HEADER.size != size:
+            raise ValueError(f"Binary ledger file is truncated: expected {size} bytes, got {len(raw) - self.HEADER.size}")
+
+        try:
+            return _unpack(marshal.loads(memoryview(raw)[self.HEADER.size:]))
+        except (EOFError, TypeError) as e:
+            raise ValueError(f"Corrupt binary ledger file: {e}")
+
+
+def _is_entries(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) and item.keys() == ENTRY_KEYS for item in value)
+
+def _pack(value):
+    """ Plain dicts all the way down, with entry lists turned into a (descriptions, dates, values) tuple """
+    if isinstance(value, dict):
+        return { key: _pack(item) for key, item in value.items() }
+
+    if _is_entries(value):
+        return tuple([entry[field] for entry in value] for field in ENTRY_FIELDS)
+
+    return value
+
+def _unpack(value):
+    if isinstance(value, dict):
+        return { key: _unpack(item) for key, item in value.items() }
+
+    if isinstance(value, tuple): # JSON-shaped data never has tuples, so these are always entry columns
+        return [ { "description": description, "payment_date": payment_date, "value": amount } for description, payment_date, amount in zip(*value) ]
+
+    return value
+
+
+CODECS: Dict[str, Union[JSONCodec, BinaryCodec]] = {
+    "json": JSONCodec("json", indent=4),
+    "json-min": JSONCodec("json-min"),
+    "binary": BinaryCodec(),
+}
+
+
+def get_codec(name: str) -> Union[JSONCodec, BinaryCodec]:
+    if name not in CODECS:
+        raise ValueError(f"Unknown ledger codec '{name}', expected one of {', '.join(CODECS)}")
+
+    return CODECS[name]
+
+def detect_codec(raw: bytes) -> str:
+    """ Which format `raw` is in; Both JSON flavours read the same way, so they're told apart by whitespace alone """
+    if raw.startswith(BinaryCodec.MAGIC):
+        return "binary"
+
+    return "json" if b"\n" in raw[:64] else "json-min"
+
+def loads(raw: bytes):
+    """ Decode a ledger file in any of the formats """
+    return CODECS["binary" if raw.startswith(BinaryCodec.MAGIC) else "json"].decode(raw)
+
+def load(path: str):
+    with open(path, "rb") as file:
+        return loads(file.read())
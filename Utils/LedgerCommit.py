@@ -0,0 +1,103 @@
+import base64
+import json
+import os
+from typing import Dict, Union
+
+from Utils.Profiling import profiler
+
+
+def atomic_commit(files: Dict[str, Union[str, bytes]], commit_path: str) -> bool:
+    """
+    Write several files as one unit. The new contents go into a single commit file which is fsynced once;
+    Once that is in place the commit counts as done, and the files are swapped in from it. The commit file is only
+    removed after every swapped in file, and the directories holding them, have been fsynced too, so a crash can never
+    leave the commit gone with its files not yet on disk. Contents are text, or bytes for the binary ledger format.
+    """
+    try:
+        temp_path = commit_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(_to_record(files), file, separators=(",", ":"))
+            profiler.count_written(file.tell())
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, commit_path) # The commit point; Everything after this can be redone by recover_commit
+        _fsync_directory(os.path.dirname(os.path.abspath(commit_path)))
+        _apply_commit(files)
+        os.remove(commit_path)
+
+    except Exception as e:
+        print(f"Failed to commit {', '.join(files)}: {e}")
+        return False
+
+    return True
+
+def append_file(path: str, text: str) -> bool:
+    """ Append to a file with one write and one fsync """
+    try:
+        with open(path, "a") as file:
+            file.write(text)
+            profiler.count_written(len(text))
+            file.flush()
+            os.fsync(file.fileno())
+
+    except Exception as e:
+        print(f"Failed to append to {path}: {e}")
+        return False
+
+    return True
+
+def recover_commit(commit_path: str) -> None:
+    """ Finish a commit that was interrupted after its commit point """
+    if os.path.exists(commit_path + ".tmp"):
+        os.remove(commit_path + ".tmp") # Never reached the commit point, so none of it happened
+
+    if not os.path.exists(commit_path):
+        return
+
+    try:
+        _apply_commit(read_commit(commit_path))
+        os.remove(commit_path)
+
+    except Exception as e:
+        print(f"Failed to recover interrupted commit: {e}")
+
+def read_commit(commit_path: str) -> Dict[str, Union[str, bytes]]:
+    """ The files a commit swaps in and their new contents, without touching any of them """
+    with open(commit_path) as file:
+        return _from_record(json.load(file))
+
+def _to_record(files: Dict[str, Union[str, bytes]]) -> Dict:
+    """ The commit file is JSON, so binary contents go in as base64 """
+    return { path: content if isinstance(content, str) else { "base64": base64.b64encode(content).decode("ascii") } for path, content in files.items() }
+
+def _from_record(record: Dict) -> Dict[str, Union[str, bytes]]:
+    return { path: content if isinstance(content, str) else base64.b64decode(content["base64"]) for path, content in record.items() }
+
+def _apply_commit(files: Dict[str, Union[str, bytes]]) -> None:
+    """ Swap the files in and get them on disk; The caller can drop the commit file once this returns """
+    for path, content in files.items():
+        # Swap each file in whole so nothing ever sees it half written
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+
+        profiler.count_written(len(content))
+        os.replace(temp_path, path)
+
+    # The renames live in the directories, so those need syncing too before the commit file can go
+    for directory in { os.path.dirname(os.path.abspath(path)) for path in files }:
+        _fsync_directory(directory)
+
+def _fsync_directory(directory: str) -> None:
+    """ So a rename in `directory` survives a crash """
+    if not hasattr(os, "O_DIRECTORY"):
+        return # Windows has no way to open a directory for fsync
+
+    descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
@@ -0,0 +1,210 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from functools import lru_cache
+from operator import attrgetter
+from typing import Dict, Iterable, List
+
+DATE_FORMAT = "%d-%m-%Y"
+
+
+@lru_cache(maxsize=4096)
+def date_ordinal(payment_date: str) -> int:
+    """ Day ordinal of a 'DD-MM-YYYY' payment date; A month's worth of entries only has ~31 distinct dates, so it's cached """
+    day, month, year = payment_date.split("-")
+    return date(int(year), int(month), int(day)).toordinal()
+
+def ordinal_to_date(ordinal: int) -> date:
+    return date.fromordinal(ordinal)
+
+
+class Entry(dict):
+    """
+    A single ledger entry. It's still the plain {'description', 'payment_date', 'value'} dict the
+    UI and the JSON files use, but the payment date is parsed once into `ordinal` for sorting and filtering.
+    """
+    __slots__ = ("ordinal",)
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.ordinal = date_ordinal(self["payment_date"])
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+
+        if key == "payment_date":
+            self.ordinal = date_ordinal(value)
+
+    @classmethod
+    def from_row(cls, description: str, payment_date: str, value: float, ordinal: int) -> "Entry":
+        """ Build an entry whose ordinal is already known, e.g. read back from the database """
+        entry = cls.__new__(cls)
+        dict.__init__(entry, description=description, payment_date=payment_date, value=value)
+        entry.ordinal = ordinal
+
+        return entry
+
+
+by_ordinal = attrgetter("ordinal")
+
+
+class StringTable:
+    """
+    Descriptions and date strings repeat a lot ('Grab', '01-03-2026', ...), so the columns store indices into one of these.
+    Every EntryColumns has its own, so the strings go when its month does instead of piling up for the whole process.
+    """
+    __slots__ = ("strings", "ids")
+
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def intern(self, text: str) -> int:
+        string_id = self.ids.get(text)
+
+        if string_id is None:
+            string_id = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+
+        return string_id
+
+def _to_cents(value: float) -> int:
+    return round(value * 100)
+
+
+class EntryColumns:
+    """
+    The entries of one category, stored column-wise in flat arrays (int64 cents, int32 day ordinals and
+    indices into its own string table) instead of one dict per entry. It behaves like the list of
+    entry dicts it replaces: indexing, iterating, len(), append(), pop() and friends all work with Entry objects.
+    """
+    __slots__ = ("cents", "ordinals", "descriptions", "dates", "total_cents", "strings")
+    COLUMNS = ("cents", "ordinals", "descriptions", "dates")
+
+    def __init__(self, entries: Iterable[dict] = ()) -> None:
+        self.cents = array("q")
+        self.ordinals = array("i")
+        self.descriptions = array("I")
+        self.dates = array("I")
+        self.total_cents = 0 # Running sum of `cents`, kept up to date by every change
+        self.strings = StringTable()
+
+        for entry in entries:
+            self.append(entry)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[dict]) -> "EntryColumns":
+        """ Build the columns from entries in any order, sorted by date """
+        entries = [ entry if isinstance(entry, Entry) else Entry(entry) for entry in entries ]
+        entries.sort(key=by_ordinal)
+
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len(self.cents)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ self[i] for i in range(*index.indices(len(self))) ]
+
+        strings = self.strings.strings
+        return Entry.from_row(strings[self.descriptions[index]], strings[self.dates[index]], self.cents[index] / 100, self.ordinals[index])
+
+    def __setitem__(self, index: int, entry: dict) -> None:
+        cents = _to_cents(entry["value"])
+        self.total_cents += cents - self.cents[index]
+
+        self.cents[index] = cents
+        self.ordinals[index] = entry.ordinal if isinstance(entry, Entry) else date_ordinal(entry["payment_date"])
+        self.descriptions[index] = self.strings.intern(entry["description"])
+        self.dates[index] = self.strings.intern(entry["payment_date"])
+
+    def __delitem__(self, index: int) -> None:
+        self.total_cents -= self.cents[index] if isinstance(index, int) else sum(self.cents[index])
+
+        for column in (self.cents, self.ordinals, self.descriptions, self.dates):
+            del column[index]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"EntryColumns({list(self)!r})"
+
+    def append(self, entry: dict) -> None:
+        self.insert(len(self), entry)
+
+    def insert(self, index: int, entry: dict) -> None:
+        cents = _to_cents(entry["value"])
+        self.total_cents += cents
+
+        self.cents.insert(index, cents)
+        self.ordinals.insert(index, entry.ordinal if isinstance(entry, Entry) else date_ordinal(entry["payment_date"]))
+        self.descriptions.insert(index, self.strings.intern(entry["description"]))
+        self.dates.insert(index, self.strings.intern(entry["payment_date"]))
+
+    def insort(self, entry: dict) -> int:
+        """ Insert in date order, after any entries from the same day, and return where it went """
+        ordinal = entry.ordinal if isinstance(entry, Entry) else date_ordinal(entry["payment_date"])
+        index = bisect_right(self.ordinals, ordinal)
+        self.insert(index, entry)
+
+        return index
+
+    def move(self, index: int, entry: dict) -> int:
+        """ Replace the entry at `index` and slide it to its date-sorted position; Lands exactly where a stable sort would put it """
+        ordinal = entry.ordinal if isinstance(entry, Entry) else date_ordinal(entry["payment_date"])
+        index = range(len(self))[index] # Normalise negative indices
+
+        # Still between its neighbours, so it can stay put
+        if (index == 0 or self.ordinals[index - 1] <= ordinal) and (index == len(self) - 1 or ordinal <= self.ordinals[index + 1]):
+            self[index] = entry
+            return index
+
+        moving_later = index < len(self) - 1 and ordinal > self.ordinals[index + 1]
+        del self[index]
+
+        if moving_later:
+            new_index = bisect_left(self.ordinals, ordinal, lo=index) # It goes ahead of the entries it now shares a day with
+        else:
+            new_index = bisect_right(self.ordinals, ordinal, hi=index) # It goes behind them
+
+        self.insert(new_index, entry)
+        return new_index
+
+    def pop(self, index: int = -1) -> Entry:
+        entry = self[index]
+        del self[index]
+
+        return entry
+
+    def sort(self, key=by_ordinal) -> None:
+        """ Stable sort, by date unless told otherwise """
+        order = sorted(range(len(self)), key=self.ordinals.__getitem__) if key is by_ordinal else sorted(range(len(self)), key=lambda i: key(self[i]))
+
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, (column[i] for i in order)))
+
+    def total(self) -> float:
+        return self.total_cents / 100
+
+    def description(self, index: int) -> str:
+        """ Just the description at `index`, without building the whole Entry """
+        return self.strings.strings[self.descriptions[index]]
+
+
+def to_entries(instances: Iterable[dict]) -> EntryColumns:
+    """ Pack raw entry dicts into sorted EntryColumns """
+    return EntryColumns.from_entries(instances)
+
+def entries_between(entries: EntryColumns, start_ordinal: int, end_ordinal: int) -> List[Entry]:
+    """ Entries dated within [start_ordinal, end_ordinal]; `entries` has to be sorted by date already """
+    low = bisect_left(entries.ordinals, start_ordinal)
+    high = bisect_right(entries.ordinals, end_ordinal, lo=low)
+
+    return entries[low:high]
@@ -0,0 +1,96 @@
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, TextIO
+
+from Utils.HistoryIndex import month_ordinal
+from Utils.LedgerEntry import date_ordinal, entries_between, ordinal_to_date
+
+EXPORT_FIELDS = ("month", "kind", "category", "date", "description", "amount")
+EXPORT_FORMATS = ("csv", "jsonl")
+
+
+def _months(ledger, start: Optional[int], end: Optional[int]) -> Iterator[tuple]:
+    """ (label, expenses, income) for every archived month overlapping [start, end] oldest first, then the current month """
+    first_month = month_ordinal(ordinal_to_date(start)) if start is not None else None
+    last_month = month_ordinal(ordinal_to_date(end)) if end is not None else None
+
+    def in_range(month: int) -> bool:
+        return (first_month is None or month >= first_month) and (last_month is None or month <= last_month)
+
+    archived = []
+    for label in ledger.get_expenses_history():
+        try:
+            archived.append((month_ordinal(datetime.strptime(label, "%B %Y")), label))
+        except ValueError:
+            continue # Not an archived month
+
+    # Months outside the range are skipped on their name alone, so they never get opened or parsed
+    for month, label in sorted(archived):
+        if in_range(month):
+            yield label, ledger.load_expense_history(label + ".json"), ledger.load_income_history(label + ".json")
+
+    if in_range(month_ordinal(datetime.now())):
+        yield datetime.now().strftime("%B %Y"), ledger.get_current_expenses(), ledger.get_current_income()
+
+def export_rows(ledger, start_date: Optional[str] = None, end_date: Optional[str] = None, categories: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+    """
+    Every entry of the current month and of every archived month as flat rows (see EXPORT_FIELDS), one month at a time.
+    Dates are 'DD-MM-YYYY' and inclusive; Filters are applied before anything gets read: by month name for the date
+    range, by category before a category's entries are touched, and by bisecting the date-sorted entries.
+    """
+    start = date_ordinal(start_date) if start_date else None
+    end = date_ordinal(end_date) if end_date else None
+    wanted = set(categories) if categories else None
+
+    for label, expenses, income in _months(ledger, start, end):
+        for kind, ledger_half in (("expense", expenses), ("income", income)):
+            for name, info in ledger_half.items():
+                if wanted is not None and name not in wanted:
+                    continue
+
+                entries = info["entries"]
+                if start is not None or end is not None:
+                    entries = entries_between(entries, start if start is not None else 0, end if end is not None else sys.maxsize)
+
+                for entry in entries:
+                    yield {
+                        "month": label,
+                        "kind": kind,
+                        "category": name,
+                        "date": entry["payment_date"],
+                        "description": entry["description"],
+                        "amount": entry["value"],
+                    }
+
+def write_csv(rows: Iterable[Dict], file: TextIO) -> int:
+    writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+
+    return count
+
+def write_jsonl(rows: Iterable[Dict], file: TextIO) -> int:
+    count = 0
+    for row in rows:
+        file.write(json.dumps(row, separators=(",", ":")) + "\n")
+        count += 1
+
+    return count
+
+def export_ledger(ledger, path: str, format: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, categories: Optional[Iterable[str]] = None) -> int:
+    """ Write the filtered rows to `path` as CSV or JSONL (picked from the extension unless given); Returns the row count """
+    format = format or ("jsonl" if os.path.splitext(path)[1].lower() in (".jsonl", ".json") else "csv")
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{format}', expected one of {', '.join(EXPORT_FORMATS)}")
+
+    rows = export_rows(ledger, start_date, end_date, categories)
+
+    with open(path, "w", newline="") as file:
+        return write_csv(rows, file) if format == "csv" else write_jsonl(rows, file)
@@ -0,0 +1,58 @@
+import json
+import os
+from typing import Dict, Iterable, List
+
+from Utils.LedgerCommit import append_file
+from Utils.Profiling import profiler
+
+
+class LedgerJournal:
+    """ Append-only log of ledger mutations, one compact JSON record per line """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def append(self, records: List[Dict]) -> bool:
+        # One write and one fsync however many records a transaction produced
+        return append_file(self.path, self.encode(records))
+
+    def encode(self, records: List[Dict]) -> str:
+        return "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+
+    def read(self) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+
+        profiler.count_file_read(self.path)
+
+        with open(self.path) as file:
+            return self.decode(file)
+
+    def decode(self, lines: Iterable[str]) -> List[Dict]:
+        records = []
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break # A torn final write; everything before it is still intact
+
+        return records
+
+    def truncate(self) -> bool:
+        try:
+            with open(self.path, "w"):
+                pass
+
+        except Exception as e:
+            print(f"Failed to truncate journal: {e}")
+            return False
+
+        return True
+
+    def is_empty(self) -> bool:
+        return not os.path.exists(self.path) or os.path.getsize(self.path) == 0
@@ -1,121 +1,154 @@
-import json
 import os
 import shutil
 import glob
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
-from typing import Dict, List
+from functools import wraps
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
 
+from Utils.HistoryCache import HistoryCache
+from Utils.HistoryIndex import HistoryIndex, aggregate_months, month_ordinal, window_cutoff
+from Utils.LedgerCodec import DEFAULT_CODEC, get_codec, load as load_document
+from Utils.LedgerCommit import atomic_commit, recover_commit
+from Utils.LedgerEntry import EntryColumns, date_ordinal, ordinal_to_date, to_entries
+from Utils.LedgerJournal import LedgerJournal
+from Utils.LedgerWriter import LedgerWriter
+from Utils.Profiling import profiled, profiler
+from Utils.SearchIndex import SearchIndex
+
+
+def transactional(method):
+    """ Run a ledger method inside LedgerStore.transaction(), so everything it changes lands in one commit """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.transaction():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+@profiled
 class LedgerStore:
     HISTORY_PATH = "History"
-    def __init__(self) -> None:
+    SEARCH_INDEX_PATH = "SearchIndex"
+    JOURNAL_COMPACT_THRESHOLD = 500 # Fold the journal back into the snapshot files once it grows past this many records
+
+    def __init__(
+        self,
+        journal: bool = False,
+        background_writes: bool = False,
+        debug: bool = bool(os.environ.get("FINANCE_TRACKER_DEBUG")),
+        codec: str = os.environ.get("FINANCE_TRACKER_CODEC", DEFAULT_CODEC),
+    ) -> None:
         self.current_month_json = "current_expenses.json"
         self.current_income_json= "current_income.json"
         self.current_balance_json = "current_balance.json"
         self.current_savings_json = "current_savings.json"
+        self.journal_jsonl = "ledger_journal.jsonl"
+        self.commit_json = "ledger_commit.json"
+        self.history_index_json = "history_index.json"
+
+        self._init_state(debug, codec)
+
+        # In journal mode each mutation appends one record to the journal instead of rewriting the JSON files
+        self.journal_mode = journal
+        self.journal = LedgerJournal(self.journal_jsonl)
+        self.history_index = HistoryIndex(self.HISTORY_PATH, self.history_index_json)
+
+        # With background writes the disk work is handed to a writer thread; Call flush() or close() to wait for it
+        self.writer = LedgerWriter(self.commit_json) if background_writes else None
+
+        recover_commit(self.commit_json) # Finish off a commit that got interrupted last time, if any
+        self._load_ledger()
+
+    def _init_state(self, debug: bool, codec: str) -> None:
+        """ The in-memory side every backend shares; Nothing here touches the disk """
+        # How the JSON files and History/ get written: "json" (pretty-printed), "json-min" or "binary". The names stay
+        # the same whatever the format, and every format is detected on load, so switching only changes what gets written next
+        self.codec = get_codec(codec)
+
+        self.history_cache = HistoryCache() # Both history views parse a month once and share it
+        self.search_index = SearchIndex(self, self.SEARCH_INDEX_PATH) # Only read on the first search
+
+        # Mutations made inside transaction() wait here and get persisted together
+        self._transaction_depth = 0
+        self._pending_records = []
+
+        # Running totals in cents, kept up to date by every mutation; Debug mode re-adds everything to check them
+        self.debug = debug
+        self._total_cents = { "expense": 0, "income": 0 }
 
+        # Held while the in-memory ledger changes, so worker threads (searches) can take a consistent look at it
+        self.lock = threading.RLock()
+
+        # Called with the part of the ledger that just changed: "expense", "income", "balance", "savings" or "history"
+        self.change_listeners: List[Callable[[str], None]] = []
+
+    def _load_ledger(self) -> None:
+        """ Read the current month in, bring it up to date and archive it if a new month has started """
         self.check_first_time_loading() # If user has ran the application before, they'd have the json files, otherwise, create them
 
-        self.current_expenses = self.load_current_expenses() if not self.is_json_file_empty(self.current_month_json) else {}
-        self.current_income = self.load_current_income() if not self.is_json_file_empty(self.current_income_json) else {}
+        self.current_expenses = self.load_current_expenses()
+        self.current_income = self.load_current_income()
         self.current_balance = self.load_current_balance()
         self.current_savings = self.load_current_savings()
+        self._recount_totals()
+
+        self._replay_journal() # The JSON files are only a snapshot; apply anything logged after it was taken
 
         self._check_new_month_from_entries() # Check if a new month or year has passed (Probably really only need to check month but ehh)
 
     def check_first_time_loading(self):
         """ Check if the user has the data files """
 
+        missing = {}
         if not os.path.exists(self.current_month_json):
-            with open(self.current_month_json, "w") as file:
-                json.dump({}, file, indent=4)
+            missing[self.current_month_json] = self._dump({})
         
         if not os.path.exists(self.current_income_json):
-            with open(self.current_income_json, "w") as file:
-                json.dump({}, file, indent=4)
+            missing[self.current_income_json] = self._dump({})
 
         if not os.path.exists(self.current_balance_json):
-            with open(self.current_balance_json, "w") as file:
-                json.dump({"Balance": 0}, file, indent=4)
+            missing[self.current_balance_json] = self._dump({"Balance": 0})
         
         if not os.path.exists(self.current_savings_json):
-            with open(self.current_savings_json, "w") as file:
-                json.dump({"Savings": 0}, file, indent=4)
+            missing[self.current_savings_json] = self._dump({"Savings": 0})
+
+        for path, content in missing.items():
+            with open(path, "wb" if isinstance(content, bytes) else "w") as file:
+                file.write(content)
 
 
 
     def load_current_expenses(self) -> Dict:
-        expenses = {}
+        if self.is_json_file_empty(self.current_month_json):
+            return {}
 
         try:
-            with open(self.current_month_json) as file:
-                data = json.load(file)
-        except (json.JSONDecodeError, FileNotFoundError):
+            data = load_document(self.current_month_json)
+        except (ValueError, FileNotFoundError):
             return {}
 
-        with open(self.current_month_json) as file:
-            data = json.load(file)
-
-            for expense, instances in data.items():
+        profiler.count_file_read(self.current_month_json)
 
-                # Sort entries by date
-                instances.sort( key=lambda x: datetime.strptime(x["payment_date"], "%d-%m-%Y") )
-
-                cur_sum = sum(entry["value"] for entry in instances)
-
-                expenses[expense] = {
-                    "entries": instances,
-                    "value": cur_sum,
-                }
-
-        return expenses
+        return self._ledger_from_document(data)
 
     def load_expense_history(self, filename: str) -> Dict:
-        history_filename = os.path.join(self.HISTORY_PATH, filename)
-        expenses = {}
-
-        with open(history_filename) as file:
-            data = json.load(file)['Expense']
-
-            for expense, instances in data.items():
-
-                # Sort entries by date
-                instances.sort( key=lambda x: datetime.strptime(x["payment_date"], "%d-%m-%Y") )
-
-                cur_sum = sum(entry["value"] for entry in instances)
-
-                expenses[expense] = {
-                    "entries": instances,
-                    "value": cur_sum,
-                }
-
-        return expenses
+        """ One archived month's expenses; Shared with the cache, so treat it as read-only """
+        return self.history_cache.get(os.path.join(self.HISTORY_PATH, filename), self._parse_history_month)['Expense']
     
     def load_income_history(self, filename: str) -> Dict:
-        history_filename = os.path.join(self.HISTORY_PATH, filename)
-        expenses = {}
-
-        with open(history_filename) as file:
-            data = json.load(file)['Income']
-
-            for expense, instances in data.items():
-
-                # Sort entries by date
-                instances.sort( key=lambda x: datetime.strptime(x["payment_date"], "%d-%m-%Y") )
-
-                cur_sum = sum(entry["value"] for entry in instances)
-
-                expenses[expense] = {
-                    "entries": instances,
-                    "value": cur_sum,
-                }
-
-        return expenses
+        """ One archived month's income; Shared with the cache, so treat it as read-only """
+        return self.history_cache.get(os.path.join(self.HISTORY_PATH, filename), self._parse_history_month)['Income']
     
     def load_current_balance(self) -> float:
         try:
-            with open(self.current_balance_json) as file:
-                balance = json.load(file)['Balance']
+            balance = load_document(self.current_balance_json)['Balance']
+
+            profiler.count_file_read(self.current_balance_json)
         except Exception as e:
             print(f"Failed to load balance: {e}")
             balance = 0.0
@@ -124,8 +157,9 @@ class LedgerStore:
     
     def load_current_savings(self) -> float:
         try:
-            with open(self.current_savings_json) as file:
-                savings = json.load(file)['Savings']
+            savings = load_document(self.current_savings_json)['Savings']
+
+            profiler.count_file_read(self.current_savings_json)
         except Exception as e:
             print(f"Failed to load Savings: {e}")
             savings = 0.0
@@ -133,103 +167,64 @@ class LedgerStore:
         return savings
 
     def load_current_income(self) -> Dict:
-        expenses = {}
+        if self.is_json_file_empty(self.current_income_json):
+            return {}
 
         try:
-            with open(self.current_income_json) as file:
-                data = json.load(file)
-        except (json.JSONDecodeError, FileNotFoundError):
+            data = load_document(self.current_income_json)
+        except (ValueError, FileNotFoundError):
             return {}
 
-        with open(self.current_income_json) as file:
-            data = json.load(file)
+        profiler.count_file_read(self.current_income_json)
 
-            for expense, instances in data.items():
-                # Sort entries by date
-                instances.sort( key=lambda x: datetime.strptime(x["payment_date"], "%d-%m-%Y") )
+        return self._ledger_from_document(data)
 
-                cur_sum = sum(entry["value"] for entry in instances)
+    def _ledger_from_document(self, data: Dict) -> Dict:
+        """ {category: [entry, ...]} as stored, to the {category: {"entries", "value"}} the ledger works on """
+        ledger = {}
 
-                expenses[expense] = {
-                    "entries": instances,
-                    "value": cur_sum,
-                }
+        for name, instances in data.items():
+            # Sort entries by date; Each date only gets parsed once, here
+            instances = to_entries(instances)
 
-        return expenses
-    
-    def save_current_balance(self) -> bool:
-        try:
-            with open(self.current_balance_json, "w") as file:
-                json.dump({"Balance": self.current_balance}, file, indent=4)
+            ledger[name] = {
+                "entries": instances,
+                "value": instances.total(),
+            }
 
-        except Exception as e:
-            print(f"Failed to save balance: {e}")
-            return False
-        
-        return True
+        return ledger
+
+    def save_current_balance(self) -> bool:
+        return self._commit({ self.current_balance_json: self._dump({"Balance": self.current_balance}) })
     
     def save_current_savings(self) -> bool:
-        try:
-            with open(self.current_savings_json, "w") as file:
-                json.dump({"Savings": self.current_savings}, file, indent=4)
-
-        except Exception as e:
-            print(f"Failed to save savings: {e}")
-            return False
-        
-        return True
+        return self._commit({ self.current_savings_json: self._dump({"Savings": self.current_savings}) })
 
     def save_current_expenses(self, is_history=False) -> bool:
-        try:
-            # Create a new dict in the original format
-            data_to_save = {
-                service: info["entries"] if isinstance(info, dict) else info
-                for service, info in self.current_expenses.items()
-            }
-
-            if is_history:
-                temp = data_to_save
-                income = {
-                    service: info["entries"] if isinstance(info, dict) else info
-                    for service, info in self.current_income.items()
-                }
-
-                total_expenses = self.get_total_expenses()
-                total_income = self.get_total_income()
-                data_to_save = {
-                    'Expense': temp,
-                    'Income': income,
-                    'Total Expenses': total_expenses,
-                    'Total Income': total_income,
-                    'Balance': self.current_balance,
-                    'Savings': self.current_savings
-                }
-
-            with open(self.current_month_json, "w") as file:
-                json.dump(data_to_save, file, indent=4)
-
-        except Exception as e:
-            print(f"Failed to save file: {e}")
-            return False
-
-        return True
+        return self._commit({ self.current_month_json: self._dump(self._expenses_document(is_history)) })
     
     def save_current_income(self) -> bool:
+        return self._commit({ self.current_income_json: self._dump(self._income_document()) })
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group every mutation made inside the block into a single commit, e.g.
+            with ledger.transaction():
+                ledger.add_new_expense_entry(...)
+                ledger.update_current_balance(...)
+        Transactions nest; Only the outermost one commits.
+        """
+        self._transaction_depth += 1
         try:
-            # Create a new dict in the original format
-            data_to_save = {
-                service: info["entries"] if isinstance(info, dict) else info
-                for service, info in self.current_income.items()
-            }
-            with open(self.current_income_json, "w") as file:
-                json.dump(data_to_save, file, indent=4)
-
-        except Exception as e:
-            print(f"Failed to save file: {e}")
-            return False
-
-        return True
+            yield self
+        finally:
+            self._transaction_depth -= 1
 
+            # Whatever got applied in memory has to reach the disk too, even if the block raised halfway
+            if self._transaction_depth == 0 and self._pending_records:
+                records, self._pending_records = self._pending_records, []
+                self._persist(records)
 
     def get_current_expenses(self):
         return self.current_expenses
@@ -250,21 +245,54 @@ class LedgerStore:
         
         return entries
 
-    def get_total_expenses(self) -> float:
-        total = 0
-        for _, content in self.current_expenses.items(): 
-            total += content['value']
+    def history_fingerprint(self, label: str):
+        """ Changes whenever an archived month's contents could have; The search index re-reads a month when it does """
+        try:
+            stat = os.stat(os.path.join(self.HISTORY_PATH, label + ".json"))
+        except FileNotFoundError:
+            return None
+
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def search(self, text: str, limit: Optional[int] = None) -> Iterator[Dict]:
+        """ Ranked matches for `text` across the current month and all history, as export_rows()-style rows, best first """
+        return self.search_index.search(text, limit)
+
+    def query(
+        self, kind: Optional[str] = None, category: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None,
+        min_amount: Optional[float] = None, max_amount: Optional[float] = None, limit: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Entries of the current month and all history matching every filter given, oldest month first, as export_rows()-style
+        rows. Answered from the search index's per-month, per-category columns, so no History/ file is opened to do it.
+        """
+        return self.search_index.query(kind, category, date_from, date_to, min_amount, max_amount, limit)
 
-        return total
+    def get_total_expenses(self) -> float:
+        return self._total_cents["expense"] / 100
     
     def get_total_income(self) -> float:
-        total = 0
-        for _, content in self.current_income.items(): 
-            total += content['value']
+        return self._total_cents["income"] / 100
+
+    def verify_totals(self) -> None:
+        """ Recompute every total from the entries themselves and fail loudly if a running total drifted """
+        for kind, ledger in (("expense", self.current_expenses), ("income", self.current_income)):
+            grand_total = 0
 
-        return total
+            for name, info in ledger.items():
+                entries = info["entries"]
+                actual = sum(entries.cents)
 
-    def add_new_expense(self, expense) -> None:
+                if entries.total_cents != actual or info["value"] != actual / 100:
+                    raise AssertionError(f"{kind} '{name}' total is off: running {entries.total_cents}, stored {info['value']}, actual {actual}")
+
+                grand_total += actual
+
+            if self._total_cents[kind] != grand_total:
+                raise AssertionError(f"Total {kind} is off: running {self._total_cents[kind]}, actual {grand_total}")
+
+    @transactional
+    def add_new_expense(self, expense) -> int:
         '''
         "Name": name,
         "Description": description,
@@ -281,26 +309,16 @@ class LedgerStore:
             'value': amount
         }
 
-        if name in self.current_expenses:
-            self.current_expenses[name]['entries'].append(new_entry)
-
-            cur_sum = 0
-            for entry in self.current_expenses[name]['entries']:
-                cur_sum += entry['value']
-
-            self.current_expenses[name]['value'] = cur_sum
-
-        else:
-            self.current_expenses[name] = {}
-            self.current_expenses[name]['entries'] = [new_entry]
-            self.current_expenses[name]['value'] = amount
+        index = self._mutate({"op": "add", "kind": "expense", "name": name, "entry": new_entry})
 
         if name == "Savings": self.update_current_savings(new_entry['value'])
 
-        self.save_current_expenses()
         self.update_current_balance(amount)
 
-    def add_new_income(self, income) -> None:
+        return index
+
+    @transactional
+    def add_new_income(self, income) -> int:
         '''
         "Name": name,
         "Description": description,
@@ -317,86 +335,83 @@ class LedgerStore:
             'value': amount
         }
 
-        if name in self.current_income:
-            self.current_income[name]['entries'].append(new_entry)
-
-            cur_sum = 0
-            for entry in self.current_income[name]['entries']:
-                cur_sum += entry['value']
-
-            self.current_income[name]['value'] = cur_sum
-
-        else:
-            self.current_income[name] = {}
-            self.current_income[name]['entries'] = [new_entry]
-            self.current_income[name]['value'] = amount
+        index = self._mutate({"op": "add", "kind": "income", "name": name, "entry": new_entry})
 
         # If income goes up, and it has something to do with savings, then it's most likely a savings withdrawal
         if "Savings" in name: self.update_current_savings(-amount)
 
-        self.save_current_income()
         self.update_current_balance(-amount) # Negative here since we want balance to go up
 
-    def add_new_expense_entry(self, title, new_entry) -> None:
+        return index
+
+    @transactional
+    def add_new_expense_entry(self, title, new_entry) -> int:
         '''
         "Name": description,
         "Payment Date": date,
         "Amount": float(amount)
         '''
-        self.current_expenses[title]['entries'].append(new_entry)
-
-        # Sort list of entries in case the new entry is from an earlier date
-        self.current_expenses[title]['entries'].sort( key=lambda x: datetime.strptime(x["payment_date"], "%d-%m-%Y") )
-
-        # Running sum; Should be more accurate this way
-        self.current_expenses[title]['value'] = sum( entry['value'] for entry in self.current_expenses[title]['entries'] )
+        index = self._mutate({"op": "add", "kind": "expense", "name": title, "entry": new_entry})
 
         if title == "Savings": self.update_current_savings(new_entry['value'])
 
-        self.save_current_expenses()
         self.update_current_balance(new_entry['value'])
 
-    def add_new_income_entry(self, title, new_entry) -> None:
+        return index # Where the entry landed in the date-sorted list
+
+    @transactional
+    def add_new_income_entry(self, title, new_entry) -> int:
         '''
         "Name": description,
         "Payment Date": date,
         "Amount": float(amount)
         '''
-        self.current_income[title]['entries'].append(new_entry)
-
-        # Sort list of entries in case the new entry is from an earlier date
-        self.current_income[title]['entries'].sort( key=lambda x: datetime.strptime(x["payment_date"], "%d-%m-%Y") )
-
-        # Running sum; Should be more accurate this way
-        self.current_income[title]['value'] = sum( entry['value'] for entry in self.current_income[title]['entries'] )
+        index = self._mutate({"op": "add", "kind": "income", "name": title, "entry": new_entry})
 
-        self.save_current_income()
         self.update_current_balance(-new_entry['value']) # Negative since we want balance to go up
+
+        return index # Where the entry landed in the date-sorted list
     
+    @transactional
     def remove_expense(self, expense) -> None:
         expense_total = self._get_entry_total(self.current_expenses, expense)
-        del self.current_expenses[expense]
+        self._mutate({"op": "drop", "kind": "expense", "name": expense})
 
         if expense == 'Savings': self.update_current_savings(-expense_total)
-        self.save_current_expenses()
         self.update_current_balance(-expense_total) # Negative since we want balance to go up
 
+    @transactional
     def remove_income(self, income) -> None:
         income_total = self._get_entry_total(self.current_income, income)
-        del self.current_income[income]
+        self._mutate({"op": "drop", "kind": "income", "name": income})
 
         if "Savings" in income:
             self.update_current_savings(-income_total)
 
-        self.save_current_income()
         self.update_current_balance(income_total) # Positive since we want balance to go down
 
+    @transactional
+    def remove_expense_entry(self, expense: str, index: int) -> None:
+        deleted_entry = self.current_expenses[expense]["entries"][index]
+        self._mutate({"op": "pop", "kind": "expense", "name": expense, "index": index})
+
+        self.update_current_balance(-deleted_entry["value"]) # Negative since we want balance to go up
+        if expense == 'Savings': self.update_current_savings(-deleted_entry["value"])
+
+    @transactional
+    def remove_income_entry(self, income: str, index: int) -> None:
+        deleted_entry = self.current_income[income]["entries"][index]
+        self._mutate({"op": "pop", "kind": "income", "name": income, "index": index})
+
+        self.update_current_balance(deleted_entry["value"]) # Positive since we want balance to go down
+
     def load_past_expenses(self, filename) -> Dict:
         data = {}
         filename += ".json"
         try:
-            with open(os.path.join("History", filename)) as file:
-                data = json.load(file)
+            data = load_document(os.path.join("History", filename))
+
+            profiler.count_file_read(os.path.join("History", filename))
 
         except Exception as e:
             print(f"Failed to load {filename}: {e}")
@@ -407,8 +422,9 @@ class LedgerStore:
         data = {}
         filename += ".json"
         try:
-            with open(os.path.join("History", filename)) as file:
-                data = json.load(file)
+            data = load_document(os.path.join("History", filename))
+
+            profiler.count_file_read(os.path.join("History", filename))
 
         except Exception as e:
             print(f"Failed to load {filename}: {e}")
@@ -417,108 +433,167 @@ class LedgerStore:
 
     def update_current_balance(self, expense_cost) -> float:
         # Should work for both positive and negative values
-        self.current_balance -= expense_cost
-        self.save_current_balance()
+        self._mutate({"op": "balance", "value": self.current_balance - expense_cost})
 
         return self.current_balance
 
     def update_current_savings(self, savings_change) -> float:
         # Should work for both positive and negative values
-        self.current_savings += savings_change
-        self.save_current_savings()
+        self._mutate({"op": "savings", "value": self.current_savings + savings_change})
 
         return self.current_savings
     
-    def update_expense_entry(self, expense: str, index: int, updated_entry: dict) -> None:
-        # Add old total to balance; We'll reduce it with new amount later
+    @transactional
+    def update_expense_entry(self, expense: str, index: int, updated_entry: dict) -> int:
         old_total = self._get_entry_total(self.current_expenses, expense)
-        self.update_current_balance(-old_total)
 
-        # Update the entry
-        self.current_expenses[expense]["entries"][index] = updated_entry
-        self.current_expenses[expense]["entries"].sort( key=lambda x: datetime.strptime(x["payment_date"], "%d-%m-%Y") ) # Sort the entry since date could be updated too
+        # Update the entry; It gets moved since the date could be updated too
+        new_index = self._mutate({"op": "edit", "kind": "expense", "name": expense, "index": index, "entry": updated_entry})
 
-        # Update the expense with new total
+        # Give back the old total and take the new one in a single balance change
         new_total = self._get_entry_total(self.current_expenses, expense)
-        self.update_current_balance(new_total)
-        self.current_expenses[expense]["value"] = new_total
-
-        self.save_current_expenses()
+        self.update_current_balance(new_total - old_total)
 
         # If the expense is Savings, we can simply just store the value since they should behave the same anyways
         if expense == 'Savings': 
-            self.current_savings = new_total
-            self.save_current_savings()
+            self._mutate({"op": "savings", "value": new_total})
+
+        return new_index # Where the entry landed in the date-sorted list
 
-    def update_income_entry(self, income: str, index: int, updated_entry: dict) -> None:
-        # Add old total to balance; We'll reduce it with new amount later
+    @transactional
+    def update_income_entry(self, income: str, index: int, updated_entry: dict) -> int:
         old_total = self._get_entry_total(self.current_income, income)
-        self.update_current_balance(-old_total)
 
-        # Update the entry
-        self.current_income[income]["entries"][index] = updated_entry
-        self.current_income[income]["entries"].sort( key=lambda x: datetime.strptime(x["payment_date"], "%d-%m-%Y") ) # Sort the entry since date could be updated too
+        # Update the entry; It gets moved since the date could be updated too
+        new_index = self._mutate({"op": "edit", "kind": "income", "name": income, "index": index, "entry": updated_entry})
 
-        # Update the income with new total
+        # Give back the old total and take the new one in a single balance change
         new_total = self._get_entry_total(self.current_income, income)
-        self.update_current_balance(new_total)
-        self.current_income[income]["value"] = new_total
+        self.update_current_balance(new_total - old_total)
+
+        return new_index # Where the entry landed in the date-sorted list
+
+    def import_entries(self, rows: Iterable[Dict]) -> int:
+        """
+        Bulk-add entries, e.g. a bank statement: rows are {"kind", "name", "entry"} like an "add" record. Everything is
+        appended first, each touched category is sorted once, and the whole ledger is saved in a single commit.
+        Balance and savings move the same way add_new_expense()/add_new_income() would move them. Returns the row count.
+        Every row is checked before any of them is applied, so a bad one raises ValueError with the ledger untouched.
+        """
+        if self._transaction_depth:
+            raise RuntimeError("import_entries() saves a full snapshot, so it can't run inside a transaction")
+
+        rows = self._validate_rows(rows)
+        touched = set()
+        count = 0
+        with self.lock:
+
+            for kind, name, entry in rows:
+                ledger = self.current_expenses if kind == "expense" else self.current_income
 
-        self.save_current_income()
+                if name not in ledger:
+                    ledger[name] = { "entries": EntryColumns(), "value": 0 }
 
+                ledger[name]["entries"].append(entry)
+                self.search_index.add_entry(kind, name, entry)
+                touched.add((kind, name))
+                count += 1
+
+                if kind == "expense":
+                    if name == "Savings": self.current_savings += entry["value"]
+                    self.current_balance -= entry["value"]
+                else:
+                    if "Savings" in name: self.current_savings -= entry["value"] # Most likely a savings withdrawal
+                    self.current_balance += entry["value"]
+
+            if not count:
+                return 0
+
+            for kind, name in touched:
+                info = (self.current_expenses if kind == "expense" else self.current_income)[name]
+                info["entries"].sort() # Stable, so imported entries go after existing ones from the same day
+                info["value"] = info["entries"].total()
+
+            self._recount_totals()
+
+        if self.debug: self.verify_totals()
+
+        self.checkpoint() # One save for the lot; The journal starts over from this snapshot
+
+        for area in {kind for kind, _ in touched} | {"balance", "savings"}:
+            self._notify(area)
+
+        return count
+
+    def _validate_rows(self, rows: Iterable[Dict]) -> List[tuple]:
+        """ (kind, name, entry) for every row, or ValueError naming the first bad one; Reads `rows` to the end first """
+        current_month = month_ordinal(datetime.now())
+        validated = []
+
+        for number, row in enumerate(rows, start=1):
+            try:
+                kind, name, entry = row["kind"], row["name"], row["entry"]
+                if kind not in ("expense", "income"):
+                    raise ValueError(f"unknown kind '{kind}'")
+                if not isinstance(name, str) or not name:
+                    raise ValueError("no category")
+
+                entry = { "description": str(entry["description"]), "payment_date": entry["payment_date"], "value": float(entry["value"]) }
+                payment_date = ordinal_to_date(date_ordinal(entry["payment_date"]))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Row {number} can't be imported: {e}")
+
+            # The ledger archives itself as soon as it holds an entry from another month
+            if month_ordinal(payment_date) != current_month:
+                raise ValueError(f"Row {number} can't be imported: {entry['payment_date']} isn't in the current month")
+
+            validated.append((kind, name, entry))
+
+        return validated
+
+    def flush(self) -> None:
+        """ Wait for any writes still queued on the writer thread """
+        if self.writer:
+            self.writer.flush()
+
+    def close(self) -> None:
+        """ Flush and stop the writer thread; Call this before the process exits """
+        if self.writer:
+            self.writer.close()
+
+    def checkpoint(self) -> bool:
+        """ Write a full snapshot of the ledger and start an empty journal, all in one commit """
+        return self._commit({
+            self.current_month_json: self._dump(self._expenses_document()),
+            self.current_income_json: self._dump(self._income_document()),
+            self.current_balance_json: self._dump({"Balance": self.current_balance}),
+            self.current_savings_json: self._dump({"Savings": self.current_savings}),
+            self.journal_jsonl: "",
+        })
 
     def is_json_file_empty(self, json_file):
         return os.path.getsize(json_file) == 0
     
-    def get_history_dataset(self):
-        entries = []
-        
-        now = datetime.now()
-
-        # Go back 11 months
-        year = now.year
-        month = now.month - 11
-        while month <= 0:
-            month += 12
-            year -= 1
-            
-        cutoff_date = datetime(year, month, 1)
-
-        for entry in glob.glob("History/*"):
-            full_date = entry.split('/')[-1].split('.')[0]
-            date_obj = datetime.strptime(full_date, "%B %Y")
-
-            if date_obj >= cutoff_date:
-                with open(entry) as file:
-                    temp_data = json.load(file)
-
-                entries.append({
-                    "date_obj": date_obj,
-                    "Date": date_obj.strftime("%b %Y"),
-                    "Balance": temp_data["Balance"],
-                    "Total Expenses": temp_data["Total Expenses"],
-                    "Total Income": temp_data["Total Income"],
-                    "Savings": temp_data["Savings"]
-                })
-
-        # Sort by date
-        entries.sort(key=lambda x: x["date_obj"])
-
-        # Remove helper key
-        for e in entries:
-            del e["date_obj"]
-
-        return entries
+    def get_history_dataset(self, window: str = "12M", bucket: str = "month") -> List[Dict]:
+        """
+        Dashboard rows for the last `window` of months ("3M", "12M", "5Y" or "All"), the current month included,
+        bucketed by "month", "quarter" or "year".
+        """
+        # Streams from the summary index, one month at a time; Only months whose file changed since they were indexed get opened
+        months = self.history_index.iter_summaries(since=window_cutoff(window))
+        return list(aggregate_months(chain(months, [self._current_summary()]), bucket))
+
+    def _current_summary(self) -> Dict:
+        return {
+            "month": month_ordinal(datetime.now()),
+            "Balance": self.current_balance,
+            "Total Expenses": self.get_total_expenses(),
+            "Total Income": self.get_total_income(),
+            "Savings": self.current_savings
+        }
     
     def _get_entry_total(self, entry_to_check, expense_name) -> float:
-        current_sum = 0
-
-        entries = entry_to_check[expense_name]["entries"]
-
-        for entry in entries:
-            current_sum += entry["value"]
-
-        return current_sum
+        return entry_to_check[expense_name]["entries"].total()
 
     def _check_new_month_from_entries(self):
         if not self.current_expenses:
@@ -528,8 +603,12 @@ class LedgerStore:
         current_month = today.month
         current_year = today.year
 
-        # Find the earliest payment date across all categories
-        earliest_payment = min( datetime.strptime(payments['entries'][0]["payment_date"], "%d-%m-%Y") for payments in self.current_expenses.values() if payments )
+        # Find the earliest payment date across all categories; Entries are sorted, so it's the first one of each
+        earliest_ordinal = min( (payments['entries'][0].ordinal for payments in self.current_expenses.values() if payments['entries']), default=None )
+        if earliest_ordinal is None:
+            return
+
+        earliest_payment = ordinal_to_date(earliest_ordinal)
 
         # If the month or year is different from the current time, then we reset the Ledger; Time can only go forward after all
         if earliest_payment.month != current_month or earliest_payment.year != current_year:
@@ -537,7 +616,21 @@ class LedgerStore:
 
     def _reset_ledger(self):
         if self.current_expenses:
-            self.save_current_expenses(is_history=True) # Optional flag that lets us store Balance and Savings
+            # The history document is a full snapshot of the month, so the journal gets emptied in the same commit; Otherwise a
+            # crash after the rename below would replay the old month's records onto the new one
+            files = { self.current_month_json: self._dump(self._expenses_document(is_history=True)) }
+            if self.journal_mode or not self.journal.is_empty():
+                files[self.journal_jsonl] = ""
+
+            self._commit(files)
+            self.flush() # The file is about to be moved, so it has to actually be written first
+
+            summary = {
+                "Balance": self.current_balance,
+                "Total Expenses": self.get_total_expenses(),
+                "Total Income": self.get_total_income(),
+                "Savings": self.current_savings
+            }
 
             today = datetime.today()
             last_month = today - relativedelta(months=1) # Get 1 month before
@@ -546,12 +639,227 @@ class LedgerStore:
             try:
                 os.rename(self.current_month_json, history_filename) # Rename old 'current_expenses.json' to '{Month} {Year}.json'
                 shutil.move(history_filename, os.path.join(self.HISTORY_PATH, history_filename)) # Move the file to history folder
-                self.current_expenses = {} # Reset current expenses
-                self.current_income = {}
-                self.save_current_expenses() # Save the empty dict
+                self.history_index.record(history_filename, summary) # So the dashboard never has to open it
+                with self.lock:
+                    self.search_index.archive(last_month.strftime("%B %Y")) # Still has the month's entries to hand
+                    self.current_expenses = {} # Reset current expenses
+                    self.current_income = {}
+                    self._recount_totals()
+
+                self._notify("history")
+
+                # The journal only describes the month that was just archived, so it gets emptied along with the ledger
+                if self.journal_mode or not self.journal.is_empty():
+                    self.checkpoint()
+                else:
+                    self.save_current_expenses() # Save the empty dict
+
+                self.flush()
 
             except Exception as e:
                 print(f"Something went wrong, general exception caught: {e}")
 
+    def _mutate(self, record: Dict):
+        """ Apply a mutation to the in-memory ledger and persist it, or hold on to it until the transaction commits """
+        with self.lock:
+            index = self._apply(record)
+
+        if self.debug: self.verify_totals()
+        self._notify(record.get("kind", record["op"]))
+
+        if self._transaction_depth:
+            self._pending_records.append(record)
+        else:
+            self._persist([record])
+
+        return index
+
+    def _notify(self, area: str) -> None:
+        for listener in self.change_listeners:
+            listener(area)
+
+    def _persist(self, records: List[Dict]) -> None:
+        """ Write already applied records out; Journal mode appends them, otherwise the touched files are rewritten """
+        if self.journal_mode:
+            if self.writer:
+                self.writer.submit(appends={ self.journal_jsonl: self.journal.encode(records) })
+            else:
+                self.journal.append(records)
+            return
+
+        ops = {record["op"] for record in records}
+        kinds = {record["kind"] for record in records if "kind" in record}
+
+        # One commit for every file the records touched
+        files = {}
+        if "expense" in kinds: files[self.current_month_json] = self._dump(self._expenses_document())
+        if "income" in kinds: files[self.current_income_json] = self._dump(self._income_document())
+        if "balance" in ops: files[self.current_balance_json] = self._dump({"Balance": self.current_balance})
+        if "savings" in ops: files[self.current_savings_json] = self._dump({"Savings": self.current_savings})
+
+        self._commit(files)
+
+    def _commit(self, files: Dict[str, str]) -> bool:
+        if self.writer:
+            self.writer.submit(files=files)
+            return True
+
+        return atomic_commit(files, self.commit_json)
+
+    def _dump(self, data) -> Union[str, bytes]:
+        return self.codec.encode(data)
+
+    def _expenses_document(self, is_history=False) -> Dict:
+        # Create a new dict in the original format
+        data = {
+            service: list(info["entries"]) if isinstance(info, dict) else info
+            for service, info in self.current_expenses.items()
+        }
+
+        if not is_history:
+            return data
+
+        return {
+            'Expense': data,
+            'Income': self._income_document(),
+            'Total Expenses': self.get_total_expenses(),
+            'Total Income': self.get_total_income(),
+            'Balance': self.current_balance,
+            'Savings': self.current_savings
+        }
+
+    def _income_document(self) -> Dict:
+        return {
+            service: list(info["entries"]) if isinstance(info, dict) else info
+            for service, info in self.current_income.items()
+        }
+
+    def _apply(self, record: Dict):
+        """ Apply one journal record to the in-memory ledger, without persisting anything; Returns where an added or edited entry ended up """
+        op = record["op"]
+
+        if op == "balance":
+            self.current_balance = record["value"]
+            return
+
+        if op == "savings":
+            self.current_savings = record["value"]
+            return
+
+        kind = record["kind"]
+        ledger = self.current_expenses if kind == "expense" else self.current_income
+        name = record["name"]
+
+        if op == "drop":
+            for entry in ledger[name]["entries"]:
+                self.search_index.remove_entry(kind, name, entry)
+
+            self._total_cents[kind] -= ledger[name]["entries"].total_cents
+            del ledger[name]
+            return
+
+        if op == "add" and name not in ledger:
+            ledger[name] = { "entries": EntryColumns(), "value": 0 }
+
+        entries = ledger[name]["entries"]
+        old_cents = entries.total_cents
+        index = None
+
+        # Entries are already date-sorted, so new and edited ones get slotted straight into place
+        if op == "add":
+            index = entries.insort(record["entry"])
+        elif op == "edit":
+            self.search_index.remove_entry(kind, name, entries[record["index"]])
+            index = entries.move(record["index"], record["entry"])
+        elif op == "pop":
+            self.search_index.remove_entry(kind, name, entries[record["index"]])
+            del entries[record["index"]]
+
+        if op in ("add", "edit"):
+            self.search_index.add_entry(kind, name, record["entry"])
+
+        # Entries keep their own running sum, so this is O(1)
+        ledger[name]["value"] = entries.total()
+        self._total_cents[kind] += entries.total_cents - old_cents
+
+        return index
+
+    def _replay_journal(self) -> None:
+        records = self.journal.read()
+        if not records:
+            return
+
+        self._apply_records(records)
+
+        # Outside of journal mode the log shouldn't linger around, and inside it shouldn't grow forever
+        if not self.journal_mode or len(records) >= self.JOURNAL_COMPACT_THRESHOLD:
+            self.checkpoint()
+
+    def _apply_records(self, records: List[Dict]) -> None:
+        """ Replay journal records, skipping any that no longer fit the ledger rather than failing to load it at all """
+        skipped = 0
+
+        for record in records:
+            if self._applies(record):
+                self._apply(record)
+            else:
+                skipped += 1
+
+        if skipped:
+            print(f"Failed to replay {skipped} journal record(s): their category or entry no longer exists")
+
+    def _applies(self, record: Dict) -> bool:
+        if record["op"] in ("balance", "savings", "add"):
+            return True
+
+        ledger = self.current_expenses if record["kind"] == "expense" else self.current_income
+        if record["name"] not in ledger:
+            return False
+
+        # Edits and pops point at an entry by position, which can be negative
+        entries = ledger[record["name"]]["entries"]
+        return record["op"] == "drop" or -len(entries) <= record["index"] < len(entries)
+
+    def _parse_history_month(self, history_filename: str) -> Dict:
+        """ Both halves of a History/ file, parsed the same way as the current month """
+        profiler.count_file_read(history_filename)
+
+        data = load_document(history_filename)
+
+        month = {}
+        for kind in ('Expense', 'Income'):
+            month[kind] = {}
+
+            for name, instances in data[kind].items():
+
+                # Sort entries by date; Each date only gets parsed once, here
+                instances = to_entries(instances)
+
+                month[kind][name] = {
+                    "entries": instances,
+                    "value": instances.total(),
+                }
+
+        return month
+
+    def _recount_totals(self) -> None:
+        """ Start the running totals off from whatever got loaded """
+        self._total_cents = {
+            "expense": sum(info["entries"].total_cents for info in self.current_expenses.values()),
+            "income": sum(info["entries"].total_cents for info in self.current_income.values()),
+        }
+
+
+def open_ledger(background_writes: bool = False) -> LedgerStore:
+    """
+    The ledger the TUI and the command line both work on: the SQLite database at FINANCE_TRACKER_DB when that's set,
+    otherwise the journaled JSON files in the working directory. `background_writes` saves those on a writer thread,
+    which the TUI wants and a one-shot command doesn't, since it waits on its write anyway.
+    """
+    if os.environ.get("FINANCE_TRACKER_DB"):
+        # Imported here, since it imports this module; Import the JSON files into it first with `python -m Utils.SQLiteLedgerStore`
+        from Utils.SQLiteLedgerStore import SQLiteLedgerStore
+        return SQLiteLedgerStore(os.environ["FINANCE_TRACKER_DB"])
 
-            
+    # Appends each change to a journal instead of rewriting the JSON files
+    return LedgerStore(journal=True, background_writes=background_writes)
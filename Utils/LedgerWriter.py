@@ -0,0 +1,96 @@
+import threading
+from typing import Dict, Optional, Union
+
+from Utils.LedgerCommit import append_file, atomic_commit
+from Utils.Profiling import timed
+
+
+class LedgerWriter:
+    """
+    Dedicated thread that does the ledger's disk writes, so a slow disk never stalls the UI.
+
+    Work waiting for the thread is coalesced: a file saved again before it was written only gets
+    written once, with its latest contents, and everything waiting is committed together. Appends
+    (the journal) are concatenated in order instead. Submitting blocks once more than
+    `max_pending_bytes` is waiting, so a stalled disk can't pile up work without limit.
+    """
+
+    def __init__(self, commit_path: str, max_pending_bytes: int = 4 * 1024 * 1024) -> None:
+        self.commit_path = commit_path
+        self.max_pending_bytes = max_pending_bytes
+
+        self._files: Dict[str, Union[str, bytes]] = {} # path -> full new contents
+        self._appends: Dict[str, str] = {}             # path -> text to add to the end
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, files: Optional[Dict[str, Union[str, bytes]]] = None, appends: Optional[Dict[str, str]] = None) -> None:
+        with self._condition:
+            while self._pending_bytes() > self.max_pending_bytes and not self._closed:
+                self._condition.wait()
+
+            for path, content in (files or {}).items():
+                self._files[path] = content
+                self._appends.pop(path, None) # The new contents already account for anything that was waiting to be appended
+
+            for path, text in (appends or {}).items():
+                if path in self._files:
+                    self._files[path] += text
+                else:
+                    self._appends[path] = self._appends.get(path, "") + text
+
+            self._condition.notify_all()
+
+    def flush(self) -> None:
+        """ Block until everything submitted so far is on disk """
+        with self._condition:
+            while self._files or self._appends or self._busy:
+                self._condition.wait()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+
+        self.flush()
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        self._thread.join()
+
+    @timed("LedgerWriter.write")
+    def _write(self, files: Dict[str, Union[str, bytes]], appends: Dict[str, str]) -> None:
+        if files:
+            atomic_commit(files, self.commit_path)
+
+        for path, text in appends.items():
+            append_file(path, text)
+
+    def _pending_bytes(self) -> int:
+        return sum(map(len, self._files.values())) + sum(map(len, self._appends.values()))
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._files and not self._appends and not self._closed:
+                    self._condition.wait()
+
+                if not self._files and not self._appends:
+                    return # Closed, and nothing left to write
+
+                files, self._files = self._files, {}
+                appends, self._appends = self._appends, {}
+                self._busy = True
+                self._condition.notify_all() # Room for submitters that were held back
+
+            try:
+                self._write(files, appends)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
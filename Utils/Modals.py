@@ -1,12 +1,17 @@
 from datetime import datetime
 
 from textual.screen import ModalScreen
-from textual.widgets import Input, Label, ListItem, ListView, Static
+from textual.widgets import Input, Label, Static
 from textual.containers import Container, Horizontal, Vertical, VerticalScroll
 from textual import events
 
-from Utils.CustomWidgets import EntryRow, ExpenseRow
+from Utils.CustomWidgets import EntryRow, VirtualList
 from Utils.LedgerStore import LedgerStore
+from Utils.Profiling import timed
+
+def entry_row(entry: dict) -> EntryRow:
+    return EntryRow(entry["payment_date"], entry["value"], entry["description"])
+
 
 class NewExpenseModal(ModalScreen):
     DEFAULT_CSS = """
@@ -368,26 +373,6 @@ class ExpenseListModal(ModalScreen):
             padding-top: 1;
         }
 
-        ListItem {
-            height: auto;
-            margin-bottom: 1;
-        }
-
-        EntryRow {
-            width: 100%;
-            height: auto;
-            padding: 0 1;
-        }
-
-        EntryRow > Static:first-child {
-            width: 1fr;
-        }
-
-        EntryRow > Static:last-child {
-            width: auto;
-            text-align: right;
-            padding-right: 2;
-        }
     """
 
     BINDINGS = [
@@ -413,18 +398,17 @@ class ExpenseListModal(ModalScreen):
             with Vertical(id="dialog"):
                 yield Label(self.title, id="dialog-title")
 
-                # Create empty ListView
-                self.list_view = ListView()
+                # Rows are drawn straight from the ledger's entries as they scroll into view
+                self.list_view = VirtualList(self.ledger.current_expenses[self.title]["entries"], make_row=entry_row)
                 yield self.list_view
 
                 # Footer instructions
                 yield Static("\[N] New Expense  \[Enter] Edit  \[X] Delete", id="instructions-footer")
 
-    async def on_mount(self):
-        """Populate ListView after it's mounted."""
-        await self.refresh_list()
+    def on_mount(self):
+        self.refresh_list()
 
-    async def on_list_view_selected(self, event: ListView.Selected) -> None:
+    async def on_virtual_list_selected(self, event: VirtualList.Selected) -> None:
         """Triggered when user presses Enter on an entry."""
 
         selected_index = event.list_view.index
@@ -447,7 +431,7 @@ class ExpenseListModal(ModalScreen):
     def action_delete_expense(self):
         """Triggered when user presses 'x'."""
 
-        if not self.list_view.children:
+        if not self.list_view.row_count:
             return
 
         selected_index = self.list_view.index
@@ -467,12 +451,12 @@ class ExpenseListModal(ModalScreen):
     def action_move_down(self):
         """Triggered when user presses 'j'."""
 
-        if not self.list_view.children:
+        if not self.list_view.row_count:
             return
 
         selected_index = self.list_view.index
 
-        if selected_index is None or selected_index >= len(self.ledger.current_expenses[self.title]["entries"]):
+        if selected_index is None:
             return
 
         self.list_view.index = selected_index + 1
@@ -481,7 +465,7 @@ class ExpenseListModal(ModalScreen):
     def action_move_up(self):
         """Triggered when user presses 'k'."""
 
-        if not self.list_view.children:
+        if not self.list_view.row_count:
             return
 
         selected_index = self.list_view.index
@@ -503,8 +487,8 @@ class ExpenseListModal(ModalScreen):
             'value': result["Amount"]
         }
 
-        self.ledger.update_expense_entry(self.title, index, new_entry)
-        self.call_later(self.refresh_list) # Refresh the list view so that the content is date-sorted
+        new_index = self.ledger.update_expense_entry(self.title, index, new_entry)
+        self.call_later(self.move_row, index, new_index) # Only the edited row moves; The rest of the list is still date-sorted
 
     def on_new_expense_submitted(self, result):
         """Callback when NewExpenseModal is submitted."""
@@ -517,8 +501,8 @@ class ExpenseListModal(ModalScreen):
             'value': result["Amount"]
         }
 
-        self.ledger.add_new_expense_entry(self.title, new_entry) # Add new entry to the ledger
-        self.call_later(self.refresh_list) # Refresh the list view so that the content is date-sorted
+        new_index = self.ledger.add_new_expense_entry(self.title, new_entry) # Add new entry to the ledger
+        self.call_later(self.insert_row, new_index) # Slot the new row in at its date-sorted position
 
     def on_delete_confirmed(self, confirmed: bool, index: int):
         if not confirmed:
@@ -527,35 +511,46 @@ class ExpenseListModal(ModalScreen):
         entries = self.ledger.current_expenses[self.title]["entries"]
 
         if 0 <= index < len(entries):
-            deleted_entry = entries.pop(index)
+            self.ledger.remove_expense_entry(self.title, index) # Ledger takes care of the total, balance and savings
+            self.call_later(self.remove_row, index) # Drop just that row from the UI
 
-            # Recalculate total safely
-            self.ledger.current_expenses[self.title]["value"] = sum(
-                e["value"] for e in entries
-            )
+    @timed("ExpenseListModal.refresh_list")
+    def refresh_list(self):
+        # Sorted entries straight from the ledger; Only the rows in view ever get built
+        self.list_view.set_rows(self.ledger.current_expenses[self.title]["entries"])
 
-            # Persist changes
-            self.ledger.save_current_expenses()
-            self.ledger.update_current_balance(-deleted_entry["value"])
+        if self.list_view.row_count:
+            self.list_view.index = 0
+            self.list_view.focus()
 
-            if self.title == 'Savings': self.ledger.update_current_savings(-deleted_entry["value"])
+    def insert_row(self, index: int):
+        self.refresh_rows_from(index)
 
-        # Refresh UI
-        self.call_later(self.refresh_list)
+        self.list_view.index = index # Keep the cursor on the row that was just added
+        self.list_view.focus()
 
-    async def refresh_list(self):
-        self.list_view.clear()
+    def move_row(self, old_index: int, new_index: int):
+        self.refresh_rows_from(min(old_index, new_index)) # Only the rows between its old and new place shifted
 
-        # Pull sorted entries from ledger
-        entries = self.ledger.current_expenses[self.title]["entries"]
+        self.list_view.index = new_index # Keep the cursor on the row that was just edited
+        self.list_view.focus()
 
-        for entry in entries:
-            await self.list_view.append( ListItem(EntryRow(entry["payment_date"], entry["value"], entry["description"])) )
+    def remove_row(self, index: int):
+        self.refresh_rows_from(index)
 
-        if self.list_view.children:
-            self.list_view.index = 0
+        if self.list_view.row_count:
+            self.list_view.index = min(index, self.list_view.row_count - 1)
             self.list_view.focus()
 
+    def refresh_rows_from(self, start: int):
+        """Redraw from `start` down; The list shows the ledger's own entry columns, so everything above is as it was."""
+        entries = self.ledger.current_expenses[self.title]["entries"]
+
+        if self.list_view.rows is entries:
+            self.list_view.refresh_rows(start)
+        else:
+            self.list_view.set_rows(entries)
+
 class ConfirmDeleteModal(ModalScreen[bool]):
     DEFAULT_CSS = """
         ModalScreen {
@@ -648,26 +643,6 @@ class IncomeListModal(ModalScreen):
             padding-top: 1;
         }
 
-        ListItem {
-            height: auto;
-            margin-bottom: 1;
-        }
-
-        EntryRow {
-            width: 100%;
-            height: auto;
-            padding: 0 1;
-        }
-
-        EntryRow > Static:first-child {
-            width: 1fr;
-        }
-
-        EntryRow > Static:last-child {
-            width: auto;
-            text-align: right;
-            padding-right: 2;
-        }
     """
 
     BINDINGS = [
@@ -693,18 +668,17 @@ class IncomeListModal(ModalScreen):
             with Vertical(id="dialog"):
                 yield Label(self.title, id="dialog-title")
 
-                # Create empty ListView
-                self.list_view = ListView()
+                # Rows are drawn straight from the ledger's entries as they scroll into view
+                self.list_view = VirtualList(self.ledger.current_income[self.title]["entries"], make_row=entry_row)
                 yield self.list_view
 
                 # Footer instructions
                 yield Static("\[N] New Income  \[Enter] Edit  \[X] Delete", id="instructions-footer")
 
-    async def on_mount(self):
-        """Populate ListView after it's mounted."""
-        await self.refresh_list()
+    def on_mount(self):
+        self.refresh_list()
 
-    async def on_list_view_selected(self, event: ListView.Selected) -> None:
+    async def on_virtual_list_selected(self, event: VirtualList.Selected) -> None:
         """Triggered when user presses Enter on an entry."""
 
         selected_index = event.list_view.index
@@ -727,7 +701,7 @@ class IncomeListModal(ModalScreen):
     def action_delete_income(self):
         """Triggered when user presses 'x'."""
 
-        if not self.list_view.children:
+        if not self.list_view.row_count:
             return
 
         selected_index = self.list_view.index
@@ -747,12 +721,12 @@ class IncomeListModal(ModalScreen):
     def action_move_down(self):
         """Triggered when user presses 'j'."""
 
-        if not self.list_view.children:
+        if not self.list_view.row_count:
             return
 
         selected_index = self.list_view.index
 
-        if selected_index is None or selected_index >= len(self.ledger.current_income[self.title]["entries"]):
+        if selected_index is None:
             return
 
         self.list_view.index = selected_index + 1
@@ -761,7 +735,7 @@ class IncomeListModal(ModalScreen):
     def action_move_up(self):
         """Triggered when user presses 'k'."""
 
-        if not self.list_view.children:
+        if not self.list_view.row_count:
             return
 
         selected_index = self.list_view.index
@@ -784,8 +758,8 @@ class IncomeListModal(ModalScreen):
             'value': result["Amount"]
         }
 
-        self.ledger.update_income_entry(self.title, index, new_entry)
-        self.call_later(self.refresh_list) # Refresh the list view so that the content is date-sorted
+        new_index = self.ledger.update_income_entry(self.title, index, new_entry)
+        self.call_later(self.move_row, index, new_index) # Only the edited row moves; The rest of the list is still date-sorted
 
     def on_new_income_submitted(self, result):
         """Callback when NewExpenseModal is submitted."""
@@ -798,8 +772,8 @@ class IncomeListModal(ModalScreen):
             'value': result["Amount"]
         }
 
-        self.ledger.add_new_income_entry(self.title, new_entry) # Add new entry to the ledger
-        self.call_later(self.refresh_list) # Refresh the list view so that the content is date-sorted
+        new_index = self.ledger.add_new_income_entry(self.title, new_entry) # Add new entry to the ledger
+        self.call_later(self.insert_row, new_index) # Slot the new row in at its date-sorted position
 
     def on_delete_confirmed(self, confirmed: bool, index: int):
         if not confirmed:
@@ -808,33 +782,266 @@ class IncomeListModal(ModalScreen):
         entries = self.ledger.current_income[self.title]["entries"]
 
         if 0 <= index < len(entries):
-            deleted_entry = entries.pop(index)
+            self.ledger.remove_income_entry(self.title, index) # Ledger takes care of the total and balance
+            self.call_later(self.remove_row, index) # Drop just that row from the UI
 
-            # Recalculate total safely
-            self.ledger.current_income[self.title]["value"] = sum(
-                e["value"] for e in entries
-            )
+    @timed("IncomeListModal.refresh_list")
+    def refresh_list(self):
+        # Sorted entries straight from the ledger; Only the rows in view ever get built
+        self.list_view.set_rows(self.ledger.current_income[self.title]["entries"])
 
-            # Persist changes
-            self.ledger.save_current_income()
-            self.ledger.update_current_balance(deleted_entry["value"]) # Positive since we want balance to go down
+        if self.list_view.row_count:
+            self.list_view.index = 0
+            self.list_view.focus()
 
-        # Refresh UI
-        self.call_later(self.refresh_list)
+    def insert_row(self, index: int):
+        self.refresh_rows_from(index)
 
-    async def refresh_list(self):
-        self.list_view.clear()
+        self.list_view.index = index # Keep the cursor on the row that was just added
+        self.list_view.focus()
 
-        # Pull sorted entries from ledger
-        entries = self.ledger.current_income[self.title]["entries"]
+    def move_row(self, old_index: int, new_index: int):
+        self.refresh_rows_from(min(old_index, new_index)) # Only the rows between its old and new place shifted
 
-        for entry in entries:
-            await self.list_view.append( ListItem(EntryRow(entry["payment_date"], entry["value"], entry["description"])) )
+        self.list_view.index = new_index # Keep the cursor on the row that was just edited
+        self.list_view.focus()
 
-        if self.list_view.children:
-            self.list_view.index = 0
+    def remove_row(self, index: int):
+        self.refresh_rows_from(index)
+
+        if self.list_view.row_count:
+            self.list_view.index = min(index, self.list_view.row_count - 1)
             self.list_view.focus()
 
+    def refresh_rows_from(self, start: int):
+        """Redraw from `start` down; The list shows the ledger's own entry columns, so everything above is as it was."""
+        entries = self.ledger.current_income[self.title]["entries"]
+
+        if self.list_view.rows is entries:
+            self.list_view.refresh_rows(start)
+        else:
+            self.list_view.set_rows(entries)
+
+
+
+class ImportStatementModal(ModalScreen):
+    DEFAULT_CSS = """
+        ModalScreen {
+            background: transparent;
+        }
+
+        Container {
+            width: 100%;
+            height: 100%;
+            background: transparent;
+            align: center middle;
+        }
+
+        #dialog {
+            width: 60%;
+            height: auto;
+            max-width: 70;
+            min-width: 40;
+            padding: 1 2;
+            border: round #AFAFD7;
+        }
+
+
+        #dialog-title {
+            text-style: bold;
+            margin-bottom: 1;
+            text-align: center;
+        }
+    """
+
+    BINDINGS = [
+        ("escape", "dismiss", "Cancel"),
+    ]
+
+    def compose(self):
+        with Container():  # full-screen container
+            with Vertical(id="dialog"):
+                yield Label("Import Statement (CSV or OFX)", id="dialog-title")
+                self.path = Input(placeholder="Path to statement", id="import-path")
+                self.date_format = Input(placeholder="CSV date format, e.g. %d-%m-%Y", id="import-date-format")
+
+                yield self.path
+                yield self.date_format
+
+
+    def on_mount(self):
+        self.path.focus()
+        self.date_format.value = "%d-%m-%Y"
+
+    def on_input_submitted(self, event: Input.Submitted):
+        if event.input is self.date_format:
+            self.submit()
+        else:
+            self.date_format.focus()
+
+    def submit(self):
+        path = self.path.value.strip()
+        date_format = self.date_format.value.strip()
+
+        if not path or not date_format:
+            return  # later: show error
+
+        self.dismiss({
+            "Path": path,
+            "Date Format": date_format,
+        })
+
+
+class SearchModal(ModalScreen):
+    DEFAULT_CSS = """
+        ModalScreen {
+            background: transparent;
+        }
+
+        Container {
+            width: 100%;
+            height: 100%;
+            background: transparent;
+            align: center middle;
+        }
+
+        #dialog {
+            width: 60%;
+            height: auto;
+            max-width: 70;
+            min-width: 40;
+            padding: 1 2;
+            border: round #AFAFD7;
+        }
+
+
+        #dialog-title {
+            text-style: bold;
+            margin-bottom: 1;
+            text-align: center;
+        }
+    """
+
+    BINDINGS = [
+        ("escape", "dismiss", "Cancel"),
+    ]
+
+    def compose(self):
+        with Container():  # full-screen container
+            with Vertical(id="dialog"):
+                yield Label("Search All Entries", id="dialog-title")
+                self.text = Input(placeholder="Description or category, e.g. grab ride", id="search-text")
+
+                yield self.text
+
+
+    def on_mount(self):
+        self.text.focus()
+
+    def on_input_submitted(self, event: Input.Submitted):
+        text = self.text.value.strip()
+
+        if not text:
+            return
+
+        self.dismiss({ "Text": text })
+
+
+class QueryModal(ModalScreen):
+    DEFAULT_CSS = """
+        ModalScreen {
+            background: transparent;
+        }
+
+        Container {
+            width: 100%;
+            height: 100%;
+            background: transparent;
+            align: center middle;
+        }
+
+        #dialog {
+            width: 60%;
+            height: auto;
+            max-width: 70;
+            min-width: 40;
+            padding: 1 2;
+            border: round #AFAFD7;
+        }
+
+
+        #dialog-title {
+            text-style: bold;
+            margin-bottom: 1;
+            text-align: center;
+        }
+    """
+
+    BINDINGS = [
+        ("escape", "dismiss", "Cancel"),
+    ]
+
+    def __init__(self, filters: dict):
+        super().__init__()
+        self.filters = filters
+
+    def compose(self):
+        with Container():  # full-screen container
+            with Vertical(id="dialog"):
+                yield Label("Query Entries (leave blank for any)", id="dialog-title")
+
+                self.kind = Input(placeholder="Kind (expense or income)", id="query-kind")
+                self.category = Input(placeholder="Category", id="query-category")
+                self.date_from = Input(placeholder="From (DD-MM-YYYY)", id="query-from")
+                self.date_to = Input(placeholder="To (DD-MM-YYYY)", id="query-to")
+                self.min_amount = Input(placeholder="Min amount", type="number", id="query-min")
+                self.max_amount = Input(placeholder="Max amount", type="number", id="query-max")
+
+                yield self.kind
+                yield self.category
+                yield self.date_from
+                yield self.date_to
+                yield self.min_amount
+                yield self.max_amount
+
+
+    def on_mount(self):
+        self.kind.focus()
+        self.kind.value = self.filters.get("Kind") or ""
+        self.category.value = self.filters.get("Category") or ""
+        self.date_from.value = self.filters.get("From") or ""
+        self.date_to.value = self.filters.get("To") or ""
+        self.min_amount.value = str(self.filters["Min Amount"]) if self.filters.get("Min Amount") is not None else ""
+        self.max_amount.value = str(self.filters["Max Amount"]) if self.filters.get("Max Amount") is not None else ""
+
+    def on_input_submitted(self, event: Input.Submitted):
+        if event.input is self.max_amount:
+            self.submit()
+        else:
+            self.focus_next()
+
+    def submit(self):
+        kind = self.kind.value.strip().lower()
+        date_from = self.date_from.value.strip()
+        date_to = self.date_to.value.strip()
+
+        if kind not in ("", "expense", "income"):
+            return  # later: show error
+
+        try:
+            for date in (date_from, date_to):
+                if date: datetime.strptime(date, "%d-%m-%Y")
+        except ValueError:
+            return  # later: show error
+
+        self.dismiss({
+            "Kind": kind or None,
+            "Category": self.category.value.strip() or None,
+            "From": date_from or None,
+            "To": date_to or None,
+            "Min Amount": float(self.min_amount.value) if self.min_amount.value.strip() else None,
+            "Max Amount": float(self.max_amount.value) if self.max_amount.value.strip() else None,
+        })
 
 
 class DepositBalanceModal(ModalScreen):
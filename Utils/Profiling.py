@@ -0,0 +1,189 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from types import FunctionType, GeneratorType
+from typing import Dict, Generator, List
+
+PROFILE_ENV = "FINANCE_TRACKER_PROFILE"           # Set to anything to time from startup
+PROFILE_JSON_ENV = "FINANCE_TRACKER_PROFILE_JSON" # Path to dump the table to on exit; Turns timing on too
+CO_COROUTINE = 0x80 # inspect.CO_COROUTINE; inspect itself takes ~10ms to import, which the CLI would pay on every run
+CO_GENERATOR = 0x20 # inspect.CO_GENERATOR
+
+
+class Profiler:
+    """
+    Call counts, cumulative and max latency, and bytes read and written, per timed function. Off it costs a flag
+    check per call; It can be switched on at any point and only counts from then. Bytes land on every timed call
+    that's running on the thread at the time, so a method's figures include whatever it called. A call that hands back
+    a generator is timed until the generator is done, counting only the time spent inside it, not between its items.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.stats: Dict[str, List] = {} # name -> [calls, total seconds, max seconds, bytes read, bytes written]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[List[int]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        return stack
+
+    def _pop(self, stack: List[List[int]], io: List[int]) -> None:
+        """ Take `io` itself off the stack; Another call's counters can be equal to it, but never the same list """
+        del stack[next(i for i in range(len(stack) - 1, -1, -1) if stack[i] is io)]
+
+    def _record(self, name: str, seconds: float, io: List[int]) -> None:
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = [0, 0.0, 0.0, 0, 0]
+
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+            stat[3] += io[0]
+            stat[4] += io[1]
+
+    def timed(self, name: str):
+        """ Decorator; Works on plain and async functions alike """
+        def decorate(function):
+            if function.__code__.co_flags & CO_COROUTINE:
+                @wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await function(*args, **kwargs)
+
+                    io = [0, 0]
+                    self._stack().append(io)
+                    started = time.perf_counter()
+                    try:
+                        return await function(*args, **kwargs)
+                    finally:
+                        self._record(name, time.perf_counter() - started, io)
+                        self._pop(self._stack(), io) # Other tasks on this thread may have pushed since
+
+                return async_wrapper
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+
+                io = [0, 0]
+                stack = self._stack()
+                stack.append(io)
+                started = time.perf_counter()
+                try:
+                    result = function(*args, **kwargs)
+                except BaseException:
+                    self._record(name, time.perf_counter() - started, io)
+                    raise
+                finally:
+                    stack.pop()
+
+                seconds = time.perf_counter() - started
+                if isinstance(result, GeneratorType):
+                    return self._timed_generator(name, result, seconds, io) # The work happens as it gets consumed
+
+                self._record(name, seconds, io)
+                return result
+
+            return wrapper
+
+        return decorate
+
+    def _timed_generator(self, name: str, generator: Generator, seconds: float, io: List[int]) -> Generator:
+        """ Pass `generator` through, adding the time spent inside it to `seconds`; Recorded once it's done or closed """
+        resume, argument = generator.send, None
+        try:
+            while True:
+                stack = self._stack() # Can be resumed from another thread than the one that made it
+                stack.append(io)
+                started = time.perf_counter()
+                try:
+                    value = resume(argument)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    seconds += time.perf_counter() - started
+                    self._pop(stack, io)
+
+                try:
+                    resume, argument = generator.send, (yield value)
+                except GeneratorExit:
+                    raise
+                except BaseException as e: # Thrown in, e.g. by a with block around a contextmanager; Hand it on
+                    resume, argument = generator.throw, e
+        finally:
+            generator.close()
+            self._record(name, seconds, io)
+
+    def count_read(self, size: int) -> None:
+        if self.enabled:
+            for io in self._stack():
+                io[0] += size
+
+    def count_written(self, size: int) -> None:
+        if self.enabled:
+            for io in self._stack():
+                io[1] += size
+
+    def count_file_read(self, path: str) -> None:
+        """ A whole file was read; Only stats it when profiling """
+        if self.enabled:
+            try:
+                self.count_read(os.path.getsize(path))
+            except OSError:
+                pass
+
+    def table(self) -> List[Dict]:
+        """ Every timed function so far, the most total time first """
+        with self._lock:
+            rows = [
+                { "name": name, "calls": calls, "total_ms": total * 1000, "mean_ms": total * 1000 / calls, "max_ms": longest * 1000, "bytes_read": read, "bytes_written": written }
+                for name, (calls, total, longest, read, written) in self.stats.items()
+            ]
+
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+    def dump(self, path: str) -> None:
+        try:
+            with open(path, "w") as file:
+                json.dump(self.table(), file, indent=4)
+        except Exception as e:
+            print(f"Failed to write profile to {path}: {e}")
+
+
+profiler = Profiler(enabled=bool(os.environ.get(PROFILE_ENV) or os.environ.get(PROFILE_JSON_ENV)))
+timed = profiler.timed
+
+if os.environ.get(PROFILE_JSON_ENV):
+    atexit.register(profiler.dump, os.environ[PROFILE_JSON_ENV])
+
+
+def profiled(cls):
+    """ Class decorator: time every public method the class defines itself, plus __init__, as 'Class.method' """
+    for name, member in list(vars(cls).items()):
+        if (name.startswith("_") and name != "__init__") or not isinstance(member, FunctionType):
+            continue
+
+        wrapped = getattr(member, "__wrapped__", None)
+        if isinstance(wrapped, FunctionType) and wrapped.__code__.co_flags & CO_GENERATOR and not member.__code__.co_flags & CO_GENERATOR:
+            # A @contextmanager; Its generator is what runs the with block's setup and teardown, so that's what gets timed
+            setattr(cls, name, contextmanager(timed(f"{cls.__name__}.{name}")(wrapped)))
+            continue
+
+        setattr(cls, name, timed(f"{cls.__name__}.{name}")(member))
+
+    return cls
@@ -0,0 +1,526 @@
+import glob
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from itertools import chain
+from typing import Dict, Iterator, List
+
+from Utils.HistoryIndex import aggregate_months, month_ordinal, window_cutoff
+from Utils.LedgerCodec import DEFAULT_CODEC, load as load_document, loads
+from Utils.LedgerCommit import read_commit
+from Utils.LedgerEntry import Entry, EntryColumns, date_ordinal, to_entries
+from Utils.LedgerJournal import LedgerJournal
+from Utils.LedgerStore import LedgerStore
+from Utils.Profiling import profiled
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS months (
+        id INTEGER PRIMARY KEY,
+        label TEXT UNIQUE,                  -- NULL for the month currently being tracked, e.g. 'October 2026' once archived
+        ordinal INTEGER,                    -- year * 12 + month - 1, so months sort and range-filter as integers
+        is_current INTEGER NOT NULL DEFAULT 0,
+        total_expenses REAL NOT NULL DEFAULT 0,
+        total_income REAL NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY,
+        month_id INTEGER NOT NULL REFERENCES months(id) ON DELETE CASCADE,
+        kind TEXT NOT NULL,                 -- 'expense' or 'income'
+        name TEXT NOT NULL,
+        UNIQUE (month_id, kind, name)
+    );
+
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY,
+        category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+        position REAL NOT NULL,             -- Sort order within the category; Fractional, so inserts never renumber
+        description TEXT NOT NULL,
+        payment_date TEXT NOT NULL,
+        date_ordinal INTEGER NOT NULL,
+        value REAL NOT NULL
+    );
+
+    -- Balance and savings as they stood for a month; The current month's row is kept live
+    CREATE TABLE IF NOT EXISTS balance_checkpoints (
+        month_id INTEGER PRIMARY KEY REFERENCES months(id) ON DELETE CASCADE,
+        balance REAL NOT NULL DEFAULT 0,
+        savings REAL NOT NULL DEFAULT 0
+    );
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_months_current ON months(is_current) WHERE is_current = 1;
+    CREATE INDEX IF NOT EXISTS idx_months_ordinal ON months(ordinal);
+    CREATE INDEX IF NOT EXISTS idx_entries_category ON entries(category_id, position);
+    CREATE INDEX IF NOT EXISTS idx_entries_date ON entries(date_ordinal);
+"""
+
+
+@profiled
+class SQLiteLedgerStore(LedgerStore):
+    """ LedgerStore backed by a single SQLite database instead of the JSON files and History/ folder """
+
+    def __init__(self, db_path: str = "ledger.db", debug: bool = bool(os.environ.get("FINANCE_TRACKER_DEBUG"))) -> None:
+        self.db_path = db_path
+        self.SEARCH_INDEX_PATH = os.path.splitext(db_path)[0] + "_search_index" # One per database
+
+        # The UI loads and saves from worker threads too; Access is still one call at a time
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+
+        # None of LedgerStore's JSON side: no commit file to recover, no journal and no history_index.json, since every
+        # write is already durable in the database and the months' summaries are columns in it
+        self._init_state(debug, DEFAULT_CODEC)
+        self.journal_mode = False
+        self.writer = None
+
+        self._load_ledger()
+
+    def check_first_time_loading(self):
+        """ Create the schema and the current month on first run """
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+            if self._current_month_id() is None:
+                self._create_current_month(0.0, 0.0)
+
+    def load_current_expenses(self) -> Dict:
+        return self._load_month(self._current_month_id(), "expense")
+
+    def load_current_income(self) -> Dict:
+        return self._load_month(self._current_month_id(), "income")
+
+    def load_current_balance(self) -> float:
+        return self._load_checkpoint(self._current_month_id())[0]
+
+    def load_current_savings(self) -> float:
+        return self._load_checkpoint(self._current_month_id())[1]
+
+    def load_expense_history(self, filename: str) -> Dict:
+        return self._load_month(self._history_month_id(filename), "expense")
+
+    def load_income_history(self, filename: str) -> Dict:
+        return self._load_month(self._history_month_id(filename), "income")
+
+    def load_past_expenses(self, filename) -> Dict:
+        return self._load_month_document(filename)
+
+    def load_past_income(self, filename) -> Dict:
+        return self._load_month_document(filename)
+
+    def save_current_balance(self) -> bool:
+        return self._write(lambda: self._save_checkpoint())
+
+    def save_current_savings(self) -> bool:
+        return self._write(lambda: self._save_checkpoint())
+
+    def save_current_expenses(self, is_history=False) -> bool:
+        return self._write(lambda: self._save_kind("expense"))
+
+    def save_current_income(self) -> bool:
+        return self._write(lambda: self._save_kind("income"))
+
+    def get_expenses_history(self) -> List:
+        rows = self.connection.execute("SELECT label FROM months WHERE is_current = 0 ORDER BY ordinal")
+        return [label for (label,) in rows]
+
+    def history_fingerprint(self, label: str):
+        # Archived months are never edited in place; Archiving over a month gives it a new id
+        row = self.connection.execute("SELECT id FROM months WHERE label = ?", (label,)).fetchone()
+        return [row[0]] if row else None
+
+    def query(self, kind=None, category=None, date_from=None, date_to=None, min_amount=None, max_amount=None, limit=None) -> Iterator[Dict]:
+        """ Same as LedgerStore.query(), straight off the month, category and date indexes """
+        filters, params = [], []
+
+        if kind is not None: filters.append("c.kind = ?"); params.append(kind)
+        if category is not None: filters.append("c.name = ?"); params.append(category)
+        if date_from: filters.append("e.date_ordinal >= ?"); params.append(date_ordinal(date_from))
+        if date_to: filters.append("e.date_ordinal <= ?"); params.append(date_ordinal(date_to))
+        if min_amount is not None: filters.append("e.value >= ?"); params.append(min_amount)
+        if max_amount is not None: filters.append("e.value <= ?"); params.append(max_amount)
+
+        rows = self.connection.execute(f"""
+            SELECT m.label, c.kind, c.name, e.payment_date, e.description, e.value
+            FROM entries e JOIN categories c ON c.id = e.category_id JOIN months m ON m.id = c.month_id
+            {"WHERE " + " AND ".join(filters) if filters else ""}
+            ORDER BY m.is_current, m.ordinal, c.kind, c.id, e.position
+            LIMIT ?
+        """, (*params, limit if limit is not None else -1))
+
+        current_label = datetime.now().strftime("%B %Y")
+        for label, row_kind, name, payment_date, description, value in rows:
+            yield { "month": label or current_label, "kind": row_kind, "category": name, "date": payment_date, "description": description, "amount": value }
+
+    def get_history_dataset(self, window: str = "12M", bucket: str = "month") -> List[Dict]:
+        cutoff = window_cutoff(window)
+
+        # The cursor hands rows over as they're read, so this streams just like the JSON store does
+        rows = self.connection.execute("""
+            SELECT m.ordinal, m.total_expenses, m.total_income, c.balance, c.savings
+            FROM months m JOIN balance_checkpoints c ON c.month_id = m.id
+            WHERE m.is_current = 0 AND m.ordinal >= ?
+            ORDER BY m.ordinal
+        """, (cutoff if cutoff is not None else -1,))
+
+        months = (
+            { "month": ordinal, "Balance": balance, "Total Expenses": total_expenses, "Total Income": total_income, "Savings": savings }
+            for ordinal, total_expenses, total_income, balance, savings in rows
+        )
+
+        return list(aggregate_months(chain(months, [self._current_summary()]), bucket))
+
+    def checkpoint(self) -> bool:
+        return self._write(lambda: (self._save_kind("expense"), self._save_kind("income"), self._save_checkpoint()))
+
+    def close(self) -> None:
+        super().close()
+        self.connection.close()
+
+    def _apply(self, record: Dict):
+        """ Same as LedgerStore's, but notes on the record where its entry ended up, so _persist can write just that row """
+        if record["op"] in ("edit", "pop"):
+            ledger = self.current_expenses if record["kind"] == "expense" else self.current_income
+            record["index"] = range(len(ledger[record["name"]]["entries"]))[record["index"]] # Normalise negative indices
+
+        index = super()._apply(record)
+        if index is not None:
+            record["position"] = index
+
+        if record["op"] in ("add", "edit", "pop"):
+            ledger = self.current_expenses if record["kind"] == "expense" else self.current_income
+            record["count"] = len(ledger[record["name"]]["entries"]) # Entries in the category afterwards
+
+        return index
+
+    def _persist(self, records: List[Dict]) -> None:
+        """ One row written per record, in order, all within one database transaction """
+        def write():
+            for record in records:
+                if "kind" in record:
+                    self._save_record(record)
+
+            if any(record["op"] in ("balance", "savings") for record in records):
+                self._save_checkpoint()
+
+        self._write(write)
+
+    def _replay_journal(self) -> None:
+        pass # Every write is already durable in the database
+
+    def _reset_ledger(self):
+        if self.current_expenses:
+            today = datetime.today()
+            last_month = today - relativedelta(months=1) # Get 1 month before
+
+            def archive():
+                month_id = self._current_month_id()
+
+                # Same as overwriting an existing '{Month} {Year}.json' in the history folder
+                self.connection.execute("DELETE FROM months WHERE label = ?", (last_month.strftime("%B %Y"),))
+                self.connection.execute(
+                    "UPDATE months SET label = ?, ordinal = ?, is_current = 0, total_expenses = ?, total_income = ? WHERE id = ?",
+                    (last_month.strftime("%B %Y"), month_ordinal(last_month), self.get_total_expenses(), self.get_total_income(), month_id)
+                )
+                self._create_current_month(self.current_balance, self.current_savings)
+
+            if self._write(archive):
+                with self.lock:
+                    self.search_index.archive(last_month.strftime("%B %Y")) # Still has the month's entries to hand
+                    self.current_expenses = {} # Reset current expenses
+                    self.current_income = {}
+                    self._recount_totals()
+
+                self._notify("history")
+
+    def _write(self, write) -> bool:
+        try:
+            with self.connection:
+                write()
+
+        except Exception as e:
+            print(f"Failed to save to {self.db_path}: {e}")
+            return False
+
+        return True
+
+    def _current_month_id(self):
+        row = self.connection.execute("SELECT id FROM months WHERE is_current = 1").fetchone()
+        return row[0] if row else None
+
+    def _history_month_id(self, filename: str):
+        row = self.connection.execute("SELECT id FROM months WHERE label = ?", (filename.removesuffix(".json"),)).fetchone()
+        if row is None:
+            raise FileNotFoundError(filename) # Same as the JSON store opening a missing history file
+
+        return row[0]
+
+    def _create_current_month(self, balance: float, savings: float) -> None:
+        cursor = self.connection.execute("INSERT INTO months (is_current) VALUES (1)")
+        self.connection.execute("INSERT INTO balance_checkpoints (month_id, balance, savings) VALUES (?, ?, ?)", (cursor.lastrowid, balance, savings))
+
+    def _load_month(self, month_id, kind: str) -> Dict:
+        ledger = {}
+
+        categories = self.connection.execute("SELECT id, name FROM categories WHERE month_id = ? AND kind = ? ORDER BY id", (month_id, kind))
+        for category_id, name in categories.fetchall():
+            rows = self.connection.execute("SELECT description, payment_date, value, date_ordinal FROM entries WHERE category_id = ? ORDER BY position", (category_id,))
+            entries = EntryColumns( Entry.from_row(*row) for row in rows ) # Already in date order
+
+            ledger[name] = {
+                "entries": entries,
+                "value": entries.total(),
+            }
+
+        return ledger
+
+    def _load_checkpoint(self, month_id):
+        row = self.connection.execute("SELECT balance, savings FROM balance_checkpoints WHERE month_id = ?", (month_id,)).fetchone()
+        return row if row else (0.0, 0.0)
+
+    def _load_month_document(self, filename) -> Dict:
+        """ Rebuild a month in the same shape as a History/ JSON file """
+        try:
+            month_id = self._history_month_id(filename)
+        except FileNotFoundError as e:
+            print(f"Failed to load {filename}: {e}")
+            return {}
+
+        total_expenses, total_income = self.connection.execute("SELECT total_expenses, total_income FROM months WHERE id = ?", (month_id,)).fetchone()
+        balance, savings = self._load_checkpoint(month_id)
+
+        return {
+            'Expense': { name: list(info["entries"]) for name, info in self._load_month(month_id, "expense").items() },
+            'Income': { name: list(info["entries"]) for name, info in self._load_month(month_id, "income").items() },
+            'Total Expenses': total_expenses,
+            'Total Income': total_income,
+            'Balance': balance,
+            'Savings': savings
+        }
+
+    def _save_kind(self, kind: str) -> None:
+        ledger = self.current_expenses if kind == "expense" else self.current_income
+        month_id = self._current_month_id()
+
+        # Categories that were removed from memory have to go from the database as well
+        stored = self.connection.execute("SELECT name FROM categories WHERE month_id = ? AND kind = ?", (month_id, kind)).fetchall()
+        for (name,) in stored:
+            if name not in ledger:
+                self.connection.execute("DELETE FROM categories WHERE month_id = ? AND kind = ? AND name = ?", (month_id, kind, name))
+
+        for name in ledger:
+            self._save_category(kind, name)
+
+    def _save_category(self, kind: str, name: str) -> None:
+        ledger = self.current_expenses if kind == "expense" else self.current_income
+        month_id = self._current_month_id()
+
+        if name not in ledger:
+            self.connection.execute("DELETE FROM categories WHERE month_id = ? AND kind = ? AND name = ?", (month_id, kind, name))
+            return
+
+        self.connection.execute("INSERT OR IGNORE INTO categories (month_id, kind, name) VALUES (?, ?, ?)", (month_id, kind, name))
+        (category_id,) = self.connection.execute("SELECT id FROM categories WHERE month_id = ? AND kind = ? AND name = ?", (month_id, kind, name)).fetchone()
+
+        self.connection.execute("DELETE FROM entries WHERE category_id = ?", (category_id,))
+        _insert_entries(self.connection, category_id, ledger[name]["entries"])
+
+    def _save_record(self, record: Dict) -> None:
+        """
+        Write one applied record as a single-row INSERT, UPDATE or DELETE. Positions are only used for ordering, so an
+        entry that lands between two others gets a position halfway between theirs and nothing else has to move.
+        """
+        op, kind, name = record["op"], record["kind"], record["name"]
+        month_id = self._current_month_id()
+
+        if op == "drop":
+            self.connection.execute("DELETE FROM categories WHERE month_id = ? AND kind = ? AND name = ?", (month_id, kind, name))
+            return
+
+        self.connection.execute("INSERT OR IGNORE INTO categories (month_id, kind, name) VALUES (?, ?, ?)", (month_id, kind, name))
+        (category_id,) = self.connection.execute("SELECT id FROM categories WHERE month_id = ? AND kind = ? AND name = ?", (month_id, kind, name)).fetchone()
+
+        if op == "pop":
+            self.connection.execute("DELETE FROM entries WHERE id = ?", (self._entry_at(category_id, record["index"], record["count"] + 1)[0],))
+            return
+
+        entry = record["entry"]
+        values = (entry["description"], entry["payment_date"], date_ordinal(entry["payment_date"]), entry["value"])
+
+        if op == "add":
+            self.connection.execute(
+                "INSERT INTO entries (category_id, position, description, payment_date, date_ordinal, value) VALUES (?, ?, ?, ?, ?, ?)",
+                (category_id, self._position_at(category_id, record["position"], record["count"] - 1), *values)
+            )
+            return
+
+        # An edit; Its new position is worked out among the other entries, as if it had been taken out first
+        entry_id, position = self._entry_at(category_id, record["index"], record["count"])
+        if record["position"] != record["index"]:
+            position = self._position_at(category_id, record["position"], record["count"] - 1, exclude=entry_id)
+
+        self.connection.execute(
+            "UPDATE entries SET position = ?, description = ?, payment_date = ?, date_ordinal = ?, value = ? WHERE id = ?",
+            (position, *values, entry_id)
+        )
+
+    def _entry_at(self, category_id: int, index: int, count: int, exclude: int = -1):
+        """
+        (id, position) of the entry at `index` among the category's `count` entries (leaving out `exclude`), or None past
+        the end. Walks the (category, position) index from whichever end is nearer, so the latest entries are found at once.
+        """
+        if not 0 <= index < count:
+            return None
+
+        order, offset = ("ASC", index) if index < count // 2 else ("DESC", count - 1 - index)
+        return self.connection.execute(
+            f"SELECT id, position FROM entries WHERE category_id = ? AND id != ? ORDER BY position {order} LIMIT 1 OFFSET ?",
+            (category_id, exclude, offset)
+        ).fetchone()
+
+    def _position_at(self, category_id: int, index: int, count: int, exclude: int = -1) -> float:
+        """ A position that sorts an entry in at `index` among `count` others, i.e. between the ones now at index - 1 and index """
+        before = self._entry_at(category_id, index - 1, count, exclude)
+        after = self._entry_at(category_id, index, count, exclude)
+
+        if before is None:
+            return after[1] - 1 if after else 0
+        if after is None:
+            return before[1] + 1
+
+        position = (before[1] + after[1]) / 2
+        if before[1] < position < after[1]:
+            return position
+
+        # Halved down to nothing after many inserts in the same spot; Spread the category back out and try again
+        ids = self.connection.execute("SELECT id FROM entries WHERE category_id = ? ORDER BY position", (category_id,)).fetchall()
+        self.connection.executemany("UPDATE entries SET position = ? WHERE id = ?", ((number, entry_id) for number, (entry_id,) in enumerate(ids)))
+        return self._position_at(category_id, index, count, exclude)
+
+    def _save_checkpoint(self) -> None:
+        self.connection.execute(
+            "UPDATE balance_checkpoints SET balance = ?, savings = ? WHERE month_id = ?",
+            (self.current_balance, self.current_savings, self._current_month_id())
+        )
+
+
+def _insert_entries(connection, category_id: int, entries: List[Dict]) -> None:
+    connection.executemany(
+        "INSERT INTO entries (category_id, position, description, payment_date, date_ordinal, value) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (category_id, position, entry["description"], entry["payment_date"], entry.ordinal, entry["value"])
+            for position, entry in enumerate(entries)
+        )
+    )
+
+def _insert_month(connection, month_id: int, kind: str, data: Dict) -> None:
+    for name, entries in data.items():
+        entries = to_entries(entries)
+        cursor = connection.execute("INSERT INTO categories (month_id, kind, name) VALUES (?, ?, ?)", (month_id, kind, name))
+        _insert_entries(connection, cursor.lastrowid, entries)
+
+def _read_document(path: str, default):
+    try:
+        return load_document(path) # JSON or binary, whichever codec wrote it
+    except (ValueError, FileNotFoundError):
+        return default
+
+def _read_current_month(source_dir: str) -> LedgerStore:
+    """
+    The current month as the TUI would open it: the JSON files, with an interrupted commit laid over them and the
+    journal replayed on top, since the TUI keeps its latest changes there. All of it happens in memory, so unlike opening
+    a LedgerStore on source_dir nothing there gets finished off, archived or indexed
+    """
+    pending = {}
+    commit_path = os.path.join(source_dir, "ledger_commit.json")
+    if os.path.exists(commit_path):
+        try:
+            pending = read_commit(commit_path) # Keyed by the same names as below, relative to source_dir
+        except Exception as e:
+            print(f"Failed to read interrupted commit: {e}")
+
+    def read(name: str, default):
+        try:
+            if name in pending:
+                content = pending[name]
+                return loads(content if isinstance(content, bytes) else content.encode())
+
+            return load_document(os.path.join(source_dir, name))
+        except (ValueError, FileNotFoundError):
+            return default
+
+    # Only the in-memory half of a LedgerStore; Its search index is never loaded, so replaying doesn't touch it either
+    ledger = LedgerStore.__new__(LedgerStore)
+    ledger._init_state(False, DEFAULT_CODEC)
+    ledger.current_expenses = ledger._ledger_from_document(read("current_expenses.json", {}))
+    ledger.current_income = ledger._ledger_from_document(read("current_income.json", {}))
+    ledger.current_balance = read("current_balance.json", {}).get("Balance", 0)
+    ledger.current_savings = read("current_savings.json", {}).get("Savings", 0)
+    ledger._recount_totals()
+
+    journal = LedgerJournal(os.path.join(source_dir, "ledger_journal.jsonl"))
+    if "ledger_journal.jsonl" in pending:
+        records = journal.decode(pending["ledger_journal.jsonl"].splitlines()) # Emptied by a checkpoint that never finished
+    else:
+        records = journal.read()
+
+    ledger._apply_records(records)
+
+    return ledger
+
+def import_json_ledger(source_dir: str = ".", db_path: str = "ledger.db") -> int:
+    """ One-shot import of the JSON files and History/ folder into a fresh database, returns the number of months imported """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists, refusing to import over it")
+
+    current = _read_current_month(source_dir)
+
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    months = 0
+
+    try:
+        with connection:
+            connection.executescript(SCHEMA)
+
+            for path in glob.glob(os.path.join(source_dir, LedgerStore.HISTORY_PATH, "*.json")):
+                label = os.path.basename(path).removesuffix(".json")
+                data = _read_document(path, {})
+
+                cursor = connection.execute(
+                    "INSERT INTO months (label, ordinal, total_expenses, total_income) VALUES (?, ?, ?, ?)",
+                    (label, month_ordinal(datetime.strptime(label, "%B %Y")), data.get("Total Expenses", 0), data.get("Total Income", 0))
+                )
+                connection.execute(
+                    "INSERT INTO balance_checkpoints (month_id, balance, savings) VALUES (?, ?, ?)",
+                    (cursor.lastrowid, data.get("Balance", 0), data.get("Savings", 0))
+                )
+                _insert_month(connection, cursor.lastrowid, "expense", data.get("Expense", {}))
+                _insert_month(connection, cursor.lastrowid, "income", data.get("Income", {}))
+                months += 1
+
+            cursor = connection.execute("INSERT INTO months (is_current) VALUES (1)")
+            connection.execute(
+                "INSERT INTO balance_checkpoints (month_id, balance, savings) VALUES (?, ?, ?)",
+                (cursor.lastrowid, current.current_balance, current.current_savings)
+            )
+            _insert_month(connection, cursor.lastrowid, "expense", current._expenses_document())
+            _insert_month(connection, cursor.lastrowid, "income", current._income_document())
+
+    except Exception:
+        connection.close()
+        os.remove(db_path) # Don't leave a half imported database around
+        raise
+
+    connection.close()
+    return months
+
+
+if __name__ == "__main__":
+    # python -m Utils.SQLiteLedgerStore [source_dir] [db_path]
+    source_dir = sys.argv[1] if len(sys.argv) > 1 else "."
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "ledger.db"
+
+    imported = import_json_ledger(source_dir, db_path)
+    print(f"Imported the current month and {imported} history months into {db_path}")
@@ -0,0 +1,587 @@
+import json
+import math
+import os
+import re
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from functools import lru_cache
+from heapq import nlargest
+from itertools import chain, islice
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from Utils.HistoryCache import HistoryCache
+from Utils.HistoryIndex import month_ordinal
+from Utils.LedgerEntry import date_ordinal, ordinal_to_date
+from Utils.Profiling import profiler
+
+KINDS = ("expense", "income")
+MONTH_FORMAT = 2 # Bumped whenever the month files change shape, so the old ones get rewritten
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+def _words(category: str, description: str) -> set:
+    """ The words a group of entries can be found by """
+    return set(tokenize(category) + tokenize(description))
+
+def _shard(word: str) -> str:
+    """ Which terms/ file a word's postings live in; Every word sharing a first letter shares a shard, so prefixes do too """
+    return f"{ord(word[0]):x}"
+
+def _starting_with(words: List[str], prefix: str) -> Iterator[str]:
+    """ The words in sorted `words` that start with `prefix` """
+    i = bisect_left(words, prefix)
+    while i < len(words) and words[i].startswith(prefix):
+        yield words[i]
+        i += 1
+
+def _by_description(ordinals: Sequence[int], cents: Sequence[int], descriptions: Sequence[str]) -> Dict[str, List[Tuple[int, int]]]:
+    """ One category's (ordinal, cents) rows per description, the descriptions in the order they first turn up """
+    rows: Dict[str, List[Tuple[int, int]]] = {}
+    for ordinal, amount, description in zip(ordinals, cents, descriptions):
+        if description not in rows:
+            rows[description] = []
+        rows[description].append((ordinal, amount))
+
+    return rows
+
+def _label_month(label: Optional[str]) -> int:
+    """ Month ordinal of an archived month's label; None is the current month, worked out fresh since the month moves on """
+    return _archived_month(label) if label else month_ordinal(datetime.now())
+
+@lru_cache(maxsize=1024)
+def _archived_month(label: str) -> int:
+    return month_ordinal(datetime.strptime(label, "%B %Y"))
+
+def _month_columns(expenses: Dict, income: Dict) -> Dict:
+    """ What gets saved for a month: per kind and category, its date-sorted ordinals, cents and descriptions """
+    return {
+        kind: {
+            name: {
+                "ordinals": list(info["entries"].ordinals),
+                "cents": list(info["entries"].cents),
+                "descriptions": [ info["entries"].description(i) for i in range(len(info["entries"])) ],
+            }
+            for name, info in ledger_half.items()
+        }
+        for kind, ledger_half in (("expense", expenses), ("income", income))
+    }
+
+def _column_rows(label: str, kind: str, name: str, ordinals: Sequence[int], cents: Sequence[int], description: Callable[[int], str],
+                 start: int, end: int, min_amount: Optional[float], max_amount: Optional[float]) -> Iterator[Dict]:
+    """ The rows of one category's columns dated within [start, end] and, if given, within the amount bounds """
+    low = bisect_left(ordinals, start)
+    high = bisect_right(ordinals, end, lo=low)
+
+    min_cents = round(min_amount * 100) if min_amount is not None else None
+    max_cents = round(max_amount * 100) if max_amount is not None else None
+
+    for i in range(low, high):
+        if (min_cents is not None and cents[i] < min_cents) or (max_cents is not None and cents[i] > max_cents):
+            continue
+
+        yield {
+            "month": label,
+            "kind": kind,
+            "category": name,
+            "date": ordinal_to_date(ordinals[i]).strftime("%d-%m-%Y"),
+            "description": description(i),
+            "amount": cents[i] / 100,
+        }
+
+def _column_slice(entries, start: int, end: int) -> Dict:
+    """ A copy of the live EntryColumns' entries dated within [start, end], shaped like an archived month's columns """
+    low = bisect_left(entries.ordinals, start)
+    high = bisect_right(entries.ordinals, end, lo=low)
+
+    return {
+        "ordinals": list(entries.ordinals[low:high]),
+        "cents": list(entries.cents[low:high]),
+        "descriptions": [ entries.description(i) for i in range(low, high) ],
+    }
+
+
+class SearchIndex:
+    """
+    Inverted index over entry descriptions and category names, for the current month and every archived month.
+
+    The words point at groups, all of a category's entries with the same description, rather than at single entries,
+    since descriptions repeat a lot. On disk, under `index_path`:
+
+        <month>.json        an archived month's entries as date-sorted columns (day ordinals, cents, descriptions) per
+                            kind and category, one JSON line each, after a header line with the ledger's fingerprint
+                            of the month and where in the file each category's line is
+        terms/<shard>.json  the archived months' postings, one file per first letter of the word: word -> a list of
+                            [month, kind, category, [group ids]], a group id being the description's place among the
+                            category's distinct descriptions in the order they first turn up in its columns
+        manifest.json       the months the postings cover, by fingerprint and month file format, and how many groups
+                            each one has
+
+    In memory an archived group is (month, kind, category, group id) and a current month one (None, kind, category,
+    description).
+
+    A search opens the manifest, the shards of the words it was given and then only the categories its results come
+    from; A query only the categories it asks for, in the months its dates cover. A month that was edited, replaced or
+    removed gets its postings redone before either. The current month is indexed
+    in memory straight from the live ledger and kept in step by LedgerStore's mutation paths; At rollover it is written
+    out as the newly archived month.
+
+    Nothing is read until the first search, so startup doesn't pay for it.
+    """
+
+    def __init__(self, ledger, index_path: str = "SearchIndex") -> None:
+        self.ledger = ledger
+        self.index_path = index_path
+        self.terms_path = os.path.join(index_path, "terms")
+        self.manifest_path = os.path.join(index_path, "manifest.json")
+        self.loaded = False
+        self.history_loaded = False
+
+        self.manifest: Dict[str, Dict] = {}         # label -> {"fingerprint", "format", "groups"} for every month in the postings
+        self.shards: Dict[str, Dict[str, List[List]]] = {} # shards read so far -> word -> [month, kind, category, group ids]
+        self.shard_words: Dict[str, List[str]] = {} # shard -> its words, sorted
+        self.month_cache = HistoryCache(16 * 1024 * 1024) # Month files' headers, and the categories read from them so far
+
+        self.postings: Dict[str, Dict[Tuple, None]] = {} # Current month: word -> groups it appears in, in insertion order
+        self.current_counts: Dict[Tuple, int] = {}  # current month's groups -> how many entries they have
+        self._sorted_words: Optional[List[str]] = None
+
+        # Searches run on a worker thread while the UI keeps changing the ledger. The ledger calls in here holding its
+        # own lock, so that one always gets taken first: Never take `self.ledger.lock` while holding this one
+        self._lock = threading.RLock()
+
+    # ---------- Keeping it up to date ----------
+
+    def add_entry(self, kind: str, category: str, entry: dict) -> None:
+        if not self.loaded:
+            return # Gets built from the ledger as it is by then
+
+        with self._lock:
+            group = (None, kind, category, entry["description"])
+            count = self.current_counts.get(group, 0)
+            self.current_counts[group] = count + 1
+
+            if not count:
+                self._post(group)
+
+    def remove_entry(self, kind: str, category: str, entry: dict) -> None:
+        if not self.loaded:
+            return
+
+        with self._lock:
+            group = (None, kind, category, entry["description"])
+            count = self.current_counts.get(group, 0) - 1
+
+            if count > 0:
+                self.current_counts[group] = count
+            elif count == 0:
+                del self.current_counts[group]
+                self._unpost(group)
+
+    def archive(self, label: str) -> None:
+        """ The current month just became `label` in History/; Call holding the ledger's lock, before it is emptied """
+        month = self._save_month(label, _month_columns(self.ledger.current_expenses, self.ledger.current_income))
+
+        with self._lock:
+            for group in list(self.current_counts):
+                self._unpost(group)
+            self.current_counts.clear()
+
+            if self.history_loaded:
+                self._update_postings({ label: month }, [])
+
+    # ---------- Searching ----------
+
+    def search(self, text: str, limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Entries whose description or category matches the words in `text`, best first. Every word has to match,
+        as a whole word or the start of one; Rarer words count for more, and ties go to the most recent month.
+        """
+        self.load()
+        words = tokenize(text)
+        if not words:
+            return
+
+        with self._lock:
+            scores: Dict[Tuple, float] = {}
+            total_groups = len(self.current_counts) + sum(month["groups"] for month in self.manifest.values())
+
+            for i, word in enumerate(words):
+                matched: Dict[Tuple, None] = {}
+                for token in self._tokens_starting_with(word):
+                    matched.update(self.postings[token])
+
+                shard = self._read_shard(_shard(word))
+                for token in _starting_with(self.shard_words[_shard(word)], word):
+                    for label, month_kind, name, ids in shard[token]:
+                        matched.update(dict.fromkeys((label, month_kind, name, i) for i in ids))
+
+                weight = math.log(1 + total_groups / max(len(matched), 1))
+
+                if i == 0:
+                    scores = { group: weight for group in matched }
+                else:
+                    scores = { group: score + weight for group, score in scores.items() if group in matched }
+
+                if not scores:
+                    return
+
+            # Every group has at least one entry, so `limit` groups are always enough for `limit` rows
+            ranked = nlargest(limit or len(scores), scores, key=lambda group: (scores[group], _label_month(group[0])))
+
+        categories: Dict[Tuple, Tuple] = {} # (month, kind, category) -> its rows per description, read once per search
+        rows = ( row for group in ranked for row in self._group_entries(group, categories) )
+        yield from islice(rows, limit)
+
+    def query(
+        self, kind: Optional[str] = None, category: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None,
+        min_amount: Optional[float] = None, max_amount: Optional[float] = None, limit: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Entries matching every filter given, oldest month first, as the same rows search() gives. Dates are 'DD-MM-YYYY'
+        and amounts in RM, all inclusive. Answered from the index alone: months outside the dates are skipped on their
+        name, only the asked for categories are read from a month's file, and only once the rows before them have been
+        used up, and the date range is bisected out of the date-sorted columns.
+        """
+        self.load()
+        start = date_ordinal(date_from) if date_from else 0
+        end = date_ordinal(date_to) if date_to else sys.maxsize
+        first_month = month_ordinal(ordinal_to_date(start)) if date_from else 0
+        last_month = month_ordinal(ordinal_to_date(end)) if date_to else sys.maxsize
+
+        with self._lock:
+            labels = sorted((label for label in self.manifest if first_month <= _label_month(label) <= last_month), key=_label_month)
+
+        def month_rows(label: str, names: Dict[str, Dict], columns_of: Callable[[str, str], Optional[Dict]]) -> Iterator[Dict]:
+            for month_kind in KINDS:
+                if kind is not None and month_kind != kind:
+                    continue
+
+                for name in ([category] if category is not None else names[month_kind]):
+                    columns = columns_of(month_kind, name)
+                    if columns is None:
+                        continue
+
+                    yield from _column_rows(label, month_kind, name, columns["ordinals"], columns["cents"], columns["descriptions"].__getitem__,
+                                            start, end, min_amount, max_amount)
+
+        def archived_rows(label: str) -> Iterator[Dict]:
+            month = self._month(label)
+            if month is not None:
+                yield from month_rows(label, month["categories"], lambda month_kind, name: self._columns(label, month_kind, name))
+
+        rows = chain.from_iterable(archived_rows(label) for label in labels)
+
+        current_month = month_ordinal(datetime.now())
+        if first_month <= current_month <= last_month:
+            # Copied out under the ledger's lock, since the rows get handed out long after it's let go of
+            with self.ledger.lock:
+                current = {
+                    month_kind: { name: _column_slice(info["entries"], start, end) for name, info in self._current(month_kind).items() if category in (None, name) }
+                    for month_kind in KINDS if kind in (None, month_kind)
+                }
+            rows = chain(rows, month_rows(datetime.now().strftime("%B %Y"), current, lambda month_kind, name: current[month_kind].get(name)))
+
+        yield from islice(rows, limit)
+
+    def load(self) -> None:
+        """ Bring the archived months' postings up to date with History/, and index the current month """
+        if self.loaded:
+            return
+
+        with self._lock:
+            if not self.history_loaded:
+                self._sync_history()
+                self.history_loaded = True
+
+        # The current month is read from the live ledger, so it's indexed under the ledger's lock; From here on
+        # add_entry()/remove_entry() keep it up to date, with nothing slipping in between
+        with self.ledger.lock, self._lock:
+            if self.loaded:
+                return
+
+            self.loaded = True
+
+            for kind in KINDS:
+                for name, info in self._current(kind).items():
+                    for entry in info["entries"]:
+                        self.add_entry(kind, name, entry)
+
+    # ---------- Internals ----------
+
+    def _current(self, kind: str) -> Dict:
+        return self.ledger.current_expenses if kind == "expense" else self.ledger.current_income
+
+    def _post(self, group: Tuple) -> None:
+        for token in _words(group[2], group[3]):
+            if token not in self.postings:
+                self.postings[token] = {}
+                self._sorted_words = None
+
+            self.postings[token][group] = None
+
+    def _unpost(self, group: Tuple) -> None:
+        for token in _words(group[2], group[3]):
+            groups = self.postings.get(token)
+            if groups is None:
+                continue
+
+            groups.pop(group, None)
+            if not groups:
+                del self.postings[token]
+                self._sorted_words = None
+
+    def _tokens_starting_with(self, word: str) -> Iterator[str]:
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self.postings)
+
+        return _starting_with(self._sorted_words, word)
+
+    def _sync_history(self) -> None:
+        """ Redo the postings of every month that changed, appeared or disappeared since they were last written """
+        os.makedirs(self.terms_path, exist_ok=True)
+        self.manifest = self._read_json(self.manifest_path) or {}
+        labels = set(self.ledger.get_expenses_history())
+
+        changed = {}
+        for label in labels:
+            fingerprint = self.ledger.history_fingerprint(label)
+            indexed = self.manifest.get(label, {})
+            if indexed.get("fingerprint") == fingerprint and indexed.get("format") == MONTH_FORMAT:
+                continue
+
+            month = self._load_month(label, fingerprint) or self._build_month(label)
+            if month is not None:
+                changed[label] = month
+
+        removed = [ label for label in self.manifest if label not in labels ]
+        if changed or removed:
+            self._update_postings(changed, removed)
+
+        # Months that left History/ take their columns with them
+        for filename in os.listdir(self.index_path):
+            if filename.endswith(".json") and filename != "manifest.json" and filename.removesuffix(".json") not in labels:
+                os.remove(os.path.join(self.index_path, filename))
+
+    def _update_postings(self, months: Dict[str, Dict], removed: List[str]) -> None:
+        """ Write `months`' groups into the shards, replacing whatever they had before, and drop the `removed` months' """
+        added: Dict[str, Dict[str, Dict[Tuple, List[int]]]] = {} # shard -> word -> (month, kind, category) -> new group ids
+        counts = {}
+        for label, month in months.items():
+            counts[label] = 0
+
+            for kind in KINDS:
+                for name, columns in month[kind].items():
+                    descriptions = list(dict.fromkeys(columns["descriptions"]))
+                    counts[label] += len(descriptions)
+
+                    for i, description in enumerate(descriptions):
+                        for token in _words(name, description):
+                            added.setdefault(_shard(token), {}).setdefault(token, {}).setdefault((label, kind, name), []).append(i)
+
+        # A month that was already in there could have words in any shard; Only a brand new one can stick to its own
+        dropped = set(removed) | { label for label in months if label in self.manifest }
+        shards = set(added)
+        if dropped:
+            shards.update(filename.removesuffix(".json") for filename in os.listdir(self.terms_path) if filename.endswith(".json"))
+
+        for shard in shards:
+            words = dict(self._read_shard(shard))
+
+            if dropped:
+                words = { word: kept for word, postings in words.items() if (kept := [ posting for posting in postings if posting[0] not in dropped ]) }
+
+            for word, categories in added.get(shard, {}).items():
+                # A month can already be in here if a save got cut short before the manifest
+                postings = { tuple(posting[:3]): posting[3] for posting in words.get(word, []) }
+                postings.update(categories)
+                words[word] = [ [*category, ids] for category, ids in postings.items() ]
+
+            self._write_json(os.path.join(self.terms_path, shard + ".json"), words)
+            self.shards[shard] = words
+            self.shard_words[shard] = sorted(words)
+
+        # Written last, so months whose postings didn't all make it to disk get redone next time
+        for label in dropped:
+            self.manifest.pop(label, None)
+        for label, month in months.items():
+            self.manifest[label] = { "fingerprint": month["fingerprint"], "format": MONTH_FORMAT, "groups": counts[label] }
+
+        self._write_json(self.manifest_path, self.manifest)
+
+    def _read_shard(self, shard: str) -> Dict[str, List[List]]:
+        if shard not in self.shards:
+            self.shards[shard] = self._read_json(os.path.join(self.terms_path, shard + ".json")) or {}
+            self.shard_words[shard] = sorted(self.shards[shard])
+
+        return self.shards[shard]
+
+    def _month(self, label: str) -> Optional[Dict]:
+        """ An archived month's file header, with whatever categories have been read from it so far; None if it's gone """
+        try:
+            return self.month_cache.get(self._month_file(label), self._read_header)
+        except (OSError, ValueError) as e:
+            print(f"Failed to read search index for {label}: {e}")
+            return None
+
+    def _read_header(self, path: str) -> Dict:
+        with open(path, "rb") as file:
+            line = file.readline()
+            stat = os.fstat(file.fileno())
+
+        header = json.loads(line)
+
+        if header.get("format") != MONTH_FORMAT:
+            raise ValueError("written by another version") # The manifest says otherwise, so it was swapped in by hand
+
+        profiler.count_file_read(path)
+        header["start"] = len(line) # Where the categories' offsets count from
+        header["stat"] = (stat.st_mtime_ns, stat.st_size)
+        header["columns"] = {}
+        return header
+
+    def _columns(self, label: str, kind: str, name: str) -> Optional[Dict]:
+        """ One category's columns in an archived month, reading just its line of the month's file the first time """
+        month = self._month(label)
+        if month is None or name not in month["categories"][kind]:
+            return None
+
+        key = (kind, name)
+        if key not in month["columns"]:
+            offset, length = month["categories"][kind][name]
+
+            try:
+                with open(self._month_file(label), "rb") as file:
+                    stat = os.fstat(file.fileno())
+                    if (stat.st_mtime_ns, stat.st_size) != month["stat"]:
+                        return None # Replaced since the header was read; The next search reads the new one
+
+                    file.seek(month["start"] + offset)
+                    month["columns"][key] = json.loads(file.read(length))
+            except (OSError, ValueError) as e:
+                print(f"Failed to read search index for {label}: {e}")
+                return None
+
+            profiler.count_file_read(self._month_file(label))
+
+        return month["columns"][key]
+
+    def _group_entries(self, group: Tuple, categories: Dict[Tuple, Tuple]) -> Iterator[Dict]:
+        label, kind, name, description = group
+        key = (label, kind, name)
+
+        if key not in categories:
+            if label is None:
+                with self.ledger.lock: # The UI may be changing this category right now
+                    entries = self._current(kind).get(name, {}).get("entries")
+                    columns = _column_slice(entries, 0, sys.maxsize) if entries is not None else None
+            else:
+                columns = self._columns(label, kind, name)
+
+            by_description = _by_description(columns["ordinals"], columns["cents"], columns["descriptions"]) if columns is not None else {}
+            categories[key] = (by_description, list(by_description))
+
+        by_description, descriptions = categories[key]
+        if label is None:
+            label = datetime.now().strftime("%B %Y")
+        elif description < len(descriptions):
+            description = descriptions[description] # Archived groups are ids
+        else:
+            return # The month file changed under the postings
+
+        for ordinal, cents in reversed(by_description.get(description, ())): # Newest first
+            yield {
+                "month": label,
+                "kind": kind,
+                "category": name,
+                "date": ordinal_to_date(ordinal).strftime("%d-%m-%Y"),
+                "description": description,
+                "amount": cents / 100,
+            }
+
+    def _month_file(self, label: str) -> str:
+        return os.path.join(self.index_path, label + ".json")
+
+    def _load_month(self, label: str, fingerprint) -> Optional[Dict]:
+        """ The whole of the month's file, if it was written from the History/ file as it is now """
+        try:
+            with open(self._month_file(label), "rb") as file:
+                header = json.loads(file.readline())
+                if header.get("fingerprint") != fingerprint or header.get("format") != MONTH_FORMAT:
+                    return None # The month changed since it was indexed, or the file is from an older version
+
+                month = { "fingerprint": fingerprint }
+                for kind in KINDS:
+                    month[kind] = { name: json.loads(file.readline()) for name in header["categories"][kind] } # Written in header order
+        except (OSError, ValueError):
+            return None
+
+        profiler.count_file_read(self._month_file(label))
+        return month
+
+    def _build_month(self, label: str) -> Optional[Dict]:
+        try:
+            expenses = self.ledger.load_expense_history(label + ".json")
+            income = self.ledger.load_income_history(label + ".json")
+        except Exception as e:
+            print(f"Failed to index {label}: {e}")
+            return None
+
+        return self._save_month(label, _month_columns(expenses, income))
+
+    def _save_month(self, label: str, month: Dict) -> Dict:
+        month = { "fingerprint": self.ledger.history_fingerprint(label), **month }
+
+        # Each category on a line of its own, so a query or search can read only the ones it needs
+        lines, categories, offset = [], { kind: {} for kind in KINDS }, 0
+        for kind in KINDS:
+            for name, columns in month[kind].items():
+                line = json.dumps(columns, separators=(",", ":")).encode() + b"\n"
+                categories[kind][name] = [offset, len(line)]
+                lines.append(line)
+                offset += len(line)
+
+        header = json.dumps({ "fingerprint": month["fingerprint"], "format": MONTH_FORMAT, "categories": categories }, separators=(",", ":")).encode() + b"\n"
+
+        try:
+            os.makedirs(self.index_path, exist_ok=True)
+
+            temp_path = self._month_file(label) + ".tmp"
+            with open(temp_path, "wb") as file:
+                file.write(header)
+                file.writelines(lines)
+                profiler.count_written(file.tell())
+
+            os.replace(temp_path, self._month_file(label))
+
+        except Exception as e:
+            print(f"Failed to save search index for {label}: {e}")
+
+        return month
+
+    def _read_json(self, path: str) -> Optional[Dict]:
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return None
+
+        profiler.count_file_read(path)
+        return data
+
+    def _write_json(self, path: str, data: Dict) -> None:
+        try:
+            temp_path = path + ".tmp"
+            with open(temp_path, "w") as file:
+                json.dump(data, file, separators=(",", ":"))
+                profiler.count_written(file.tell())
+
+            os.replace(temp_path, path)
+
+        except Exception as e:
+            print(f"Failed to save search index file {path}: {e}")
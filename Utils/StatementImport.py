@@ -0,0 +1,134 @@
+import csv
+import os
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+from Utils.LedgerEntry import DATE_FORMAT
+
+# Statement column for each ledger field; "kind" is optional, without it the amount's sign decides
+DEFAULT_COLUMNS = { "category": "Category", "description": "Description", "date": "Date", "amount": "Amount", "kind": "Kind" }
+DEFAULT_CATEGORY = "Imported"
+
+_OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+@lru_cache(maxsize=4096)
+def _ledger_date(value: str, date_format: str) -> str:
+    """ A statement date in the ledger's 'DD-MM-YYYY'; A statement only has a few distinct dates, so it's cached """
+    return datetime.strptime(value.strip(), date_format).strftime(DATE_FORMAT)
+
+def _to_row(category: str, description: str, payment_date: str, amount: float, kind: Optional[str] = None) -> Dict:
+    # Money going out is an expense, money coming in is income, unless the statement says otherwise
+    if kind is None:
+        kind = "expense" if amount < 0 else "income"
+
+    return {
+        "kind": kind,
+        "name": category or DEFAULT_CATEGORY,
+        "entry": { "description": description, "payment_date": payment_date, "value": abs(amount) },
+    }
+
+def read_csv(path: str, columns: Optional[Dict[str, str]] = None, date_format: str = DATE_FORMAT) -> Iterator[Dict]:
+    """
+    Stream a bank statement CSV as ledger rows ({"kind", "name", "entry"}), one line at a time. `columns` maps ledger
+    fields to the statement's headers (see DEFAULT_COLUMNS); Rows with a zero or empty amount are skipped.
+    """
+    columns = { **DEFAULT_COLUMNS, **(columns or {}) }
+
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        headers = reader.fieldnames or []
+        has_category = columns["category"] in headers
+        has_kind = columns["kind"] in headers
+
+        # Category and kind can be left out, the rest can't
+        missing = [ columns[field] for field in ("description", "date", "amount") if columns[field] not in headers ]
+        if missing:
+            raise ValueError(f"{path} has no {', '.join(missing)} column(s)")
+
+        for line in reader:
+            amount = (line[columns["amount"]] or "").replace(",", "").strip()
+            if not amount or float(amount) == 0:
+                continue
+
+            kind = None
+            if has_kind and line[columns["kind"]]:
+                kind = "income" if line[columns["kind"]].strip().lower() in ("income", "credit", "cr") else "expense"
+
+            yield _to_row(
+                line[columns["category"]].strip() if has_category else DEFAULT_CATEGORY,
+                line[columns["description"]].strip(),
+                _ledger_date(line[columns["date"]], date_format),
+                float(amount),
+                kind
+            )
+
+def read_ofx(path: str, category: str = DEFAULT_CATEGORY, chunk_size: int = 64 * 1024) -> Iterator[Dict]:
+    """
+    Stream the <STMTTRN> transactions out of an OFX statement as ledger rows, a chunk of the file at a time.
+    OFX has no categories, so everything lands in `category`.
+    """
+    buffer = ""
+
+    with open(path, encoding="utf-8", errors="replace") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            buffer += chunk
+
+            # Hand over every transaction that's complete so far, keep the partial one for the next chunk
+            while True:
+                start = buffer.find("<STMTTRN>")
+                end = buffer.find("</STMTTRN>", start)
+                if start == -1 or end == -1:
+                    break
+
+                fields = dict(_OFX_FIELD.findall(buffer[start + len("<STMTTRN>"):end]))
+                buffer = buffer[end + len("</STMTTRN>"):]
+
+                amount = float(fields.get("TRNAMT", "0").strip() or 0)
+                if amount == 0:
+                    continue
+
+                description = fields.get("NAME", "").strip() or fields.get("MEMO", "").strip()
+                yield _to_row(category, description, _ledger_date(fields["DTPOSTED"].strip()[:8], "%Y%m%d"), amount)
+
+            if not chunk:
+                break
+
+            if start == -1:
+                buffer = buffer[-len("<STMTTRN>"):] # Nothing but a possibly split tag worth keeping
+
+def read_statement(path: str, columns: Optional[Dict[str, str]] = None, date_format: str = DATE_FORMAT, category: str = DEFAULT_CATEGORY) -> Iterator[Dict]:
+    """ Pick the reader from the file extension; .ofx/.qfx are OFX, anything else is treated as CSV """
+    if os.path.splitext(path)[1].lower() in (".ofx", ".qfx"):
+        return read_ofx(path, category)
+
+    return read_csv(path, columns, date_format)
+
+def import_statement(ledger, path: str, columns: Optional[Dict[str, str]] = None, date_format: str = DATE_FORMAT, category: str = DEFAULT_CATEGORY) -> Dict:
+    """
+    Read a statement into the ledger as one batched commit; Returns how many rows went in and how fast, plus the rows
+    that were skipped for being outside the current month (the ledger would archive itself over them otherwise).
+    Nothing is imported if any row can't be read.
+    """
+    started = time.perf_counter()
+    current_month = datetime.now().strftime("-%m-%Y")
+    rows, skipped = [], []
+
+    for row in read_statement(path, columns, date_format, category):
+        (rows if row["entry"]["payment_date"].endswith(current_month) else skipped).append(row)
+
+    count = ledger.import_entries(rows)
+    seconds = time.perf_counter() - started
+
+    return { "rows": count, "skipped": skipped, "seconds": seconds, "rows_per_second": count / seconds if seconds else 0.0 }
+
+def skipped_summary(skipped: List[Dict], limit: int = 5) -> str:
+    """ One line naming the skipped rows, the first few in full """
+    shown = ", ".join(f"{row['entry']['payment_date']} {row['entry']['description']}" for row in skipped[:limit])
+    more = f" and {len(skipped) - limit} more" if len(skipped) > limit else ""
+
+    return f"Skipped {len(skipped)} rows outside the current month: {shown}{more}"
@@ -0,0 +1,159 @@
+"""
+Serialise and parse throughput of every ledger codec on one synthetic archived month, against a stored baseline.
+
+    python -m benchmarks.codec_bench                                  # 50k entries
+    python -m benchmarks.codec_bench --entries 500000 --repeat 5
+    python -m benchmarks.codec_bench --save-baseline
+
+'encode' is what every save does, going from the in-memory entries to the file's contents; 'decode' is parsing those
+back into plain dicts, and 'load' adds building the date-sorted entry columns on top, i.e. what opening a month costs.
+Baselines live in benchmarks/codec_baseline.json, results in benchmarks/results/.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+BASELINE_JSON = os.path.join(BENCHMARKS_DIR, "codec_baseline.json")
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks.ledger_bench import compare, git_commit, summarize
+from benchmarks.synthetic import generate_ledger
+from Utils.LedgerCodec import CODECS, detect_codec, loads
+from Utils.LedgerEntry import to_entries
+
+
+def month_document(entries: int, seed: int) -> Dict:
+    """ One archived month of `entries` entries, shaped like LedgerStore's history document with its entries loaded """
+    scratch = tempfile.mkdtemp(prefix="codec-bench-")
+
+    try:
+        generate_ledger(scratch, entries, 1, seed) # Half lands in the archived month, half in the current one
+        history = os.path.join(scratch, "History")
+
+        with open(os.path.join(history, os.listdir(history)[0])) as file:
+            document = json.load(file)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    for kind in ("Expense", "Income"):
+        document[kind] = { name: list(to_entries(instances)) for name, instances in document[kind].items() }
+
+    return document
+
+def load_month(raw: bytes) -> Dict:
+    """ Parse a month and build its entry columns, like LedgerStore._parse_history_month """
+    data = loads(raw)
+    return { kind: { name: to_entries(instances) for name, instances in data[kind].items() } for kind in ("Expense", "Income") }
+
+def time_call(call: Callable[[], object], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+
+        try:
+            started = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+
+    return timings
+
+def run(document: Dict, repeat: int) -> Dict[str, Dict]:
+    entries = sum(len(instances) for kind in ("Expense", "Income") for instances in document[kind].values())
+    results = {}
+
+    for name, codec in CODECS.items():
+        encoded = codec.encode(document)
+        raw = encoded.encode() if isinstance(encoded, str) else encoded # Files are read back as bytes
+
+        if detect_codec(raw) != name or loads(raw) != json.loads(json.dumps(document)):
+            raise AssertionError(f"{name} didn't round trip")
+
+        for operation, call in (("encode", lambda: codec.encode(document)), ("decode", lambda: loads(raw)), ("load", lambda: load_month(raw))):
+            result = summarize(time_call(call, repeat))
+            result["bytes"] = len(raw)
+            result["mb_per_second"] = len(raw) / 1e6 / (result["median_ms"] / 1000)
+            result["entries_per_second"] = entries / (result["median_ms"] / 1000)
+
+            results[f"{name} {operation}"] = result
+            print(f"  {name} {operation:<8} {result['median_ms']:>10.3f} ms", file=sys.stderr)
+
+    return results
+
+def print_report(results: Dict[str, Dict], comparison: Dict[str, Dict]) -> None:
+    print(f"{'codec operation':<22} {'file bytes':>12} {'median ms':>10} {'MB/s':>8} {'entries/s':>12} {'change':>8}")
+
+    for name, result in results.items():
+        line = f"{name:<22} {result['bytes']:>12,} {result['median_ms']:>10.3f} {result['mb_per_second']:>8.1f} {result['entries_per_second']:>12,.0f}"
+
+        if name in comparison:
+            change = comparison[name]
+            line += f" {change['ratio'] - 1:>+8.0%}"
+            if change["regression"]: line += "  REGRESSION"
+        else:
+            line += f" {'-':>8}"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ledger codecs on a synthetic month")
+    parser.add_argument("--entries", type=int, default=50_000, help="entries in the generated month")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per codec and operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threshold", type=float, default=1.5, help="median/baseline ratio that counts as a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline for its size")
+    args = parser.parse_args()
+
+    size = str(args.entries)
+    print(f"Generating a month of {args.entries} entries...", file=sys.stderr)
+    results = run(month_document(args.entries * 2, args.seed), args.repeat)
+
+    meta = {
+        "entries": args.entries,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+    baselines = {}
+    if os.path.exists(BASELINE_JSON):
+        with open(BASELINE_JSON) as file:
+            baselines = json.load(file)
+
+    comparison = compare(results, baselines.get(size, {}).get("results", {}), args.threshold)
+    print_report(results, comparison)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"codec_{size}.json")
+    with open(results_path, "w") as file:
+        json.dump({ "meta": meta, "results": results, "comparison": comparison }, file, indent=4)
+
+    print(f"\nResults written to {os.path.relpath(results_path, REPO_DIR)}")
+
+    if args.save_baseline:
+        baselines[size] = { "meta": meta, "results": results }
+        with open(BASELINE_JSON, "w") as file:
+            json.dump(baselines, file, indent=4)
+
+        print(f"Saved as the {size} baseline")
+
+    elif any(change["regression"] for change in comparison.values()):
+        sys.exit(1)
@@ -0,0 +1,296 @@
+"""
+Times the LedgerStore hot paths on a synthetic ledger and compares them against a stored baseline.
+
+    python -m benchmarks.ledger_bench                                 # 10k entries over 12 archived months
+    python -m benchmarks.ledger_bench --entries 1000000 --months 240 --repeat 3
+    python -m benchmarks.ledger_bench --save-baseline                 # This run becomes the baseline for its size
+
+Each size ('<entries>x<months>') has its own baseline in benchmarks/baseline.json, and every run writes its numbers
+to benchmarks/results/. Baselines are only comparable on the machine they were taken on, so re-take them there.
+Exits with 1 if any operation's median got slower than the baseline by more than --threshold.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+BASELINE_JSON = os.path.join(BENCHMARKS_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks.synthetic import generate_ledger
+from Utils.LedgerStore import LedgerStore
+
+LEDGER_FILES = ("current_expenses.json", "current_income.json", "current_balance.json", "current_savings.json")
+
+
+class LedgerBench:
+    """ Runs every operation against fresh copies of one generated ledger; All timings are in seconds """
+
+    def __init__(self, source: str, work: str, repeat: int, journal: bool, seed: int) -> None:
+        self.source = source
+        self.work = work
+        self.repeat = repeat
+        self.journal = journal
+        self.rng = random.Random(seed)
+
+    def fresh(self, copy_history: bool = False) -> None:
+        """ A clean working copy of the ledger; History/ is only copied for operations that write to it """
+        os.chdir(REPO_DIR) # Can't delete the directory we're standing in
+        shutil.rmtree(self.work, ignore_errors=True)
+        os.makedirs(self.work)
+
+        for filename in LEDGER_FILES:
+            shutil.copy(os.path.join(self.source, filename), self.work)
+
+        if copy_history:
+            shutil.copytree(os.path.join(self.source, "History"), os.path.join(self.work, "History"))
+        else:
+            os.symlink(os.path.join(self.source, "History"), os.path.join(self.work, "History"))
+
+        os.chdir(self.work)
+
+    def open(self) -> LedgerStore:
+        return LedgerStore(journal=self.journal)
+
+    def time(self, call: Callable[[], object]) -> float:
+        gc.collect()
+        gc.disable() # Like timeit, so a collection landing in one run doesn't skew it
+
+        try:
+            started = time.perf_counter()
+            call()
+            return time.perf_counter() - started
+        finally:
+            gc.enable()
+
+    def new_entry(self) -> Dict:
+        return {
+            "description": f"Bench {self.rng.randrange(1000)}",
+            "payment_date": datetime.now().replace(day=self.rng.randint(1, datetime.now().day)).strftime("%d-%m-%Y"),
+            "value": round(self.rng.uniform(1, 500), 2),
+        }
+
+    # ---------- Operations ----------
+
+    def bench_init(self) -> List[float]:
+        timings = []
+        for _ in range(self.repeat):
+            self.fresh()
+            timings.append(self.time(self.open))
+
+        return timings
+
+    def bench_add_new_expense_entry(self) -> List[float]:
+        self.fresh()
+        ledger = self.open()
+        names = sorted(ledger.current_expenses)
+
+        return [ self.time(lambda: ledger.add_new_expense_entry(self.rng.choice(names), self.new_entry())) for _ in range(self.repeat) ]
+
+    def bench_update_expense_entry(self) -> List[float]:
+        self.fresh()
+        ledger = self.open()
+        names = sorted(ledger.current_expenses)
+
+        timings = []
+        for _ in range(self.repeat):
+            name = self.rng.choice(names)
+            index = self.rng.randrange(len(ledger.current_expenses[name]["entries"]))
+            timings.append(self.time(lambda: ledger.update_expense_entry(name, index, self.new_entry())))
+
+        return timings
+
+    def bench_remove_expense(self) -> List[float]:
+        timings = []
+        for _ in range(self.repeat):
+            self.fresh()
+            ledger = self.open()
+            name = max(ledger.current_expenses, key=lambda name: len(ledger.current_expenses[name]["entries"])) # The worst case
+            timings.append(self.time(lambda: ledger.remove_expense(name)))
+
+        return timings
+
+    def bench_get_history_dataset_cold(self) -> List[float]:
+        """ First call on a fresh copy, so the summary index gets built from the History/ files """
+        timings = []
+        for _ in range(self.repeat):
+            self.fresh()
+            ledger = self.open()
+            timings.append(self.time(lambda: ledger.get_history_dataset("All")))
+
+        return timings
+
+    def bench_get_history_dataset(self) -> List[float]:
+        self.fresh()
+        ledger = self.open()
+        ledger.get_history_dataset("All")
+
+        return [ self.time(lambda: ledger.get_history_dataset("All")) for _ in range(self.repeat) ]
+
+    def bench_load_expense_history(self) -> List[float]:
+        """ A different month each time, with the cache emptied, so every call parses a file """
+        self.fresh()
+        ledger = self.open()
+        labels = sorted(ledger.get_expenses_history())
+
+        timings = []
+        for _ in range(self.repeat):
+            ledger.history_cache.clear()
+            label = self.rng.choice(labels)
+            timings.append(self.time(lambda: ledger.load_expense_history(label + ".json")))
+
+        return timings
+
+    def bench_reset_ledger(self) -> List[float]:
+        timings = []
+        for _ in range(self.repeat):
+            self.fresh(copy_history=True)
+            ledger = self.open()
+            timings.append(self.time(ledger._reset_ledger))
+
+        return timings
+
+    OPERATIONS = {
+        "LedgerStore.__init__": bench_init,
+        "add_new_expense_entry": bench_add_new_expense_entry,
+        "update_expense_entry": bench_update_expense_entry,
+        "remove_expense": bench_remove_expense,
+        "get_history_dataset (cold)": bench_get_history_dataset_cold,
+        "get_history_dataset": bench_get_history_dataset,
+        "load_expense_history": bench_load_expense_history,
+        "_reset_ledger": bench_reset_ledger,
+    }
+
+    def run(self, only: List[str] = None) -> Dict[str, Dict]:
+        results = {}
+        for name, bench in self.OPERATIONS.items():
+            if only and name not in only:
+                continue
+
+            timings = bench(self)
+            results[name] = summarize(timings)
+            print(f"  {name:<28} {results[name]['median_ms']:>10.3f} ms", file=sys.stderr)
+
+        os.chdir(REPO_DIR)
+        return results
+
+
+def summarize(timings: List[float]) -> Dict:
+    return {
+        "runs": len(timings),
+        "min_ms": min(timings) * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+    }
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> Dict[str, Dict]:
+    """ Median against the baseline's median for every operation both have; 'regression' is set past `threshold` """
+    comparison = {}
+    for name, result in results.items():
+        if name not in baseline or not baseline[name]["median_ms"]:
+            continue
+
+        ratio = result["median_ms"] / baseline[name]["median_ms"]
+        comparison[name] = { "baseline_median_ms": baseline[name]["median_ms"], "ratio": ratio, "regression": ratio > threshold }
+
+    return comparison
+
+def print_report(results: Dict[str, Dict], comparison: Dict[str, Dict]) -> None:
+    print(f"{'operation':<28} {'median ms':>12} {'max ms':>12} {'baseline':>12} {'change':>8}")
+
+    for name, result in results.items():
+        line = f"{name:<28} {result['median_ms']:>12.3f} {result['max_ms']:>12.3f}"
+
+        if name in comparison:
+            change = comparison[name]
+            line += f" {change['baseline_median_ms']:>12.3f} {change['ratio'] - 1:>+8.0%}"
+            if change["regression"]: line += "  REGRESSION"
+        else:
+            line += f" {'-':>12} {'-':>8}"
+
+        print(line)
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark LedgerStore on a synthetic ledger")
+    parser.add_argument("--entries", type=int, default=10_000, help="entries across the current month and all history (1k-1M)")
+    parser.add_argument("--months", type=int, default=12, help="archived History/ months (12-240)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-journal", action="store_true", help="rewrite the snapshot files on every change instead of journaling")
+    parser.add_argument("--only", action="append", choices=list(LedgerBench.OPERATIONS), help="run just this operation (repeatable)")
+    parser.add_argument("--threshold", type=float, default=1.5, help="median/baseline ratio that counts as a regression; Timings under a millisecond are noisy")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline for its size")
+    args = parser.parse_args()
+
+    size = f"{args.entries}x{args.months}"
+    scratch = tempfile.mkdtemp(prefix="ledger-bench-")
+
+    try:
+        print(f"Generating {args.entries} entries over {args.months} months...", file=sys.stderr)
+        generate_ledger(os.path.join(scratch, "source"), args.entries, args.months, args.seed)
+
+        bench = LedgerBench(os.path.join(scratch, "source"), os.path.join(scratch, "work"), args.repeat, not args.no_journal, args.seed)
+        results = bench.run(args.only)
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    meta = {
+        "size": size,
+        "entries": args.entries,
+        "months": args.months,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "journal": not args.no_journal,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+    baselines = {}
+    if os.path.exists(BASELINE_JSON):
+        with open(BASELINE_JSON) as file:
+            baselines = json.load(file)
+
+    comparison = compare(results, baselines.get(size, {}).get("results", {}), args.threshold)
+    print_report(results, comparison)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"ledger_{size}.json")
+    with open(results_path, "w") as file:
+        json.dump({ "meta": meta, "results": results, "comparison": comparison }, file, indent=4)
+
+    print(f"\nResults written to {os.path.relpath(results_path, REPO_DIR)}")
+
+    if args.save_baseline:
+        baselines[size] = { "meta": meta, "results": results }
+        with open(BASELINE_JSON, "w") as file:
+            json.dump(baselines, file, indent=4)
+
+        print(f"Saved as the {size} baseline")
+
+    elif any(change["regression"] for change in comparison.values()):
+        sys.exit(1)
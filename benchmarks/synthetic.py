@@ -0,0 +1,80 @@
+import json
+import os
+import random
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from typing import Dict, List
+
+EXPENSE_CATEGORIES = ("Food", "Transport", "Groceries", "Rent", "Utilities", "Subscriptions", "Shopping", "Health", "Travel", "Gifts", "Savings", "Misc")
+INCOME_CATEGORIES = ("Salary", "Freelance", "Deposit", "Dividends")
+DESCRIPTIONS = (
+    "Grab ride", "Grab food", "Nasi lemak", "Starbucks", "Tesco groceries", "Shell petrol", "Netflix", "Spotify",
+    "Uniqlo", "Dentist", "Electric bill", "Water bill", "Parking", "Toll", "Cinema", "Book", "Pharmacy", "Gym",
+)
+INCOME_SHARE = 0.05 # One entry in twenty is income, about what a real ledger looks like
+
+
+def _month_entries(rng: random.Random, month: datetime, count: int, last_day: int) -> Dict[str, Dict]:
+    """ `count` entries spread over the categories of one month, in the same shape as the ledger's JSON files """
+    expenses = { name: [] for name in EXPENSE_CATEGORIES }
+    income = { name: [] for name in INCOME_CATEGORIES }
+
+    for _ in range(count):
+        is_income = rng.random() < INCOME_SHARE
+        ledger = income if is_income else expenses
+
+        ledger[rng.choice(list(ledger))].append({
+            "description": f"{rng.choice(DESCRIPTIONS)} {rng.randrange(100)}",
+            "payment_date": month.replace(day=rng.randint(1, last_day)).strftime("%d-%m-%Y"),
+            "value": round(rng.uniform(1000, 6000) if is_income else rng.uniform(1, 500), 2),
+        })
+
+    return {
+        "Expense": { name: entries for name, entries in expenses.items() if entries },
+        "Income": { name: entries for name, entries in income.items() if entries },
+    }
+
+def _total(ledger: Dict[str, List[Dict]]) -> float:
+    return round(sum(entry["value"] for entries in ledger.values() for entry in entries), 2)
+
+def generate_ledger(directory: str, entries: int, months: int, seed: int = 0) -> None:
+    """
+    Write a synthetic ledger into `directory`: the current month's JSON files plus `months` archived months in History/,
+    with `entries` entries spread evenly over all of them. The same seed always gives the same entries; Only the dates
+    move, since the current month has to be the real current month or LedgerStore would archive it on load.
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(directory, "History"), exist_ok=True)
+
+    per_month, extra = divmod(entries, months + 1)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    balance = savings = 0.0
+
+    for i in range(months, 0, -1):
+        month = (today - relativedelta(months=i)).replace(day=1)
+        last_day = ((month + relativedelta(months=1)) - relativedelta(days=1)).day
+        document = _month_entries(rng, month, per_month, last_day)
+
+        total_expenses, total_income = _total(document["Expense"]), _total(document["Income"])
+        balance = round(balance + total_income - total_expenses, 2)
+        savings = round(savings + _total({ "Savings": document["Expense"].get("Savings", []) }), 2)
+
+        document.update({ "Total Expenses": total_expenses, "Total Income": total_income, "Balance": balance, "Savings": savings })
+
+        with open(os.path.join(directory, "History", month.strftime("%B %Y") + ".json"), "w") as file:
+            json.dump(document, file, indent=4)
+
+    current = _month_entries(rng, today.replace(day=1), per_month + extra, today.day)
+    balance = round(balance + _total(current["Income"]) - _total(current["Expense"]), 2)
+    savings = round(savings + _total({ "Savings": current["Expense"].get("Savings", []) }), 2)
+
+    files = {
+        "current_expenses.json": current["Expense"],
+        "current_income.json": current["Income"],
+        "current_balance.json": { "Balance": balance },
+        "current_savings.json": { "Savings": savings },
+    }
+
+    for filename, data in files.items():
+        with open(os.path.join(directory, filename), "w") as file:
+            json.dump(data, file, indent=4)
@@ -0,0 +1,235 @@
+"""
+Drives FinanceTrackerApp headless over a synthetic ledger and reports per-action latency (p50/p95) against a baseline.
+
+    python -m benchmarks.ui_bench                                     # 20k entries over 24 archived months
+    python -m benchmarks.ui_bench --entries 200000 --months 120 --rounds 30
+    python -m benchmarks.ui_bench --save-baseline
+
+Every action is timed from the key press until the app is idle again, so it covers the handlers, any mounting and
+the repaint. That includes Pilot's own waiting for idle, which grows with the number of mounted widgets; The
+'no-op key' row is a key nothing is bound to, i.e. that floor. Highlighting an option is timed twice: right after
+the ledger changed (the view gets brought up to date) and with its view cached.
+Baselines live in benchmarks/ui_baseline.json, results in benchmarks/results/.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+BASELINE_JSON = os.path.join(BENCHMARKS_DIR, "ui_baseline.json")
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks.ledger_bench import git_commit
+from benchmarks.synthetic import generate_ledger
+
+OPTIONS = ("Current Expenses", "Income", "Expenses History", "Income History", "Dashboard", "Query")
+
+
+def option_action(option: str, cached: bool) -> str:
+    name = "switch to Dashboard" if option == "Dashboard" else f"highlight {option}"
+    return name + " (cached)" if cached else name
+
+
+class UIBench:
+    """ One headless app session; `timings` collects seconds per action name """
+
+    def __init__(self, app, pilot) -> None:
+        self.app = app
+        self.pilot = pilot
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+
+    @property
+    def right_panel(self):
+        return self.app.screen.right_panel
+
+    async def timed(self, action: str, *keys: str) -> None:
+        started = time.perf_counter()
+        await self.pilot.press(*keys)
+        await self.pilot.pause()
+        self.timings[action].append(time.perf_counter() - started)
+
+    async def wait_for(self, condition, timeout: float = 60) -> None:
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("The app never got there")
+
+            await self.pilot.pause(0.01)
+
+    async def start(self) -> None:
+        import tui
+        await self.wait_for(lambda: tui.finance_ledger is not None and self.right_panel.current_title == "Current Expenses")
+
+    async def options_round(self) -> None:
+        """ Down through every option straight after a ledger change, then back up through the cached views """
+        self.right_panel.stale_views.update(OPTIONS)
+
+        for option in OPTIONS[1:]:
+            await self.timed(option_action(option, cached=False), "j")
+
+        for option in reversed(OPTIONS[:-1]):
+            await self.timed(option_action(option, cached=True), "k")
+
+        await self.timed("no-op key (harness floor)", "z") # Every view is mounted by now, so this is the worst floor
+
+    async def modal_round(self) -> None:
+        """ Open the biggest category, add an entry, delete one, close it again """
+        from Utils.Modals import ExpenseListModal
+
+        self.app.screen.action_focus_right()
+        await self.pilot.pause()
+
+        list_view = self.right_panel.list_view
+        expenses = self.app.screen.right_panel.view_rows["Current Expenses"]
+        list_view.index = max(range(list_view.row_count), key=lambda i: expenses[list_view.rows[i]]) # The biggest total, usually the most entries
+        await self.pilot.pause()
+
+        await self.timed("open category modal", "enter")
+        await self.wait_for(lambda: isinstance(self.app.screen, ExpenseListModal))
+
+        await self.pilot.press("n")
+        await self.pilot.pause()
+        entry_modal = self.app.screen
+        entry_modal.description.value = "Benchmark entry"
+        entry_modal.amount.value = "12.50"
+        entry_modal.amount.focus()
+        await self.timed("add entry", "enter")
+
+        await self.pilot.press("x")
+        await self.pilot.pause()
+        await self.timed("delete entry", "enter")
+
+        await self.timed("close category modal", "escape")
+        await self.pilot.press("h")
+        await self.pilot.pause()
+
+
+def summarize(timings: List[float]) -> Dict:
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> Dict[str, Dict]:
+    """ p50 and p95 against the baseline's; Either one past `threshold` counts as a regression """
+    comparison = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        p50 = result["p50_ms"] / baseline[name]["p50_ms"] if baseline[name]["p50_ms"] else 1.0
+        p95 = result["p95_ms"] / baseline[name]["p95_ms"] if baseline[name]["p95_ms"] else 1.0
+        comparison[name] = { "p50_ratio": p50, "p95_ratio": p95, "regression": p50 > threshold or p95 > threshold }
+
+    return comparison
+
+def print_report(results: Dict[str, Dict], comparison: Dict[str, Dict]) -> None:
+    print(f"{'action':<34} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'p50 vs base':>12} {'p95 vs base':>12}")
+
+    for name, result in results.items():
+        line = f"{name:<34} {result['runs']:>5} {result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} {result['max_ms']:>10.1f}"
+
+        if name in comparison:
+            change = comparison[name]
+            line += f" {change['p50_ratio'] - 1:>+12.0%} {change['p95_ratio'] - 1:>+12.0%}"
+            if change["regression"]: line += "  REGRESSION"
+
+        print(line)
+
+async def run_session(rounds: int, size: tuple) -> Dict[str, List[float]]:
+    import tui
+
+    app = tui.FinanceTrackerApp()
+    async with app.run_test(size=size) as pilot:
+        bench = UIBench(app, pilot)
+        await bench.start()
+
+        for i in range(rounds):
+            await bench.options_round()
+            await bench.modal_round()
+            print(f"  round {i + 1}/{rounds}", file=sys.stderr)
+
+        await app.action_quit()
+
+    return bench.timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark UI latency with a headless FinanceTrackerApp")
+    parser.add_argument("--entries", type=int, default=20_000, help="entries across the current month and all history")
+    parser.add_argument("--months", type=int, default=24, help="archived History/ months")
+    parser.add_argument("--rounds", type=int, default=20, help="passes over every option and the category modal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", default="140x40", help="terminal size, COLUMNSxROWS")
+    parser.add_argument("--threshold", type=float, default=1.5, help="p50 or p95 ratio to the baseline that counts as a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline for its size")
+    args = parser.parse_args()
+
+    size = f"{args.entries}x{args.months}"
+    scratch = tempfile.mkdtemp(prefix="ui-bench-")
+
+    try:
+        print(f"Generating {args.entries} entries over {args.months} months...", file=sys.stderr)
+        generate_ledger(scratch, args.entries, args.months, args.seed)
+
+        os.chdir(scratch) # The app reads and writes the ledger in the working directory
+        timings = asyncio.run(run_session(args.rounds, tuple(int(part) for part in args.size.split("x"))))
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    results = { name: summarize(samples) for name, samples in timings.items() }
+
+    meta = {
+        "size": size,
+        "entries": args.entries,
+        "months": args.months,
+        "rounds": args.rounds,
+        "seed": args.seed,
+        "terminal": args.size,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+    baselines = {}
+    if os.path.exists(BASELINE_JSON):
+        with open(BASELINE_JSON) as file:
+            baselines = json.load(file)
+
+    comparison = compare(results, baselines.get(size, {}).get("results", {}), args.threshold)
+    print_report(results, comparison)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"ui_{size}.json")
+    with open(results_path, "w") as file:
+        json.dump({ "meta": meta, "results": results, "comparison": comparison }, file, indent=4)
+
+    print(f"\nResults written to {os.path.relpath(results_path, REPO_DIR)}")
+
+    if args.save_baseline:
+        baselines[size] = { "meta": meta, "results": results }
+        with open(BASELINE_JSON, "w") as file:
+            json.dump(baselines, file, indent=4)
+
+        print(f"Saved as the {size} baseline")
+
+    elif any(change["regression"] for change in comparison.values()):
+        sys.exit(1)
@@ -0,0 +1,190 @@
+"""
+Headless access to the ledger for scripts, cron jobs and shell prompts; Never imports Textual.
+
+    python -m cli add income Salary 5000 "October pay"
+    python -m cli add expense Food 12.50 "Nasi lemak" --date 03-10-2026
+    python -m cli list --kind expense --category Food
+    python -m cli totals                                  # or `totals balance` for just the number
+    python -m cli history --window 5Y --bucket year
+    python -m cli export ledger.csv --from 01-01-2026     # '-' writes to stdout
+    python -m cli import statement.csv --column amount=Debit
+
+Opens the same ledger the TUI would (FINANCE_TRACKER_DB for SQLite), from the working directory.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from Utils.LedgerEntry import DATE_FORMAT
+from Utils.LedgerStore import LedgerStore, open_ledger
+
+TOTALS = ("expenses", "income", "balance", "savings")
+LIST_FIELDS = ("date", "kind", "category", "description", "amount")
+
+
+def print_rows(rows, fields, as_json: bool) -> int:
+    """ Tab separated with a header row, or JSON lines; Returns the row count """
+    count = 0
+    if not as_json:
+        print("\t".join(fields))
+
+    for row in rows:
+        print(json.dumps(row) if as_json else "\t".join(str(row[field]) for field in fields))
+        count += 1
+
+    return count
+
+
+# ---------- Commands ----------
+
+def add(ledger: LedgerStore, args) -> int:
+    today = datetime.now()
+    payment_date = args.date or today.strftime(DATE_FORMAT)
+
+    # The ledger archives itself as soon as it holds an entry from another month, so those don't go in
+    date = datetime.strptime(payment_date, DATE_FORMAT)
+    if (date.year, date.month) != (today.year, today.month):
+        print(f"Failed to add entry: {payment_date} isn't in the current month", file=sys.stderr)
+        return 1
+
+    # Same shape as NewExpenseModal's result, in the same order
+    entry = { "Name": args.category, "Description": args.description, "Payment Date": payment_date, "Amount": args.amount }
+    if args.kind == "expense":
+        ledger.add_new_expense(entry)
+    else:
+        ledger.add_new_income(entry)
+
+    print(f"Balance\t{ledger.get_current_balance():.2f}")
+    return 0
+
+def list_entries(ledger: LedgerStore, args) -> int:
+    from Utils.LedgerExport import export_rows
+
+    first_day = datetime.now().replace(day=1).strftime(DATE_FORMAT) # Keeps every archived month from being opened
+    rows = export_rows(ledger, first_day, None, args.categories)
+    if args.kind:
+        rows = (row for row in rows if row["kind"] == args.kind)
+
+    print_rows(rows, LIST_FIELDS, args.json)
+    return 0
+
+def totals(ledger: LedgerStore, args) -> int:
+    values = {
+        "expenses": ledger.get_total_expenses(),
+        "income": ledger.get_total_income(),
+        "balance": ledger.get_current_balance(),
+        "savings": ledger.get_current_savings(),
+    }
+
+    if args.field:
+        print(f"{values[args.field]:.2f}")
+    elif args.json:
+        print(json.dumps(values))
+    else:
+        for name, value in values.items():
+            print(f"{name.capitalize()}\t{value:.2f}")
+
+    return 0
+
+def history(ledger: LedgerStore, args) -> int:
+    rows = ledger.get_history_dataset(args.window, args.bucket)
+    print_rows(rows, ("Date", "Total Income", "Total Expenses", "Balance", "Savings"), args.json)
+    return 0
+
+def export(ledger: LedgerStore, args) -> int:
+    from Utils.LedgerExport import export_ledger, export_rows, write_csv, write_jsonl
+
+    if args.path == "-":
+        rows = export_rows(ledger, args.start_date, args.end_date, args.categories)
+        (write_jsonl if args.format == "jsonl" else write_csv)(rows, sys.stdout)
+        return 0
+
+    exported = export_ledger(ledger, args.path, args.format, args.start_date, args.end_date, args.categories)
+    print(f"Exported {exported} rows to {args.path}", file=sys.stderr)
+    return 0
+
+def import_(ledger: LedgerStore, args) -> int:
+    from Utils.StatementImport import import_statement, skipped_summary
+
+    result = import_statement(ledger, args.path, dict(mapping.split("=", 1) for mapping in args.column), args.date_format, args.category)
+    print(f"Imported {result['rows']} rows in {result['seconds']:.2f}s ({result['rows_per_second']:,.0f} rows/s)", file=sys.stderr)
+    if result["skipped"]: print(skipped_summary(result["skipped"]), file=sys.stderr)
+    return 0
+
+
+def date_argument(value: str) -> str:
+    try:
+        datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' isn't a DD-MM-YYYY date")
+
+    return value
+
+def build_parser() -> argparse.ArgumentParser:
+    # The choices below are spelled out rather than imported, so building the parser doesn't pull in the modules behind them
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Read and change the Finance Tracker ledger without starting the TUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--json", action="store_true", help="print JSON (lines) instead of tab separated text")
+
+    command = commands.add_parser("add", help="add an entry to the current month")
+    command.add_argument("kind", choices=("expense", "income"))
+    command.add_argument("category")
+    command.add_argument("amount", type=float)
+    command.add_argument("description", nargs="?", default="")
+    command.add_argument("--date", type=date_argument, help="payment date, DD-MM-YYYY (default: today)")
+    command.set_defaults(run=add)
+
+    command = commands.add_parser("list", parents=[output], help="the current month's entries, oldest first per category")
+    command.add_argument("--kind", choices=("expense", "income"))
+    command.add_argument("--category", action="append", dest="categories", help="only this category (repeatable)")
+    command.set_defaults(run=list_entries)
+
+    command = commands.add_parser("totals", parents=[output], help="the current month's totals, balance and savings")
+    command.add_argument("field", nargs="?", choices=TOTALS, help="print just this number")
+    command.set_defaults(run=totals)
+
+    command = commands.add_parser("history", parents=[output], help="monthly, quarterly or yearly summaries, the current month included")
+    command.add_argument("--window", default="12M", choices=("3M", "12M", "5Y", "All"))
+    command.add_argument("--bucket", default="month", choices=("month", "quarter", "year"))
+    command.set_defaults(run=history)
+
+    command = commands.add_parser("export", help="every entry as CSV or JSONL rows")
+    command.add_argument("path", help="output file, or '-' for stdout; '.jsonl' writes JSON lines, anything else CSV")
+    command.add_argument("--format", choices=("csv", "jsonl"))
+    command.add_argument("--from", dest="start_date", type=date_argument, metavar="DD-MM-YYYY", help="first date to include")
+    command.add_argument("--to", dest="end_date", type=date_argument, metavar="DD-MM-YYYY", help="last date to include")
+    command.add_argument("--category", action="append", dest="categories", help="only export these categories (repeatable)")
+    command.set_defaults(run=export)
+
+    command = commands.add_parser("import", help="import a bank statement (CSV or OFX) into the current month")
+    command.add_argument("path")
+    command.add_argument("--date-format", default=DATE_FORMAT, help="strptime format of the statement's dates (CSV only)")
+    command.add_argument("--column", action="append", default=[], metavar="FIELD=HEADER", help="map a ledger field to a CSV header")
+    command.add_argument("--category", default="Imported", help="category for OFX transactions")
+    command.set_defaults(run=import_)
+
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    ledger = open_ledger()
+    try:
+        return args.run(ledger, args)
+    except BrokenPipeError:
+        # Piped into head or similar, which stopped reading; Point stdout at devnull so exiting doesn't complain again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"Failed to {args.command}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        ledger.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
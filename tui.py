@@ -1,22 +1,39 @@
+import json
+import os
+import time
 from datetime import datetime
 
+APP_STARTED = time.perf_counter() # Taken before Textual is even imported, so time-to-first-frame covers the whole startup
+
+from textual import work
 from textual.app import App, ComposeResult
 from textual.containers import Horizontal, HorizontalScroll, Vertical, VerticalScroll
 from textual.screen import Screen
 from textual.widgets import Footer, Header, ListView, ListItem, Static
 
-from Utils.LedgerStore import LedgerStore
+from Utils.LedgerStore import LedgerStore, open_ledger
 from Utils.LeftPanes import HeaderBox, OptionsList, BalanceBox, SavingsBox
-from Utils.CustomWidgets import ExpenseRow
-from Utils.Modals import DepositBalanceModal, NewExpenseModal, ExpenseListModal, IncomeListModal, ConfirmDeleteModal
+from Utils.CustomWidgets import EntryRow, ExpenseRow, ProfileOverlay, TextRow, VirtualList
+from Utils.Modals import DepositBalanceModal, NewExpenseModal, ExpenseListModal, IncomeListModal, ConfirmDeleteModal, ImportStatementModal, SearchModal, QueryModal
 from Utils.DashboardUtils import DashboardScreen
+from Utils.HistoryIndex import HISTORY_BUCKETS, HISTORY_WINDOWS
+from Utils.StatementImport import import_statement, skipped_summary
+from Utils.Profiling import timed
+
+
+# Loaded in a worker once the first frame is up; Stays None until then
+finance_ledger: LedgerStore | None = None
 
+SEARCH_LIMIT = 500 # Best matches shown per search; The right panel only draws what's in view anyway
+QUERY_LIMIT = 5000 # Rows shown per query, oldest month first
 
-finance_ledger = LedgerStore()
+def result_row(row) -> EntryRow:
+    """A search or query result, which can come from any month."""
+    return EntryRow(row["date"], row["amount"], f"{row['month']} - {row['category']}: {row['description']}")
 
 class RightPanel(Vertical):
     DEFAULT_CSS = """
-    ListView, ListItem, Static {
+    ListView, ListItem, Static, VirtualList {
         background: transparent;
     }
 
@@ -34,23 +51,6 @@ class RightPanel(Vertical):
         margin-bottom: 1;
     }
 
-    ExpenseRow {
-        width: 100%;
-        height: auto;
-        padding: 0 1;
-    }
-
-    ExpenseRow > Static:first-child {
-        width: 1fr;
-    }
-
-    ExpenseRow > Static:last-child {
-        width: auto;
-        text-align: right;
-        color: #AFAFD7;
-        padding-right: 2;
-    }
-
     #right-content {
         width: 100%;
         text-align: center;
@@ -78,12 +78,34 @@ class RightPanel(Vertical):
 
     """
     
+    # Which left-pane options need redrawing when part of the ledger changes
+    AFFECTED_VIEWS = {
+        "expense": ("Current Expenses", "Dashboard", "Query"),
+        "income": ("Income", "Dashboard", "Query"),
+        "balance": ("Dashboard",),
+        "savings": ("Dashboard",),
+        "history": ("Current Expenses", "Income", "Expenses History", "Income History", "Dashboard", "Query"),
+    }
+
     def __init__(self):
         super().__init__()
         self.view_mode = "None"
-        self.list_view: ListView | None = None
+        self.list_view: VirtualList | None = None # Whichever list is showing right now, if any
         self.dashboard_view = None
 
+        # One view per left-pane option, kept mounted and hidden while another option is showing
+        self.views = {}
+        self.view_rows = {} # What each row of a list view shows, keyed by category name or filename
+        self.stale_views = set() # Views the ledger changed under since they were last brought up to date
+        self.current_view = None
+
+        # What the Dashboard covers; [W] and [G] cycle through these
+        self.dashboard_window = "12M"
+        self.dashboard_bucket = "month"
+
+        # What the Query view shows, as the QueryModal hands it back; [F] changes it
+        self.query_filters = {}
+
     def compose(self) -> ComposeResult:
         self.current_title = None
 
@@ -97,101 +119,164 @@ class RightPanel(Vertical):
         yield self.total_expense
         yield self.instructions
 
+    def invalidate(self, area):
+        """Ledger change listener; The affected views get brought up to date the next time they're shown."""
+        self.stale_views.update(self.AFFECTED_VIEWS.get(area, ()))
+
+    def has_fresh_view(self, title):
+        return title in self.views and title not in self.stale_views
+
+    @timed("RightPanel.update_content")
     def update_content(self, title, items):
-        """Replace right panel content dynamically."""
-        # Update the top Static
-        right_content = self.query_one("#right-content", Static)
-        right_content.update(f"{title}")
-        self.current_title = title
+        """Show `title`, brought up to date with `items`."""
+        if title in self.views and title != 'Dashboard':
+            self.diff_content(title, items) # Only the rows that changed get touched
+        else:
+            self.build_view(title, items)
 
-        # Remove previous dynamic widget
-        if self.list_view is not None:
-            self.list_view.remove()
-            self.list_view = None
+        self.stale_views.discard(title)
+        self.show_view(title)
 
-        if self.dashboard_view is not None:
-            self.dashboard_view.remove()
-            self.dashboard_view = None
+    def build_view(self, title, items):
+        if title in self.views:
+            self.views.pop(title).remove()
 
-        # Add new items
-        if title == 'Current Expenses':
-            self.content_header.display = True
-            self.instructions.display = True
-            self.total_expense.display = True
+        if title == 'Current Expenses' or title == 'Income':
+            self.view_rows[title] = { name: content['value'] for name, content in items.items() }
+            view = VirtualList(list(self.view_rows[title]), make_row=lambda name: ExpenseRow(name, self.view_rows[title][name]))
 
-            self.view_mode = "expenses"
+        elif title == 'Expenses History' or title == 'Income History':
+            self.view_rows[title] = { filename: filename for filename in items }
+            view = VirtualList(list(self.view_rows[title]), make_row=TextRow)
 
-            self.list_view = ListView()
-            self.query_one("#right-scroll").mount(self.list_view)
+        elif title == 'Dashboard':
+            view = DashboardScreen(
+                history_dataset=items,
+                title=f"Financial Overview - {self.dashboard_window}, {self.dashboard_bucket.capitalize()}ly   [W] Window  [G] Grouping"
+            )
 
-            
-            for name, content in items.items(): 
-                self.list_view.append( ListItem(ExpenseRow(name, content['value'])) )
+        elif title == 'Query':
+            self.view_rows[title] = items
+            view = VirtualList(items, make_row=result_row)
 
-            self.query_one("#instructions-footer", Static).update("[D] Deposit Balance\t[N] New Expense\t\t[X] Delete Expense\t[Enter] Select Expense")
-            self.query_one("#expense-total", Static).update(f"Total:\tRM {finance_ledger.get_total_expenses():.2f}")
+        else:
+            return
 
-        elif title == 'Income':
-            self.content_header.display = True
-            self.instructions.display = True
-            self.total_expense.display = True
+        view.display = False # show_view puts it up
+        self.views[title] = view
+        self.query_one("#right-scroll").mount(view)
 
-            self.view_mode = "income"
+    def diff_content(self, title, items):
+        """Bring a mounted list up to date with the ledger, keyed by row name."""
+        view = self.views[title]
 
-            self.list_view = ListView()
-            self.query_one("#right-scroll").mount(self.list_view)
+        if title == 'Query':
+            # Results have no names to diff by, and a different query is a different list anyway
+            self.view_rows[title] = items
+            view.set_rows(items)
+            view.index = 0 if items else None
+            return
 
-            
-            for name, content in items.items(): 
-                self.list_view.append( ListItem(ExpenseRow(name, content['value'])) )
+        if title == 'Current Expenses' or title == 'Income':
+            values = { name: content['value'] for name, content in items.items() }
+        else:
+            values = { filename: filename for filename in items }
+
+        old_values, self.view_rows[title] = self.view_rows[title], values
+        old_names, names = list(old_values), list(values)
+
+        if old_names == names:
+            for index, name in enumerate(names):
+                if old_values[name] != values[name]:
+                    view.refresh_row(index)
+        else:
+            # Rows were added or removed; Everything above the first difference stays as it is
+            start = next((i for i, (old, new) in enumerate(zip(old_names, names)) if old != new), min(len(old_names), len(names)))
+            selected = view.highlighted_row
+
+            view.rows = names
+            view.refresh_rows(start)
+
+            if selected in values:
+                view.index = names.index(selected) # Keep the cursor on the same row
+
+    def show_view(self, title):
+        """Put up the cached view for `title`, hiding whatever was showing; No ledger reads beyond the running totals."""
+        view = self.views.get(title)
+        if view is None:
+            return
+
+        if self.current_view is not None and self.current_view is not view:
+            self.current_view.display = False
+
+        view.display = True
+        self.current_view = view
+        self.current_title = title
+
+        self.list_view = view if isinstance(view, VirtualList) else None
+        self.dashboard_view = view if title == 'Dashboard' else None
 
-            self.query_one("#instructions-footer", Static).update("[D] Deposit Balance\t[N] New Income\t\t[X] Delete Income\t[Enter] Select Income")
-            self.query_one("#expense-total", Static).update(f"Total:\tRM {finance_ledger.get_total_income():.2f}")
+        # Update the top Static
+        self.content_header.update(f"{title}")
 
-        elif title == 'Expenses History':
+        if title == 'Current Expenses':
+            self.view_mode = "expenses"
             self.content_header.display = True
-            self.total_expense.display = False
-            self.instructions.display = False
+            self.instructions.display = True
+            self.total_expense.display = True
 
-            self.view_mode = "expenses_history"
-            self.list_view = ListView()
-            self.query_one("#right-scroll").mount(self.list_view)
+            self.instructions.update("[D] Deposit Balance\t[N] New Expense\t\t[X] Delete Expense\t[Enter] Select Expense\t[I] Import\t[/] Search")
+            self.total_expense.update(f"Total:\tRM {finance_ledger.get_total_expenses():.2f}")
 
-            for filename in items:
-                self.list_view.append(ListItem(Static(filename)))
+        elif title == 'Income':
+            self.view_mode = "income"
+            self.content_header.display = True
+            self.instructions.display = True
+            self.total_expense.display = True
+
+            self.instructions.update("[D] Deposit Balance\t[N] New Income\t\t[X] Delete Income\t[Enter] Select Income\t[I] Import\t[/] Search")
+            self.total_expense.update(f"Total:\tRM {finance_ledger.get_total_income():.2f}")
 
-        elif title == 'Income History':
+        elif title == 'Expenses History' or title == 'Income History':
+            self.view_mode = "expenses_history" if title == 'Expenses History' else "income_history"
             self.content_header.display = True
             self.total_expense.display = False
             self.instructions.display = False
 
-            self.view_mode = "income_history"
-            self.list_view = ListView()
-            self.query_one("#right-scroll").mount(self.list_view)
-
-            for filename in items:
-                self.list_view.append(ListItem(Static(filename)))
-
         elif title == 'Dashboard':
             self.view_mode = "dashboard"
             self.content_header.display = False
             self.total_expense.display = False
             self.instructions.display = False
 
-            self.dashboard_view = DashboardScreen(
-                balance=finance_ledger.get_current_balance(),
-                expense=finance_ledger.get_total_expenses(), 
-                savings=finance_ledger.get_current_savings(),
-                income=finance_ledger.get_total_income(),
-                history_dataset=items
-            )
+        elif title == 'Query':
+            self.view_mode = "query"
+            self.content_header.display = True
+            self.instructions.display = True
+            self.total_expense.display = True
+
+            rows = self.view_rows[title]
+            filters = ", ".join(f"{name}: {value}" for name, value in self.query_filters.items() if value is not None) or "Everything"
 
-            self.query_one("#right-scroll").mount(self.dashboard_view)
+            self.content_header.update(f"Query - {filters}")
+            self.instructions.update("[F] Filter\t[/] Search")
+            self.total_expense.update(f"{len(rows)}{'+' if len(rows) >= QUERY_LIMIT else ''} entries\tTotal:\tRM {sum(row['amount'] for row in rows):,.2f}")
 
 
     def show_history_snapshot(self, filename, snapshot_data, view_mode):
         """Display selected history snapshot in read-only mode."""
 
+        # Snapshots get a list of their own, so the history list underneath keeps its place for [B] Return
+        rows = { name: content["value"] for name, content in snapshot_data.items() }
+        if "Snapshot" not in self.views:
+            self.views["Snapshot"] = VirtualList()
+            self.views["Snapshot"].display = False
+            self.query_one("#right-scroll").mount(self.views["Snapshot"])
+
+        self.views["Snapshot"].set_rows(list(rows), make_row=lambda name: ExpenseRow(name, rows[name]))
+        self.show_view("Snapshot")
+        self.views["Snapshot"].focus()
+
         self.current_title = filename
         self.view_mode = view_mode
 
@@ -199,15 +284,6 @@ class RightPanel(Vertical):
         right_content = self.query_one("#right-content", Static)
         right_content.update(f"{filename} (Snapshot)")
 
-        # Clear previous list
-        self.list_view.clear()
-
-        # Render like Current Expenses
-        for name, content in snapshot_data.items():
-            self.list_view.append(
-                ListItem(ExpenseRow(name, content["value"]))
-            )
-
         total = sum(item["value"] for item in snapshot_data.values())
 
         self.total_expense.update(f"Total:\tRM {total:.2f}")
@@ -216,6 +292,30 @@ class RightPanel(Vertical):
         self.total_expense.display = True
         self.instructions.display = True
 
+    def show_search_results(self, text, rows, seconds):
+        """Display the ranked matches of a search across every month, best first."""
+
+        # Like snapshots, results get a list of their own so every option's view stays as it was
+        if "Search" not in self.views:
+            self.views["Search"] = VirtualList()
+            self.views["Search"].display = False
+            self.query_one("#right-scroll").mount(self.views["Search"])
+
+        self.views["Search"].set_rows(rows, make_row=result_row)
+        self.show_view("Search")
+        self.views["Search"].index = 0 if rows else None
+        self.views["Search"].focus()
+
+        self.view_mode = "search"
+        self.content_header.display = True
+        self.content_header.update(f"Search: {text}")
+
+        self.total_expense.update(f"{len(rows)}{'+' if len(rows) >= SEARCH_LIMIT else ''} matches in {seconds * 1000:.0f} ms")
+        self.instructions.update("[B] Return\t[/] Search")
+
+        self.total_expense.display = True
+        self.instructions.display = True
+
     def show_overview_dashboard(self):
         self.total_expense.display = False
         self.instructions.display = False
@@ -225,6 +325,10 @@ class RightPanel(Vertical):
 
 class FinanceTracker(Screen):
     DEFAULT_CSS = """
+    FinanceTracker {
+        layers: base overlay;
+    }
+
     OptionsList {
         height: 1fr;
     }
@@ -245,7 +349,13 @@ class FinanceTracker(Screen):
         ("d", "deposit_balance", "Deposit Balance"),
         ("n", "new_expense", "New Expense"),
         ("x", "delete_expense", "Delete Expense"),
+        ("i", "import_statement", "Import Statement"),
+        ("slash", "search", "Search"),
+        ("f", "filter_query", "Query filters"),
+        ("p", "toggle_profile", "Profile"),
         ("b", "go_back", "Back"),
+        ("w", "cycle_dashboard_window", "Dashboard window"),
+        ("g", "cycle_dashboard_bucket", "Dashboard grouping"),
         ("q", "quit", "Quit"),
     ]
 
@@ -255,10 +365,9 @@ class FinanceTracker(Screen):
 
     def action_focus_right(self):
         """Move focus to right panel list, if there are items."""
-        if self.right_panel.list_view and self.right_panel.list_view.children:
-            if self.right_panel.list_view:
-                self.right_panel.list_view.index = 0
-                self.right_panel.list_view.focus()
+        if self.right_panel.list_view and self.right_panel.list_view.row_count:
+            self.right_panel.list_view.index = 0
+            self.right_panel.list_view.focus()
 
         elif self.right_panel.dashboard_view:
             self.right_panel.dashboard_view.overview_table.list_view.index = 0
@@ -266,7 +375,10 @@ class FinanceTracker(Screen):
 
     def action_move_down(self):
         focused = self.focused
-        if isinstance(focused, ListView) and focused.children:
+        if isinstance(focused, VirtualList):
+            focused.action_cursor_down()
+
+        elif isinstance(focused, ListView) and focused.children:
 
             if focused.index is None:
                 focused.index = 0
@@ -275,12 +387,18 @@ class FinanceTracker(Screen):
 
     def action_move_up(self):
         focused = self.focused
-        if isinstance(focused, ListView) and focused.children:
+        if isinstance(focused, VirtualList):
+            focused.action_cursor_up()
+
+        elif isinstance(focused, ListView) and focused.children:
             if focused.index is None:
                 focused.index = 0
             else:
                 focused.index = max(focused.index - 1, 0)
 
+    async def action_quit(self):
+        await self.app.action_quit() # The app flushes the ledger on the way out
+
     def action_deposit_balance(self):
         # Must be showing Current Expenses
         if self.right_panel.current_title == "Current Expenses" or self.right_panel.current_title == "Income":
@@ -299,16 +417,9 @@ class FinanceTracker(Screen):
             return
 
         if self.right_panel.current_title == "Current Expenses" or self.right_panel.current_title == "Income":
-            selected_index = focused.index
-            if selected_index is None:
+            item_name = focused.highlighted_row
+            if item_name is None:
                 return
-
-            selected_item = focused.children[selected_index]
-            static_widgets = selected_item.query(Static)
-            if not static_widgets:
-                return
-
-            item_name = static_widgets[0].render()
             
             if self.right_panel.current_title == 'Current Expenses':
                 self.app.push_screen(
@@ -322,6 +433,11 @@ class FinanceTracker(Screen):
                 )
 
     def action_go_back(self):
+        if self.right_panel.view_mode == "search":
+            self.show_option(self.options_list.highlighted_child.query(Static)[0].render())
+            self.action_focus_right()
+            return
+
         if self.right_panel.view_mode == "expenses_history" or self.right_panel.view_mode == "income_history":
             focused = self.focused
 
@@ -336,6 +452,65 @@ class FinanceTracker(Screen):
             self.right_panel.list_view.index = 0
             self.right_panel.list_view.focus()
 
+    def action_cycle_dashboard_window(self):
+        if self.right_panel.view_mode == "dashboard":
+            windows = list(HISTORY_WINDOWS)
+            self.right_panel.dashboard_window = windows[(windows.index(self.right_panel.dashboard_window) + 1) % len(windows)]
+            self.redraw_dashboard()
+
+    def action_cycle_dashboard_bucket(self):
+        if self.right_panel.view_mode == "dashboard":
+            buckets = list(HISTORY_BUCKETS)
+            self.right_panel.dashboard_bucket = buckets[(buckets.index(self.right_panel.dashboard_bucket) + 1) % len(buckets)]
+            self.redraw_dashboard()
+
+    def redraw_dashboard(self):
+        refocus = self.right_panel.dashboard_view is not None and self.right_panel.dashboard_view.has_focus_within
+
+        self.right_panel.stale_views.add("Dashboard")
+        self.show_option("Dashboard")
+
+        if refocus:
+            self.call_after_refresh(self.action_focus_right) # The new overview list only exists once it's mounted
+
+    def action_import_statement(self):
+        if self.right_panel.current_title == "Current Expenses" or self.right_panel.current_title == "Income":
+            self.app.push_screen(ImportStatementModal(), self.on_statement_submitted)
+
+    def action_search(self):
+        if finance_ledger is not None:
+            self.app.push_screen(SearchModal(), self.on_search_submitted)
+
+    def on_search_submitted(self, result):
+        if result is None:
+            return
+
+        self.right_panel.content_header.update(f"Searching for {result['Text']}...")
+        self.run_search(result["Text"])
+
+    @work(thread=True, exclusive=True, group="search")
+    def run_search(self, text) -> None:
+        """Search off the event loop; The first search also reads the index in, which takes a moment on a big history."""
+        started = time.perf_counter()
+        rows = list(finance_ledger.search(text, SEARCH_LIMIT))
+        self.app.call_from_thread(self.right_panel.show_search_results, text, rows, time.perf_counter() - started)
+
+    def action_filter_query(self):
+        if self.right_panel.view_mode == "query":
+            self.app.push_screen(QueryModal(self.right_panel.query_filters), self.on_query_submitted)
+
+    def on_query_submitted(self, result):
+        if result is None:
+            return
+
+        self.right_panel.query_filters = result
+        self.right_panel.stale_views.add("Query")
+        self.show_option("Query")
+        self.action_focus_right()
+
+    def action_toggle_profile(self):
+        self.profile_overlay.toggle()
+
     def open_deposit_balance_dialog(self):
         self.app.push_screen(DepositBalanceModal(), self.on_balance_deposited)
 
@@ -375,6 +550,25 @@ class FinanceTracker(Screen):
         # finance_ledger.update_current_balance(-result['Amount'])
         self.balance.update_balance(finance_ledger.get_current_balance()) # Update Balance display
 
+    def on_statement_submitted(self, result):
+        if result is None:
+            return
+
+        try:
+            imported = import_statement(finance_ledger, result["Path"], date_format=result["Date Format"])
+        except Exception as e:
+            self.notify(f"Failed to import {result['Path']}: {e}", severity="error")
+            return
+
+        self.notify(f"Imported {imported['rows']} rows in {imported['seconds']:.2f}s ({imported['rows_per_second']:,.0f} rows/s)")
+        if imported["skipped"]: self.notify(skipped_summary(imported["skipped"]), severity="warning")
+
+        self.show_option(self.right_panel.current_title) # The ledger marked it stale, so this brings it up to date
+
+        # Update Balance and Savings display
+        self.balance.update_balance(finance_ledger.get_current_balance())
+        self.savings.update_savings(finance_ledger.get_current_savings())
+
     def on_new_expense_submitted(self, result):
         if result is None: 
             return
@@ -452,19 +646,44 @@ class FinanceTracker(Screen):
             # Right column
             self.right_panel = RightPanel()
             yield self.right_panel
+
+        self.profile_overlay = ProfileOverlay()
+        yield self.profile_overlay
     
     def on_mount(self) -> None:
         self.options_list.index = 0
 
-        self.query_one("#balance-value", Static).update(f"RM {finance_ledger.get_current_balance():.2f}")
-        self.query_one("#savings-value", Static).update(f"RM {finance_ledger.get_current_savings():.2f}")
+        # Placeholders until the ledger has loaded
+        self.query_one("#balance-value", Static).update("RM --")
+        self.query_one("#savings-value", Static).update("RM --")
 
         self.options_list.focus()
-        selected_item = self.options_list.children[0]
-        option_text = selected_item.children[0].render()
         right_content = self.right_panel.query_one("#right-content", Static)
-        right_content.update(f"{option_text}")
+        right_content.update("Loading ledger...")
+
+        self.load_ledger()
 
+    @work(thread=True, exclusive=True)
+    def load_ledger(self) -> None:
+        """Read the ledger off the event loop, so the UI is already drawn while the JSON files load."""
+        ledger = open_ledger(background_writes=True) # So the UI never waits on the disk
+        self.app.call_from_thread(self.on_ledger_loaded, ledger)
+
+    def on_ledger_loaded(self, ledger: LedgerStore) -> None:
+        global finance_ledger
+        finance_ledger = ledger
+
+        self.app.record_startup_timing("ledger_ready")
+        finance_ledger.change_listeners.append(self.right_panel.invalidate)
+
+        self.balance.update_balance(finance_ledger.get_current_balance())
+        self.savings.update_savings(finance_ledger.get_current_savings())
+
+        # Fill in whichever option got highlighted while we were loading
+        if self.options_list.highlighted_child is not None:
+            self.show_option(self.options_list.highlighted_child.query(Static)[0].render())
+
+    @timed("FinanceTracker.on_list_view_highlighted")
     async def on_list_view_highlighted(self, event: ListView.Highlighted):
         """Update right panel dynamically only when the left options are highlighted."""
         # Only respond if the event is from the left panel
@@ -480,6 +699,18 @@ class FinanceTracker(Screen):
 
         option_text = static_widgets[0].render()
 
+        if finance_ledger is None:
+            return # on_ledger_loaded shows it once there's something to show
+
+        self.show_option(option_text)
+
+    @timed("FinanceTracker.show_option")
+    def show_option(self, option_text):
+        # Nothing changed under it since it was last drawn, so there's nothing to read
+        if self.right_panel.has_fresh_view(option_text):
+            self.right_panel.show_view(option_text)
+            return
+
         items = []
         if option_text == 'Current Expenses':
             items = finance_ledger.get_current_expenses()
@@ -490,10 +721,32 @@ class FinanceTracker(Screen):
         elif option_text == 'Income History':
             items = finance_ledger.get_expenses_history()
         elif option_text == 'Dashboard':
-            items = finance_ledger.get_history_dataset()
+            items = finance_ledger.get_history_dataset(self.right_panel.dashboard_window, self.right_panel.dashboard_bucket)
+        elif option_text == 'Query':
+            self.right_panel.content_header.display = True
+            self.right_panel.content_header.update("Querying...")
+            self.run_query(dict(self.right_panel.query_filters))
+            return # show_query_results puts it up
         
         self.right_panel.update_content(option_text, items)
 
+    @work(thread=True, exclusive=True, group="query")
+    def run_query(self, filters) -> None:
+        """Query off the event loop; A wide date range reads a good few months' columns."""
+        rows = list(finance_ledger.query(
+            filters.get("Kind"), filters.get("Category"), filters.get("From"), filters.get("To"),
+            filters.get("Min Amount"), filters.get("Max Amount"), limit=QUERY_LIMIT
+        ))
+        self.app.call_from_thread(self.show_query_results, filters, rows)
+
+    def show_query_results(self, filters, rows):
+        # The filters changed or another option got highlighted while it ran; Whatever's showing now stays
+        highlighted = self.options_list.highlighted_child
+        if filters != self.right_panel.query_filters or highlighted is None or highlighted.query(Static)[0].render() != 'Query':
+            return
+
+        self.right_panel.update_content('Query', rows)
+
 
     async def on_list_view_selected(self, event: ListView.Selected):
         """Called when an item is 'activated' (Enter pressed)."""
@@ -508,31 +761,29 @@ class FinanceTracker(Screen):
 
             option_text = static_widgets[0].render()
 
-            if self.right_panel.list_view and self.right_panel.list_view.children:
+            if self.right_panel.list_view and self.right_panel.list_view.row_count:
                 # Focus on the first item in the right panel
                 self.right_panel.list_view.index = 0
                 self.right_panel.list_view.focus()
 
-            if option_text == 'Dashboard':
+            if option_text == 'Dashboard' and self.right_panel.dashboard_view:
                 self.right_panel.dashboard_view.overview_table.list_view.index = 0
                 self.right_panel.dashboard_view.overview_table.list_view.focus()
 
             return
 
+    async def on_virtual_list_selected(self, event: VirtualList.Selected):
+        """Called when a right panel row is 'activated' (Enter pressed)."""
+
         # =============== RIGHT PANEL selection logic ===============
         if event.list_view is self.right_panel.list_view:
+            selected = self.right_panel.list_view.highlighted_row
+            if selected is None:
+                return
+
             # Only show modal if we're in 'Current Expenses' mode
             if self.right_panel.current_title == "Current Expenses":
-                if not self.right_panel.list_view: return
-                
-                # Get selected item
-                selected_index = self.right_panel.list_view.index
-                if selected_index is None:
-                    return
-
-                selected_item = self.right_panel.list_view.children[selected_index]
-                static_widgets = selected_item.query(Static)
-                current_expense = static_widgets[0].render()
+                current_expense = selected
                 expense_entries = finance_ledger.get_current_expenses()[current_expense]['entries']
 
                 # Push the modal
@@ -542,16 +793,7 @@ class FinanceTracker(Screen):
                 )
 
             elif self.right_panel.current_title == "Income":
-                if not self.right_panel.list_view: return
-                
-                # Get selected item
-                selected_index = self.right_panel.list_view.index
-                if selected_index is None:
-                    return
-
-                selected_item = self.right_panel.list_view.children[selected_index]
-                static_widgets = selected_item.query(Static)
-                current_income = static_widgets[0].render()
+                current_income = selected
                 income_entries = finance_ledger.get_current_income()[current_income]['entries']
 
                 # Push the modal
@@ -561,30 +803,14 @@ class FinanceTracker(Screen):
                 )
 
             elif self.right_panel.current_title == "Expenses History":
-                if not self.right_panel.list_view: return
-
-                selected_index = self.right_panel.list_view.index
-                if selected_index is None:
-                    return
-
-                selected_item = self.right_panel.list_view.children[selected_index]
-                static_widgets = selected_item.query(Static)
-                filename = static_widgets[0].render()
+                filename = selected
 
                 history_data = finance_ledger.load_expense_history(str(filename) + ".json")
                 self.right_panel.show_history_snapshot(filename, history_data, "expenses_history")
                 return
             
             elif self.right_panel.current_title == "Income History":
-                if not self.right_panel.list_view: return
-
-                selected_index = self.right_panel.list_view.index
-                if selected_index is None:
-                    return
-
-                selected_item = self.right_panel.list_view.children[selected_index]
-                static_widgets = selected_item.query(Static)
-                filename = static_widgets[0].render()
+                filename = selected
 
                 history_data = finance_ledger.load_income_history(str(filename) + ".json")
                 self.right_panel.show_history_snapshot(filename, history_data, "income_history")
@@ -596,7 +822,7 @@ class FinanceTracker(Screen):
         self.right_panel.update_content('Current Expenses', finance_ledger.get_current_expenses()) # Update content
 
         # Select the first option in the list
-        if self.right_panel.list_view and self.right_panel.list_view.children:
+        if self.right_panel.list_view and self.right_panel.list_view.row_count:
             self.right_panel.list_view.index = 0
             self.right_panel.list_view.focus()
 
@@ -608,7 +834,7 @@ class FinanceTracker(Screen):
         self.right_panel.update_content('Income', finance_ledger.get_current_income()) # Update content
 
         # Select the first option in the list
-        if self.right_panel.list_view and self.right_panel.list_view.children:
+        if self.right_panel.list_view and self.right_panel.list_view.row_count:
             self.right_panel.list_view.index = 0
             self.right_panel.list_view.focus()
 
@@ -617,9 +843,34 @@ class FinanceTracker(Screen):
 
 
 class FinanceTrackerApp(App):
+    def __init__(self):
+        super().__init__()
+        self.startup_timings = {} # Seconds since APP_STARTED
+
     def on_ready(self) -> None:
+        self.record_startup_timing("first_frame")
         self.push_screen(FinanceTracker())
 
+    async def action_quit(self) -> None:
+        if finance_ledger is not None:
+            finance_ledger.close() # Anything still queued for the disk gets written before we go
+
+        self.exit()
+
+    def record_startup_timing(self, name: str) -> None:
+        self.startup_timings[name] = time.perf_counter() - APP_STARTED
+        self.log.info(f"Startup: {name} after {self.startup_timings[name] * 1000:.1f} ms")
+
+        # Append the full set to a JSON lines file so startup regressions can be tracked across runs
+        log_path = os.environ.get("FINANCE_TRACKER_STARTUP_LOG")
+        if log_path and "first_frame" in self.startup_timings and "ledger_ready" in self.startup_timings:
+            with open(log_path, "a") as file:
+                file.write(json.dumps({ "time": datetime.now().isoformat(timespec="seconds"), **self.startup_timings }) + "\n")
+
 
 if __name__ == "__main__":
     FinanceTrackerApp().run()
+
+    # Covers the ways out that don't go through action_quit, e.g. Ctrl+C
+    if finance_ledger is not None:
+        finance_ledger.close()